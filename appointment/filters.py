@@ -4,11 +4,28 @@ from django import forms
 import django_filters
 from rest_framework import exceptions
 
-from .models import Appointment
+from crm.authentication import get_jwt_claims
+
+from .models import Appointment, AppointmentDrivingTime, AppointmentNotification
 
 CURRENT_USER_FILTER_KEYWORD = 'me'
 
 
+def get_user_uuid(request, field_name, value):
+    """
+    Returns the UUID of the logged in user for "me", else the value if it's a UUID.
+    """
+    if value == CURRENT_USER_FILTER_KEYWORD:
+        return get_jwt_claims(request).core_user_uuid
+    try:
+        UUID(value)
+    except ValueError:
+        raise exceptions.ValidationError(
+            '{} field can only have value "{}" or a valid User UUID'
+            .format(field_name, CURRENT_USER_FILTER_KEYWORD))
+    return value
+
+
 class DateRangeWidget(django_filters.widgets.SuffixedMultiWidget):
     suffixes = ['gte', 'lte']
 
@@ -17,6 +34,10 @@ class DateRangeWidget(django_filters.widgets.SuffixedMultiWidget):
         super(DateRangeWidget, self).__init__(widgets, attrs)
 
 
+class UUIDInFilter(django_filters.BaseInFilter, django_filters.UUIDFilter):
+    pass
+
+
 class AppointmentFilter(django_filters.FilterSet):
     owner = django_filters.CharFilter(
         method="owner_filter",
@@ -38,33 +59,10 @@ class AppointmentFilter(django_filters.FilterSet):
                   'start_date', 'siteprofile_uuid', ]
 
     def owner_filter(self, queryset, field_name, value):
-        if value == CURRENT_USER_FILTER_KEYWORD:
-            my_uuid = self.request.session.get('jwt_core_user_uuid')
-
-            return queryset.filter(owner=my_uuid)
-        else:
-            try:
-                UUID(value)
-            except ValueError:
-                raise exceptions.ValidationError(
-                    'owner field can only have value "{}" or a valid User UUID'
-                    .format(CURRENT_USER_FILTER_KEYWORD))
-            else:
-                return queryset.filter(owner=value)
+        return queryset.filter(owner=get_user_uuid(self.request, field_name, value))
 
     def invitee_filter(self, queryset, field_name, value):
-        if value == CURRENT_USER_FILTER_KEYWORD:
-            return queryset.filter(invitee_uuids__contains=[
-                self.request.session.get('jwt_core_user_uuid')])
-        else:
-            try:
-                UUID(value)
-            except ValueError:
-                raise exceptions.ValidationError(
-                    'invitee field can only have value "{}" or a valid '
-                    'User UUID'.format(CURRENT_USER_FILTER_KEYWORD))
-            else:
-                return queryset.filter(invitee_uuids__contains=[value])
+        return queryset.filter(invitee_uuids__contains=[get_user_uuid(self.request, field_name, value)])
 
     def workflowlevel2_uuid_filter(self, queryset, field_name, value):
         try:
@@ -75,3 +73,35 @@ class AppointmentFilter(django_filters.FilterSet):
                 .format(CURRENT_USER_FILTER_KEYWORD))
         else:
             return queryset.filter(workflowlevel2_uuids__contains=[value])
+
+
+class AppointmentDrivingTimeFilter(django_filters.FilterSet):
+    owner = django_filters.CharFilter(
+        method='owner_filter',
+        help_text='Can either be a UUID or "me", to display only the driving '
+                  'times of the appointments owned by the current logged in user')
+    workflowlevel2_uuid = django_filters.UUIDFilter(
+        method='workflowlevel2_uuid_filter', help_text='UUID for the project')
+    appointment_uuid = UUIDInFilter(
+        field_name='appointment__uuid',
+        help_text='Comma-separated UUIDs of the appointments')
+    time_point = django_filters.DateFromToRangeFilter(widget=DateRangeWidget())
+
+    class Meta:
+        model = AppointmentDrivingTime
+        fields = ['owner', 'workflowlevel2_uuid', 'appointment_uuid', 'time_point']
+
+    def owner_filter(self, queryset, field_name, value):
+        return queryset.filter(appointment__owner=get_user_uuid(self.request, field_name, value))
+
+    def workflowlevel2_uuid_filter(self, queryset, field_name, value):
+        return queryset.filter(appointment__workflowlevel2_uuids__contains=[value])
+
+
+class AppointmentNotificationFilter(django_filters.FilterSet):
+    recipient = django_filters.CharFilter(lookup_expr='iexact', help_text='Email address of the recipient')
+    sent_at = django_filters.DateFromToRangeFilter(widget=DateRangeWidget())
+
+    class Meta:
+        model = AppointmentNotification
+        fields = ['recipient', 'send_notification', 'sent_at']
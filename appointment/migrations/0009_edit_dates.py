@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0008_appointmentdrivingtime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='edit_date',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Changes of the notes, driving times and contact of the appointment update it as well.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='appointmentdrivingtime',
+            name='edit_date',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='appointmentnote',
+            name='edit_date',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='contact_uuid',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
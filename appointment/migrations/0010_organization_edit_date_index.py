@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0009_edit_dates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['organization_uuid', 'edit_date'], name='appointment_organiz_fff21b_idx'),
+        ),
+    ]
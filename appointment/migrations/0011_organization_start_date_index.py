@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0010_organization_edit_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['organization_uuid', 'start_date'], name='appointment_organiz_a57547_idx'),
+        ),
+    ]
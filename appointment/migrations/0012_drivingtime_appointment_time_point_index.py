@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0011_organization_start_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentdrivingtime',
+            index=models.Index(fields=['appointment', 'time_point'], name='appointment_appoint_7ec084_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0012_drivingtime_appointment_time_point_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentnotification',
+            index=models.Index(fields=['appointment', 'sent_at'], name='appointment_appoint_29017f_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0013_notification_appointment_sent_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentdrivingtime',
+            index=models.Index(fields=['time_point', 'uuid'], name='appointment_time_po_281657_idx'),
+        ),
+    ]
@@ -11,6 +11,7 @@ from django.db.models import CheckConstraint, Q
 from django.utils import timezone
 
 from contact.models import Contact
+from crm.models import OutboxModelMixin
 
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,7 @@ NOTE_TYPES = (
 )
 
 
-class Appointment(models.Model):
+class Appointment(OutboxModelMixin, models.Model):
     uuid = models.UUIDField(db_index=True, default=uuid.uuid4, editable=False)
     owner = models.UUIDField()
     name = models.CharField(max_length=50, help_text='Name', blank=True)
@@ -44,15 +45,35 @@ class Appointment(models.Model):
     workflowlevel2_uuids = ArrayField(
         models.UUIDField(), blank=True, null=True,
         help_text='List of WorkflowLevel2s added to the appointment.')
-    contact_uuid = models.UUIDField(blank=True, null=True)
+    contact_uuid = models.UUIDField(blank=True, null=True, db_index=True)
     summary = models.TextField(blank=True, help_text='Summarize the work done at the appointment.')
+    edit_date = models.DateTimeField(auto_now=True, help_text='Changes of the notes, driving times and contact '
+                                                              'of the appointment update it as well.')
 
     @property
     def contact(self):
         if not hasattr(self, '_contact'):
-            self._contact = Contact.objects.filter(uuid=self.contact_uuid).first()
+            self._contact = Contact.objects.select_related('contact_type').filter(uuid=self.contact_uuid).first()
         return self._contact
 
+    @classmethod
+    def touch(cls, **filters):
+        """
+        Updates the edit_date of the filtered appointments, e.g. when a related object changed.
+        """
+        cls.objects.filter(**filters).update(edit_date=timezone.now())
+
+    @staticmethod
+    def prefetch_contacts(appointments):
+        """
+        Sets the contacts of the appointments with a single query instead of one query per appointment.
+        """
+        contact_uuids = {appointment.contact_uuid for appointment in appointments if appointment.contact_uuid}
+        contacts = Contact.objects.select_related('contact_type').in_bulk(contact_uuids, field_name='uuid')
+        for appointment in appointments:
+            appointment._contact = contacts.get(appointment.contact_uuid)
+        return appointments
+
     def clean(self):
         super(Appointment, self).clean()
 
@@ -68,10 +89,17 @@ class Appointment(models.Model):
     def __str__(self):
         return f'{self.name} {self.start_date}'
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization_uuid', 'edit_date']),
+            models.Index(fields=['organization_uuid', 'start_date']),
+        ]
+
 
-class AppointmentNote(models.Model):
+class AppointmentNote(OutboxModelMixin, models.Model):
     note = models.TextField(blank=True)
     type = models.PositiveSmallIntegerField(choices=NOTE_TYPES, default=1, help_text='Choices: {}'.format(", ".join([str(kv[0]) for kv in NOTE_TYPES])))
+    edit_date = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'{self.type} - {self.note[:10]}'
@@ -98,18 +126,31 @@ class AppointmentNotification(models.Model):
     def __str__(self):
         return f'{self.appointment} ({self.sent_at})'
 
+    class Meta:
+        indexes = [
+            # Lists of the notifications of the appointments of an organization, filtered by when they were sent
+            models.Index(fields=['appointment', 'sent_at']),
+        ]
+
 
-class AppointmentDrivingTime(models.Model):
+class AppointmentDrivingTime(OutboxModelMixin, models.Model):
     uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     distance = models.DecimalField(blank=True, max_digits=5, decimal_places=2, help_text="Distance in predefined unit, p.e.: km")
     time = models.PositiveSmallIntegerField(blank=True, help_text="driving time in minutes")
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='driving_times')
     time_point = models.DateTimeField(blank=True, null=True, help_text="Point in time when the driving took place")
+    edit_date = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'{self.appointment} - {self.distance or 0} km - {self.time or 0} minutes'
 
     class Meta:
+        indexes = [
+            # Reports of the driving times of the appointments of an organization in a range of time
+            models.Index(fields=['appointment', 'time_point']),
+            # Lists of the driving times by their time_point, with a cursor
+            models.Index(fields=['time_point', 'uuid']),
+        ]
         CheckConstraint(
             name='distance_or_time_must_be_filled',
             check=~Q(distance=None, time=None) & (~(~Q(distance=None) & ~Q(time=None)))
@@ -7,6 +7,7 @@ from django.core.mail import send_mail
 
 from datetime import timedelta
 from contact.models import Contact
+from crm import metrics
 
 try:
     from django.utils import timezone
@@ -29,14 +30,16 @@ class AppointmentNotificationEMail():
             html_alt = "<html><head><meta charset=\"UTF-8\"><title></title>" \
                        "</head><body>" + html_msg + "</body></html>"
 
-            send_mail(
-                self.appointment_notification.subject,
-                self.appointment_notification.message,
-                settings.DEFAULT_FROM_EMAIL,
-                [self.appointment_notification.recipient],
-                fail_silently=False,
-                html_message=html_alt
-            )
+            with metrics.NOTIFICATION_FAILURES.count_exceptions(), metrics.NOTIFICATION_SEND_LATENCY.time():
+                send_mail(
+                    self.appointment_notification.subject,
+                    self.appointment_notification.message,
+                    settings.DEFAULT_FROM_EMAIL,
+                    [self.appointment_notification.recipient],
+                    fail_silently=False,
+                    html_message=html_alt
+                )
+            metrics.NOTIFICATIONS_SENT.inc()
 
             self.appointment_notification.sent_at = timezone.now()
             logger.info('EMail notification has been send for appointment'
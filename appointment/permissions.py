@@ -1,4 +1,5 @@
 from rest_framework.exceptions import PermissionDenied
+from crm.authentication import get_jwt_claims
 from crm.permissions import AllowOptionsAuthentication
 
 
@@ -11,13 +12,12 @@ class OrganizationPermission(AllowOptionsAuthentication):
         if request.user.is_superuser:
             return True
 
-        if getattr(request, 'session', None):
-            if request.session.get('jwt_core_user_uuid') == \
-                    str(obj.owner):
+        claims = get_jwt_claims(request)
+        if claims:
+            if claims.core_user_uuid == str(obj.owner):
                 return True
 
-            if request.session.get('jwt_organization_uuid') == \
-                    str(obj.organization_uuid):
+            if claims.organization_uuid == str(obj.organization_uuid):
                 return True
             else:
                 raise PermissionDenied('User is not in the same organization '
@@ -30,7 +30,7 @@ class AppointmentNoteOrganizationPermission(OrganizationPermission):
             return True
         # the appointment-lookup is not optimal due to M2M, should be FK on Appointment
         if appointmentnote.appointment_set.count() and \
-                request.session.get('jwt_organization_uuid') == str(
+                get_jwt_claims(request).organization_uuid == str(
                 appointmentnote.appointment_set.first().organization_uuid):
             return True
         else:
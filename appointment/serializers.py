@@ -1,9 +1,14 @@
 import logging
+from collections import defaultdict
 
 from rest_framework import serializers
 
-from contact.serializers import ContactSerializer
+from contact.models import Contact
+from contact.serializers import ContactSerializer, ContactValuesSerializer
+from crm.authentication import get_jwt_claims
+from crm.values import ValuesSerializer
 from .models import Appointment, AppointmentNotification, AppointmentNote, AppointmentDrivingTime
+from .summary import GRANULARITIES, GROUP_BY, REPORT_GROUP_BY
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +70,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
     def validate_organization_uuid(self, value):
         if value:
             request = self.context['request']
-            user_org_uuid = request.session.get('jwt_organization_uuid')
+            user_org_uuid = get_jwt_claims(request).organization_uuid
             if user_org_uuid != str(value):
                 raise serializers.ValidationError(
                     'The Organization cannot be different than user\'s '
@@ -77,6 +82,99 @@ class AppointmentSerializer(serializers.ModelSerializer):
         exclude = ('owner',)
 
 
+class AppointmentSyncSerializer(AppointmentSerializer):
+    """
+    Appointment without the nested contact and driving times, which are synced separately. Notes are listed by ID.
+    """
+    contact = None
+    notes = None
+    driving_times = None
+
+
+class AppointmentSummaryQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the summary of the appointments. The days are the ones of TIME_ZONE.
+    """
+    start = serializers.DateField(help_text='First day of the summary')
+    end = serializers.DateField(help_text='Last day of the summary')
+    granularity = serializers.ChoiceField(GRANULARITIES, default='day', help_text='Period the appointments are '
+                                                                                  'counted in')
+    group_by = serializers.ChoiceField(GROUP_BY, default='owner', help_text='Users the appointments are counted for')
+
+    def validate(self, data):
+        if data['start'] > data['end']:
+            raise serializers.ValidationError('start cannot be later than end.')
+        return data
+
+
+class AppointmentDrivingTimeReportQuerySerializer(AppointmentSummaryQuerySerializer):
+    """
+    Query parameters of the report of the driving times. The days are the ones of TIME_ZONE.
+    """
+    group_by = serializers.MultipleChoiceField(REPORT_GROUP_BY, required=False,
+                                               help_text='Fields of the appointments the driving times are reported '
+                                                         'for, can be repeated (default: owner)')
+    format = serializers.ChoiceField(('json', 'csv'), default='json')
+
+    def validate(self, data):
+        data = super().validate(data)
+        data['group_by'] = data.get('group_by') or {'owner'}
+        return data
+
+
+class AppointmentNoteValuesSerializer(ValuesSerializer):
+    serializer_class = AppointmentNoteSerializer
+
+
+class AppointmentDrivingTimeValuesSerializer(ValuesSerializer):
+    serializer_class = AppointmentDrivingTimeSerializer
+
+
+class AppointmentValuesSerializer(ValuesSerializer):
+    """
+    AppointmentSerializer of `.values()` rows, for lists. The contacts, notes and driving times of all rows are
+    fetched with one query each.
+    """
+    serializer_class = AppointmentSerializer
+    nested_fields = ('contact', 'notes', 'driving_times')
+
+    def compile_field(self, name, field):
+        if name in self.nested_fields:
+            return None, None, False
+        return super().compile_field(name, field)
+
+    def _group_by_appointment(self, values_serializer, queryset, appointment_lookup):
+        rows = list(queryset.values(*dict.fromkeys(values_serializer.lookups + [appointment_lookup])))
+        grouped = defaultdict(list)
+        for row, item in zip(rows, values_serializer.to_representation(rows)):
+            grouped[row[appointment_lookup]].append(item)
+        return grouped
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        data = super().to_representation(rows)
+        if not rows:
+            return data
+
+        appointment_ids = [row['id'] for row in rows]
+        notes = self._group_by_appointment(
+            AppointmentNoteValuesSerializer(self.context),
+            AppointmentNote.objects.filter(appointment__in=appointment_ids), 'appointment')
+        driving_times = self._group_by_appointment(
+            AppointmentDrivingTimeValuesSerializer(self.context),
+            AppointmentDrivingTime.objects.filter(appointment__in=appointment_ids), 'appointment')
+        contact_serializer = ContactValuesSerializer(self.context)
+        contact_rows = contact_serializer.get_values(
+            Contact.objects.filter(uuid__in={row['contact_uuid'] for row in rows if row['contact_uuid']}))
+        contacts = {contact['uuid']: contact for contact in contact_serializer.to_representation(contact_rows)}
+
+        for row, item in zip(rows, data):
+            item['contact'] = contacts.get(str(row['contact_uuid'])) if row['contact_uuid'] else None
+            item['notes'] = notes[row['id']]
+            item['driving_times'] = driving_times[row['id']]
+        return data
+
+
 class AppointmentHyperlinkField(serializers.HyperlinkedRelatedField):
     view_name = 'appointment-detail'
     queryset = Appointment.objects.all()
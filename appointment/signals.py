@@ -1,6 +1,7 @@
 from django.dispatch import receiver
-from django.db.models.signals import pre_save
-from .models import Appointment, AppointmentNotification
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from contact.models import Contact
+from .models import Appointment, AppointmentDrivingTime, AppointmentNote, AppointmentNotification
 from .notifications import AppointmentNotificationEMail
 
 
@@ -21,3 +22,23 @@ def pre_save_handler_appointment_notification(sender, instance, *args,
 
     if instance.send_notification and not instance.sent_at:
         ap_mail.notify_recipient()
+
+
+# The notes, driving times and contact are serialized with the appointment, so their changes update its edit_date
+
+@receiver(post_save, sender=AppointmentNote)
+@receiver(pre_delete, sender=AppointmentNote)
+def touch_appointment_note(sender, instance, *args, **kwargs):
+    Appointment.touch(notes=instance)
+
+
+@receiver(post_save, sender=AppointmentDrivingTime)
+@receiver(post_delete, sender=AppointmentDrivingTime)
+def touch_appointment_driving_time(sender, instance, *args, **kwargs):
+    Appointment.touch(pk=instance.appointment_id)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def touch_appointment_contact(sender, instance, *args, **kwargs):
+    Appointment.touch(contact_uuid=instance.uuid)
@@ -0,0 +1,75 @@
+from django.db import connections
+from django.utils import timezone
+
+GRANULARITIES = ('day', 'week', 'month')
+GROUP_BY = ('owner', 'invitee')
+REPORT_GROUP_BY = ('owner', 'workflowlevel2')
+
+# The appointments are counted in the period of their start in the local time, so an appointment at 00:30 on the
+# day of a DST change is counted on that day and not on the one before, as it would be in UTC
+SUMMARY_SQL = (
+    'SELECT date_trunc(%s, appointment.start_date AT TIME ZONE %s)::date, {user}, count(*), '
+    'sum(extract(epoch FROM appointment.end_date - appointment.start_date)) '
+    'FROM ({appointments}) AS appointment{join} '
+    'GROUP BY 1, 2 ORDER BY 1, 2'
+)
+GROUP_BY_SQL = {
+    'owner': ('appointment.owner', ''),
+    'invitee': ('invitee', ', unnest(appointment.invitee_uuids) AS invitee'),
+}
+
+# The driving times are reported in the period of their time_point in the local time. The ones of appointments
+# without WorkflowLevel2s are reported with null, the ones of appointments with several for each of them.
+DRIVING_TIME_REPORT_SQL = (
+    'SELECT date_trunc(%s, driving_time.time_point AT TIME ZONE %s)::date{columns}, count(*), '
+    'sum(driving_time.distance), sum(driving_time.time) '
+    'FROM ({driving_times}) AS driving_time{join} '
+    'GROUP BY {group} ORDER BY {group}'
+)
+REPORT_GROUP_BY_SQL = {
+    'owner': ('driving_time.owner', ''),
+    'workflowlevel2': ('workflowlevel2',
+                       ' LEFT JOIN LATERAL unnest(driving_time.workflowlevel2_uuids) AS workflowlevel2 ON true'),
+}
+
+
+def _aggregate(queryset, sql, params, granularity):
+    with connections[queryset.db].cursor() as cursor:
+        # The table and column names are the ones of the models, the values are parameters
+        cursor.execute(sql, (granularity, timezone.get_current_timezone_name()) + tuple(params))  # nosec
+        return cursor.fetchall()
+
+
+def summarize(queryset, granularity='day', group_by='owner'):
+    """
+    Returns the number and the total duration in minutes of the appointments of the queryset per period and owner
+    or invitee, aggregated with a single query. Appointments with several invitees are counted for each of them.
+    """
+    appointments = queryset.order_by().values('start_date', 'end_date', 'owner', 'invitee_uuids')
+    appointments_sql, params = appointments.query.get_compiler(queryset.db).as_sql()
+    user, join = GROUP_BY_SQL[group_by]
+    sql = SUMMARY_SQL.format(user=user, appointments=appointments_sql, join=join)
+    return [
+        {'date': period, group_by: user_uuid, 'count': count, 'duration': int(round(duration / 60))}
+        for period, user_uuid, count, duration in _aggregate(queryset, sql, params, granularity)
+    ]
+
+
+def report_driving_times(queryset, granularity='day', group_by=('owner',)):
+    """
+    Returns the number of the driving times of the queryset and their total distance and time per period and per
+    owner and/or WorkflowLevel2 of their appointments, aggregated with a single query.
+    """
+    group_by = [name for name in REPORT_GROUP_BY if name in group_by]
+    driving_times = queryset.order_by().values('time_point', 'distance', 'time', 'appointment__owner',
+                                               'appointment__workflowlevel2_uuids')
+    driving_times_sql, params = driving_times.query.get_compiler(queryset.db).as_sql()
+    columns = [REPORT_GROUP_BY_SQL[name][0] for name in group_by]
+    sql = DRIVING_TIME_REPORT_SQL.format(
+        columns=''.join(', ' + column for column in columns), driving_times=driving_times_sql,
+        join=''.join(REPORT_GROUP_BY_SQL[name][1] for name in group_by),
+        group=', '.join(str(position) for position in range(1, len(group_by) + 2)))
+    return [
+        dict(zip(['date'] + group_by, row[:-3]), count=row[-3], distance=str(row[-2]), time=row[-1])
+        for row in _aggregate(queryset, sql, params, granularity)
+    ]
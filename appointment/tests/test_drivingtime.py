@@ -1,5 +1,12 @@
 import uuid
+from datetime import datetime
+from decimal import Decimal
 from unittest import TestCase
+from urllib.parse import parse_qs, urlsplit
+
+import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.test import APIRequestFactory
 
@@ -44,6 +51,90 @@ class AppointmentDrivingTimeViewsCreateTest(AppointmentDrivingTimeViewsBaseTest)
         self.assertEqual(response.data["time"], 3)
 
 
+class AppointmentDrivingTimeViewsListTest(AppointmentDrivingTimeViewsBaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.berlin = pytz.timezone('Europe/Berlin')
+        self.appointment = mfactories.Appointment(
+            owner=self.core_user_uuid,
+            organization_uuid=self.organization_uuid,
+            start_date=self.berlin.localize(datetime(2019, 7, 2, 12, 0)),
+            end_date=self.berlin.localize(datetime(2019, 7, 2, 13, 0)),
+        )
+
+    def _create_driving_time(self, time_point, appointment=None):
+        return mfactories.AppointmentDrivingTime(
+            appointment=appointment or self.appointment,
+            time_point=self.berlin.localize(time_point) if time_point else None)
+
+    def _list(self, **params):
+        request = self.factory.get('', params)
+        request.session = self.session
+        view = AppointmentDrivingTimeViewSet.as_view({'get': 'list'})
+        return view(request)
+
+    def test_list_driving_times_of_organization(self):
+        driving_time = self._create_driving_time(datetime(2019, 7, 2, 11, 0))
+        self._create_driving_time(datetime(2019, 7, 2, 11, 0),
+                                  mfactories.Appointment(organization_uuid=uuid.uuid4()))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._list()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.data['next'], None)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['uuid'], str(driving_time.uuid))
+        self.assertEqual(response.data['results'][0]['appointment'], self.appointment.pk)
+        self.assertEqual(response.data['results'][0]['distance'], '{:.2f}'.format(driving_time.distance))
+
+    def test_list_driving_times_by_time_point(self):
+        late = self._create_driving_time(datetime(2019, 7, 3, 8, 0))
+        early = self._create_driving_time(datetime(2019, 7, 1, 8, 0))
+        # Not listed
+        self._create_driving_time(None)
+        same_time_point = [self._create_driving_time(datetime(2019, 7, 2, 8, 0)) for _ in range(2)]
+
+        uuids = []
+        params = {'page_size': 2}
+        while True:
+            response = self._list(**params)
+            self.assertEqual(response.status_code, 200)
+            uuids.extend(item['uuid'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+
+        self.assertEqual(uuids, [str(early.uuid)] + sorted(str(item.uuid) for item in same_time_point) +
+                         [str(late.uuid)])
+
+    def test_list_driving_times_filtered(self):
+        other_appointment = mfactories.Appointment(
+            owner=uuid.uuid4(),
+            organization_uuid=self.organization_uuid,
+        )
+        mine = self._create_driving_time(datetime(2019, 7, 2, 8, 0))
+        self._create_driving_time(datetime(2019, 7, 9, 8, 0))
+        other = self._create_driving_time(datetime(2019, 7, 2, 9, 0), other_appointment)
+
+        response = self._list(owner='me')
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self._list(time_point_gte='2019-07-01', time_point_lte='2019-07-02')
+        self.assertEqual([item['uuid'] for item in response.data['results']], [str(mine.uuid), str(other.uuid)])
+
+        response = self._list(appointment_uuid=str(other_appointment.uuid))
+        self.assertEqual([item['uuid'] for item in response.data['results']], [str(other.uuid)])
+
+        response = self._list(appointment_uuid='{},{}'.format(self.appointment.uuid, other_appointment.uuid),
+                              time_point_lte='2019-07-02')
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self._list(appointment_uuid='no-uuid')
+        self.assertEqual(response.status_code, 400)
+
+
 class AppointmentDrivingTimeViewsRetrieveTest(AppointmentDrivingTimeViewsBaseTest):
 
     def test_retrieve_driving_time(self):
@@ -143,3 +234,93 @@ class AppointmentDrivingTimeViewsDeleteTest(AppointmentDrivingTimeViewsBaseTest)
 
         self.assertEqual(response.status_code, 403)
         self.assertEqual(appointment.driving_times.count(), 1)
+
+
+class AppointmentDrivingTimeViewsReportTest(AppointmentDrivingTimeViewsBaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.berlin = pytz.timezone('Europe/Berlin')
+        self.workflowlevel2_uuid = uuid.uuid4()
+        self.appointment = mfactories.Appointment(
+            owner=self.core_user_uuid,
+            organization_uuid=self.organization_uuid,
+            workflowlevel2_uuids=[self.workflowlevel2_uuid],
+        )
+        self.other_owner = uuid.uuid4()
+        self.other_appointment = mfactories.Appointment(
+            owner=self.other_owner,
+            organization_uuid=self.organization_uuid,
+            workflowlevel2_uuids=None,
+        )
+
+    def _create_driving_time(self, appointment, time_point, distance, time):
+        return mfactories.AppointmentDrivingTime(
+            appointment=appointment, time_point=self.berlin.localize(time_point), distance=Decimal(distance),
+            time=time)
+
+    def _report(self, **params):
+        request = self.factory.get('', params)
+        request.session = self.session
+        view = AppointmentDrivingTimeViewSet.as_view({'get': 'report'})
+        return view(request)
+
+    def test_report_per_day_and_owner(self):
+        # Summer time starts on 2019-03-31, the first driving time is at 23:30 UTC on the day before
+        self._create_driving_time(self.appointment, datetime(2019, 3, 31, 0, 30), '10.50', 20)
+        self._create_driving_time(self.appointment, datetime(2019, 3, 31, 18, 0), '4.25', 10)
+        self._create_driving_time(self.appointment, datetime(2019, 4, 1, 7, 0), '1.00', 5)
+        self._create_driving_time(self.other_appointment, datetime(2019, 3, 31, 9, 0), '30.00', 45)
+        self._create_driving_time(self.appointment, datetime(2019, 3, 30, 23, 59), '99.00', 99)
+        other_organization = mfactories.Appointment(organization_uuid=uuid.uuid4())
+        self._create_driving_time(other_organization, datetime(2019, 3, 31, 9, 0), '99.00', 99)
+
+        response = self._report(start='2019-03-31', end='2019-04-01')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['group_by'], ['owner'])
+        owner = str(self.core_user_uuid)
+        expected = sorted([
+            ('2019-03-31', owner, 2, '14.75', 30),
+            ('2019-03-31', str(self.other_owner), 1, '30.00', 45),
+        ]) + [('2019-04-01', owner, 1, '1.00', 5)]
+        self.assertEqual([(str(row['date']), str(row['owner']), row['count'], row['distance'], row['time'])
+                          for row in response.data['results']], expected)
+
+    def test_report_per_month_and_workflowlevel2(self):
+        self._create_driving_time(self.appointment, datetime(2019, 5, 2, 8, 0), '10.00', 20)
+        self._create_driving_time(self.appointment, datetime(2019, 5, 30, 8, 0), '5.00', 10)
+        self._create_driving_time(self.other_appointment, datetime(2019, 5, 3, 8, 0), '2.00', 4)
+
+        response = self._report(start='2019-05-01', end='2019-05-31', granularity='month',
+                                group_by='workflowlevel2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(str(row['date']), row['workflowlevel2'], row['count'], row['distance'], row['time'])
+                          for row in response.data['results']],
+                         [('2019-05-01', self.workflowlevel2_uuid, 2, '15.00', 30),
+                          ('2019-05-01', None, 1, '2.00', 4)])
+
+        response = self._report(start='2019-05-01', end='2019-05-31', granularity='month', owner='me',
+                                workflowlevel2_uuid=str(self.workflowlevel2_uuid))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['count'] for row in response.data['results']], [2])
+
+    def test_report_csv(self):
+        self._create_driving_time(self.appointment, datetime(2019, 6, 3, 8, 0), '12.30', 25)
+
+        response = self._report(start='2019-06-01', end='2019-06-30', granularity='week', format='csv',
+                                group_by=['owner', 'workflowlevel2'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines(), [
+            'date,owner,workflowlevel2,count,distance,time',
+            '2019-06-03,{},{},1,12.30,25'.format(self.core_user_uuid, self.workflowlevel2_uuid),
+        ])
+
+    def test_report_invalid_params(self):
+        response = self._report(start='2019-06-01', end='2019-06-30', group_by='invitee')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('group_by', response.data)
+
+        response = self._report(start='2019-06-01', end='2019-06-30', owner='nobody')
+        self.assertEqual(response.status_code, 400)
@@ -7,6 +7,7 @@ from django.core import mail
 import pytz
 
 from contact.models import Contact
+from contact.tests import model_factories as contact_mfactories
 from ..models import Appointment, AppointmentNotification, AppointmentNote
 from . import model_factories as mfactories
 
@@ -297,3 +298,47 @@ class AppointmentNotificationsTest(TestCase):
 
         self.assertEqual(str(appointment_notification),
                          'Appointment1 2018-01-01 12:15:00+00:00 (None)')
+
+
+class AppointmentEditDateTest(TestCase):
+    def setUp(self):
+        self.appointment = mfactories.Appointment()
+        self.edit_date = self.appointment.edit_date
+
+    def assertTouched(self):
+        self.appointment.refresh_from_db()
+        self.assertGreater(self.appointment.edit_date, self.edit_date)
+        self.edit_date = self.appointment.edit_date
+
+    def test_touch_on_note_change(self):
+        note = AppointmentNote.objects.create(note='Test note')
+        self.appointment.notes.add(note)
+        note.note = 'Changed'
+        note.save()
+        self.assertTouched()
+
+        note.delete()
+        self.assertTouched()
+
+    def test_touch_on_driving_time_change(self):
+        driving_time = mfactories.AppointmentDrivingTime(appointment=self.appointment)
+        self.assertTouched()
+
+        driving_time.delete()
+        self.assertTouched()
+
+    def test_touch_on_contact_change(self):
+        contact = contact_mfactories.Contact()
+        self.appointment.contact_uuid = contact.uuid
+        self.appointment.save()
+        self.edit_date = self.appointment.edit_date
+
+        contact.first_name = 'Changed'
+        contact.save()
+        self.assertTouched()
+
+    def test_not_touched_on_other_change(self):
+        mfactories.AppointmentDrivingTime()
+        contact_mfactories.Contact()
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.edit_date, self.edit_date)
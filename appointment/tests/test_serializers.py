@@ -1,9 +1,16 @@
+import uuid
+from datetime import datetime
+
+import pytz
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIRequestFactory
 from rest_framework.request import Request
 
+from contact.tests import model_factories as contact_mfactories
 from . import model_factories as mfactories
-from ..serializers import AppointmentSerializer, AppointmentDrivingTimeSerializer
+from ..models import Appointment, AppointmentNote
+from ..serializers import AppointmentSerializer, AppointmentDrivingTimeSerializer, AppointmentValuesSerializer
 
 
 class AppointmentSerializerTest(TestCase):
@@ -36,10 +43,44 @@ class AppointmentSerializerTest(TestCase):
             'workflowlevel2_uuids',
             'contact_uuid',
             'summary',
+            'edit_date',
         ]
         self.assertEqual(set(data.keys()), set(keys))
 
 
+class AppointmentValuesSerializerTest(TestCase):
+    def test_same_as_appointment_serializer(self):
+        organization_uuid = uuid.uuid4()
+        contact = contact_mfactories.Contact(contact_type=contact_mfactories.Type(name='Tenant'))
+        appointment = mfactories.Appointment(organization_uuid=organization_uuid, contact_uuid=contact.uuid,
+                                             invitee_uuids=[uuid.uuid4()], workflowlevel2_uuids=[uuid.uuid4()],
+                                             siteprofile_uuid=uuid.uuid4(), summary='Checked the heating.')
+        shared_note = AppointmentNote.objects.create(note='Bring the keys', type=2)
+        appointment.notes.add(AppointmentNote.objects.create(note='Wöhlertstraße 12'), shared_note)
+        mfactories.AppointmentDrivingTime(appointment=appointment, distance=12.5, time=25,
+                                          time_point=datetime(2018, 1, 1, 12, 5, 30, 123, tzinfo=pytz.UTC))
+        mfactories.AppointmentDrivingTime(appointment=appointment, distance=3, time=7)
+        other_appointment = mfactories.Appointment(organization_uuid=organization_uuid, contact_uuid=uuid.uuid4())
+        other_appointment.notes.add(shared_note)
+        mfactories.Appointment(organization_uuid=organization_uuid, contact_uuid=contact.uuid)
+        mfactories.Appointment(organization_uuid=organization_uuid)
+
+        queryset = Appointment.objects.filter(organization_uuid=organization_uuid).order_by('id')
+        context = {'request': Request(APIRequestFactory().get('/'))}
+        values_serializer = AppointmentValuesSerializer(context)
+        with self.assertNumQueries(4):
+            data = values_serializer.to_representation(values_serializer.get_values(queryset))
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(data),
+                         renderer.render(AppointmentSerializer(queryset, many=True, context=context).data))
+        self.assertEqual(len(data[0]['notes']), 2)
+        self.assertEqual(len(data[0]['driving_times']), 2)
+        self.assertEqual(data[0]['contact']['contact_type_name'], 'Tenant')
+        self.assertEqual([note['id'] for note in data[1]['notes']], [shared_note.pk])
+        self.assertIsNone(data[1]['contact'])
+
+
 class AppointmentDrivingTimeSerializerTest(TestCase):
 
     def test_contains_expected_fields(self):
@@ -52,5 +93,6 @@ class AppointmentDrivingTimeSerializerTest(TestCase):
             'distance',
             'appointment',
             'time_point',
+            'edit_date',
         ]
         self.assertEqual(set(data.keys()), set(keys))
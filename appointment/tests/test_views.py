@@ -1,11 +1,15 @@
 from collections import OrderedDict
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import re
 import uuid
+from urllib.parse import parse_qs, urlsplit
 
 from django.conf import settings
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.dateparse import parse_datetime
 import pytz
 from rest_framework.reverse import reverse
 from rest_framework.test import APIRequestFactory
@@ -143,6 +147,50 @@ class AppointmentListViewsTest(TestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Appointment 0')
         self.assertEqual(response.data['results'][1]['name'], 'Appointment 1')
 
+    def test_list_appointments_contacts_batched(self):
+        for _ in range(5):
+            contact = contact_mfactories.Contact(contact_type=contact_mfactories.Type())
+            mfactories.Appointment(contact_uuid=contact.uuid, organization_uuid=self.organization_uuid)
+        mfactories.Appointment(contact_uuid=None, organization_uuid=self.organization_uuid)
+
+        request = self.factory.get('')
+        request.user = self.user
+        request.session = self.session
+        view = AppointmentViewSet.as_view({'get': 'list'})
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(len([x for x in response.data['results'] if x['contact']]), 5)
+        contact_queries = [query for query in queries if 'FROM "contact_contact"' in query['sql']]
+        self.assertEqual(len(contact_queries), 1, contact_queries)
+        for table in ('appointment_appointmentnote', 'appointment_appointmentdrivingtime'):
+            related_queries = [query for query in queries if f'FROM "{table}"' in query['sql']]
+            self.assertEqual(len(related_queries), 1, related_queries)
+
+    def test_list_appointments_not_modified(self):
+        appointment = mfactories.Appointment(organization_uuid=self.organization_uuid)
+        view = AppointmentViewSet.as_view({'get': 'list'})
+        request = self.factory.get('')
+        request.user = self.user
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+
+        request = self.factory.get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        request.user = self.user
+        request.session = self.session
+        self.assertEqual(view(request).status_code, 304)
+
+        mfactories.AppointmentDrivingTime(appointment=appointment)
+        request = self.factory.get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        request.user = self.user
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results'][0]['driving_times']), 1)
+
     def test_list_appointments_filter_by_owner_me(self):
         user_other = uuid.uuid4()
         contact = contact_mfactories.Contact()
@@ -573,6 +621,149 @@ class AppointmentListViewsTest(TestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Appointment 0')
 
 
+class AppointmentExportViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+            'jwt_username': 'Test User',
+            'jwt_core_user_uuid': uuid.uuid4()
+        }
+
+    def _export(self):
+        request = self.factory.get('')
+        request.session = self.session
+        view = AppointmentViewSet.as_view({'get': 'export'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()], len(queries)
+
+    def _create_appointment(self):
+        contact = contact_mfactories.Contact()
+        appointment = mfactories.Appointment(organization_uuid=self.organization_uuid, contact_uuid=contact.uuid)
+        appointment.notes.add(AppointmentNote.objects.create(note='Test note'))
+        mfactories.AppointmentDrivingTime(appointment=appointment)
+        return appointment
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_batches_related_objects(self):
+        appointments = [self._create_appointment() for _ in range(2)]
+        mfactories.Appointment()
+        rows, queries = self._export()
+        self.assertEqual([row['uuid'] for row in rows], [str(x.uuid) for x in appointments])
+        self.assertTrue(all(row['contact'] and len(row['notes']) == len(row['driving_times']) == 1 for row in rows))
+
+        appointments.extend(self._create_appointment() for _ in range(4))
+        rows, more_queries = self._export()
+        self.assertEqual(len(rows), 6)
+        # Notes, driving times and contacts are looked up once per batch of 2 appointments, not per appointment
+        self.assertEqual(more_queries - queries, 3 * 2)
+
+
+class AppointmentSummaryViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.core_user_uuid = uuid.uuid4()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+            'jwt_username': 'Test User',
+            'jwt_core_user_uuid': self.core_user_uuid
+        }
+        self.berlin = pytz.timezone('Europe/Berlin')
+
+    def _create_appointment(self, start_date, minutes=60, **kwargs):
+        kwargs.setdefault('owner', self.core_user_uuid)
+        kwargs.setdefault('organization_uuid', self.organization_uuid)
+        start_date = self.berlin.localize(start_date)
+        return mfactories.Appointment(start_date=start_date, end_date=start_date + timedelta(minutes=minutes),
+                                      **kwargs)
+
+    def _summary(self, **params):
+        request = self.factory.get('', params)
+        request.session = self.session
+        view = AppointmentViewSet.as_view({'get': 'summary'})
+        return view(request)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_summary_per_day_across_dst_change(self):
+        # Summer time starts on 2019-03-31 at 02:00, midnight is 23:00 UTC before and 22:00 UTC after
+        self._create_appointment(datetime(2019, 3, 30, 23, 30))
+        self._create_appointment(datetime(2019, 3, 31, 0, 30), minutes=90)
+        self._create_appointment(datetime(2019, 3, 31, 23, 30))
+        self._create_appointment(datetime(2019, 3, 29, 23, 59))
+        self._create_appointment(datetime(2019, 4, 1, 0, 0))
+        other_owner = uuid.uuid4()
+        self._create_appointment(datetime(2019, 3, 31, 12, 0), owner=other_owner)
+        self._create_appointment(datetime(2019, 3, 31, 12, 0), organization_uuid=uuid.uuid4())
+
+        with self.assertNumQueries(2):
+            response = self._summary(start='2019-03-30', end='2019-03-31')
+        self.assertEqual(response.status_code, 200)
+        owner = str(self.core_user_uuid)
+        expected = sorted([
+            ('2019-03-30', owner, 1, 60),
+            ('2019-03-31', owner, 2, 150),
+            ('2019-03-31', str(other_owner), 1, 60),
+        ])
+        self.assertEqual([(str(row['date']), str(row['owner']), row['count'], row['duration'])
+                          for row in response.data['results']], expected)
+
+    def test_summary_per_month_of_invitees(self):
+        invitee_uuid = uuid.uuid4()
+        # Summer time ends on 2019-10-27 at 03:00, so the appointment lasts two hours
+        self._create_appointment(datetime(2019, 10, 27, 1, 30), minutes=120,
+                                 invitee_uuids=[self.core_user_uuid, invitee_uuid])
+        self._create_appointment(datetime(2019, 10, 31, 23, 30), invitee_uuids=[invitee_uuid])
+        self._create_appointment(datetime(2019, 11, 1, 0, 30), invitee_uuids=[invitee_uuid])
+        self._create_appointment(datetime(2019, 11, 2, 10, 0), invitee_uuids=None)
+
+        response = self._summary(start='2019-10-01', end='2019-11-30', granularity='month', group_by='invitee')
+        self.assertEqual(response.status_code, 200)
+        expected = sorted([
+            ('2019-10-01', str(self.core_user_uuid), 1, 120),
+            ('2019-10-01', str(invitee_uuid), 2, 180),
+        ]) + [('2019-11-01', str(invitee_uuid), 1, 60)]
+        self.assertEqual([(str(row['date']), str(row['invitee']), row['count'], row['duration'])
+                          for row in response.data['results']], expected)
+
+    def test_summary_applies_list_filters(self):
+        self._create_appointment(datetime(2019, 7, 1, 10, 0))
+        self._create_appointment(datetime(2019, 7, 3, 10, 0), owner=uuid.uuid4())
+
+        response = self._summary(start='2019-07-01', end='2019-07-07', granularity='week', owner='me')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(str(response.data['results'][0]['date']), '2019-07-01')
+        self.assertEqual(response.data['results'][0]['count'], 1)
+
+    def test_summary_not_modified(self):
+        self._create_appointment(datetime(2019, 7, 1, 10, 0))
+        response = self._summary(start='2019-07-01', end='2019-07-31')
+        self.assertEqual(response.status_code, 200)
+
+        request = self.factory.get('', {'start': '2019-07-01', 'end': '2019-07-31'},
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        request.session = self.session
+        response = AppointmentViewSet.as_view({'get': 'summary'})(request)
+        self.assertEqual(response.status_code, 304)
+
+    def test_summary_invalid_params(self):
+        response = self._summary(start='2019-07-01')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end', response.data)
+
+        response = self._summary(start='2019-07-02', end='2019-07-01', granularity='year')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('granularity', response.data)
+
+        response = self._summary(start='2019-07-02', end='2019-07-01')
+        self.assertEqual(response.status_code, 400)
+
+
 class AppointmentRetrieveViewsTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
@@ -614,6 +805,7 @@ class AppointmentRetrieveViewsTest(TestCase):
             appointment_data[field] = str(appointment_data[field])
 
         data = response.data
+        data['edit_date'] = parse_datetime(data['edit_date'])
 
         local = pytz.timezone(settings.TIME_ZONE)
         start_date_naive = datetime.strptime(
@@ -705,6 +897,7 @@ class AppointmentRetrieveViewsTest(TestCase):
             appointment_data[field] = str(appointment_data[field])
 
         data = response.data
+        data['edit_date'] = parse_datetime(data['edit_date'])
 
         local = pytz.timezone(settings.TIME_ZONE)
         start_date_naive = datetime.strptime(
@@ -1055,8 +1248,10 @@ class AppointmentUpdateViewsTest(TestCase):
         response = view(request, uuid=appointment.uuid).render()
         self.assertEqual(response.status_code, 200)
         self.assertEqual(json.loads(response.content)['notes'],
-                         [{"id": 1, "note": "Keep note test", "type": 1},
-                          {"id": 2, "note": "New note 2", "type": 2}])
+                         [{"id": 1, "note": "Keep note test", "type": 1,
+                           "edit_date": appointment_notes_1.edit_date.astimezone().isoformat()},
+                          {"id": 2, "note": "New note 2", "type": 2,
+                           "edit_date": AppointmentNote.objects.get(id=2).edit_date.astimezone().isoformat()}])
         self.assertEqual(AppointmentNote.objects.count(), 2)
 
     def test_update_appointment_with_an_empty_note(self):
@@ -1319,6 +1514,80 @@ class AppointmentNotificationCreateViewsTest(TestCase):
         self.assertEqual(len(mail.outbox), 1)
 
 
+class AppointmentNotificationListViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = contact_mfactories.User()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+            'jwt_username': 'Test User',
+            'jwt_core_user_uuid': str(uuid.uuid4())
+        }
+
+    def test_list_appointment_notifications(self):
+        for _ in range(3):
+            appointment = mfactories.Appointment(organization_uuid=self.organization_uuid)
+            mfactories.AppointmentNotification(appointment=appointment)
+        mfactories.AppointmentNotification(appointment=mfactories.Appointment(organization_uuid=uuid.uuid4()))
+
+        request = self.factory.get('')
+        request.user = self.user
+        request.session = self.session
+        view = AppointmentNotificationViewSet.as_view({'get': 'list'})
+        # The appointments of the hyperlinks are fetched with the notifications
+        with self.assertNumQueries(1):
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['next'], None)
+
+    def _list(self, **params):
+        request = self.factory.get('', params)
+        request.user = self.user
+        request.session = self.session
+        view = AppointmentNotificationViewSet.as_view({'get': 'list'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_appointment_notifications_paginated(self):
+        appointment = mfactories.Appointment(organization_uuid=self.organization_uuid)
+        notifications = [mfactories.AppointmentNotification(appointment=appointment) for _ in range(5)]
+
+        response = self._list(page_size=2)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [notification.id for notification in notifications[:2]])
+        cursor = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+        response = self._list(page_size=2, cursor=cursor)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [notification.id for notification in notifications[2:4]])
+
+        response = self._list(ordering='-id', page_size=2)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [notification.id for notification in notifications[:2:-1]])
+
+    def test_list_appointment_notifications_filtered(self):
+        appointment = mfactories.Appointment(organization_uuid=self.organization_uuid)
+        sent = mfactories.AppointmentNotification(appointment=appointment, recipient='Max@example.org',
+                                                  send_notification=True)
+        AppointmentNotification.objects.filter(pk=sent.pk).update(
+            sent_at=datetime(2019, 7, 1, 22, 30, tzinfo=pytz.UTC))
+        unsent = mfactories.AppointmentNotification(appointment=appointment)
+
+        response = self._list(send_notification='false')
+        self.assertEqual([item['id'] for item in response.data['results']], [unsent.id])
+
+        response = self._list(recipient='max@example.org')
+        self.assertEqual([item['id'] for item in response.data['results']], [sent.id])
+
+        # 22:30 UTC is on the next day in Berlin
+        response = self._list(sent_at_gte='2019-07-02', sent_at_lte='2019-07-02')
+        self.assertEqual([item['id'] for item in response.data['results']], [sent.id])
+        response = self._list(sent_at_lte='2019-07-01')
+        self.assertEqual(response.data['results'], [])
+
+
 class AppointmentNotificationRetrieveViewsTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
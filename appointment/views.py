@@ -1,20 +1,32 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 import django_filters
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, filters, mixins
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from crm.pagination import AppointmentCursorPagination
-from .filters import AppointmentFilter
+from contact.cache import types_version
+from crm.authentication import get_jwt_claims
+from crm.export import EXPORT_CONTENT_TYPES, render_csv
+from crm.mixins import AtomicWriteMixin, ConditionalGetMixin, ExportMixin, ProfilingMixin
+from crm.pagination import AppointmentCursorPagination, DrivingTimeCursorPagination
+from .filters import AppointmentFilter, AppointmentDrivingTimeFilter, AppointmentNotificationFilter
 from .models import Appointment, AppointmentNotification, AppointmentNote, AppointmentDrivingTime
 from .permissions import (OrganizationPermission,
                           AppointmentRelatedModelPermission, AppointmentNoteOrganizationPermission)
-from .serializers import (AppointmentSerializer,
+from .serializers import (AppointmentSerializer, AppointmentValuesSerializer, AppointmentSummaryQuerySerializer,
                           AppointmentNotificationSerializer, AppointmentNoteSerializer,
-                          AppointmentDrivingTimeSerializer)
+                          AppointmentDrivingTimeSerializer, AppointmentDrivingTimeValuesSerializer,
+                          AppointmentDrivingTimeReportQuerySerializer)
+from .summary import REPORT_GROUP_BY, report_driving_times, summarize
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(ProfilingMixin, AtomicWriteMixin, ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     """
     Appointments. A common use for them is to set events in a calendar.
 
@@ -30,23 +42,67 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     def list(self, request):
         # Use this or the ordering filter won't work
         queryset = self.filter_queryset(self.get_queryset())
-        organization_uuid = request.session.get('jwt_organization_uuid')
+        organization_uuid = get_jwt_claims(request).organization_uuid
         queryset = queryset.filter(organization_uuid=organization_uuid)
-        queryset = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(queryset, many=True)
-        return self.get_paginated_response(serializer.data)
+        not_modified_response = self.get_not_modified_response(queryset)
+        if not_modified_response is not None:
+            return not_modified_response
+        # Serialized from the values of the rows, without model instances and serializer fields
+        serializer = AppointmentValuesSerializer(self.get_serializer_context())
+        page = self.paginate_queryset(serializer.get_values(queryset))
+        return self.get_paginated_response(serializer.to_representation(page))
+
+    @swagger_auto_schema(method='get', query_serializer=AppointmentSummaryQuerySerializer)
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Counts the appointments starting from `start` to `end` and sums their durations in minutes per day, week or
+        month and per owner or invitee, e.g. for the month view of a calendar. The filters of the list apply.
+        """
+        query = AppointmentSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            organization_uuid=get_jwt_claims(request).organization_uuid,
+            # The days start at midnight in TIME_ZONE, which is 22:00 or 23:00 UTC depending on DST
+            start_date__gte=timezone.make_aware(datetime.combine(params['start'], time.min)),
+            start_date__lt=timezone.make_aware(datetime.combine(params['end'] + timedelta(days=1), time.min)),
+        )
+        not_modified_response = self.get_not_modified_response(queryset)
+        if not_modified_response is not None:
+            return not_modified_response
+        return Response({
+            'start': params['start'],
+            'end': params['end'],
+            'granularity': params['granularity'],
+            'group_by': params['group_by'],
+            'results': summarize(queryset, params['granularity'], params['group_by']),
+        })
+
+    def get_export_queryset(self):
+        organization_uuid = get_jwt_claims(self.request).organization_uuid
+        return super().get_export_queryset().filter(organization_uuid=organization_uuid)
+
+    def prepare_export_batch(self, batch):
+        prefetch_related_objects(batch, 'notes', 'driving_times')
+        return Appointment.prefetch_contacts(batch)
+
+    def get_validator_version(self):
+        # The names of the contact types are part of the nested contacts
+        return types_version(get_jwt_claims(self.request).organization_uuid)
 
     def perform_create(self, serializer):
-        core_user_uuid = self.request.session.get('jwt_core_user_uuid')
-        organization_uuid = self.request.session.get('jwt_organization_uuid')
-        serializer.save(owner=core_user_uuid,
-                        organization_uuid=organization_uuid)
+        claims = get_jwt_claims(self.request)
+        serializer.save(owner=claims.core_user_uuid,
+                        organization_uuid=claims.organization_uuid)
 
     def update(self, request, *args, **kwargs):
         kwargs['partial'] = True
         return super(AppointmentViewSet, self).update(request, *args, **kwargs)
 
     ordering_fields = ('id', 'start_date', 'end_date')
+    replica_actions = ('list', 'summary', 'export')
+    export_filename = 'appointments'
     lookup_field = 'uuid'
     ordering = ('id',)
     filter_class = AppointmentFilter
@@ -60,18 +116,19 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     permission_classes = (OrganizationPermission,)
 
 
-class AppointmentNotificationViewSet(viewsets.ModelViewSet):
+class AppointmentNotificationViewSet(ProfilingMixin, viewsets.ModelViewSet):
     """
     Appointment Notifications.
     """
     def list(self, request):
         # Use this or the ordering filter won't work
         queryset = self.filter_queryset(self.get_queryset())
-        organization_uuid = self.request.session.get('jwt_organization_uuid')
+        organization_uuid = get_jwt_claims(self.request).organization_uuid
         queryset = queryset.filter(
             appointment__organization_uuid=organization_uuid)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def update(self, request, *args, **kwargs):
         kwargs['partial'] = True
@@ -79,13 +136,23 @@ class AppointmentNotificationViewSet(viewsets.ModelViewSet):
                      self).update(request, *args, **kwargs)
 
     ordering_fields = ('id',)
-    filter_backends = (filters.OrderingFilter,)
-    queryset = AppointmentNotification.objects.all()
+    replica_actions = ('list',)
+    ordering = ('id',)
+    filter_class = AppointmentNotificationFilter
+    filter_backends = (
+        django_filters.rest_framework.DjangoFilterBackend,
+        filters.OrderingFilter
+    )
+    queryset = AppointmentNotification.objects.select_related('appointment')
     serializer_class = AppointmentNotificationSerializer
+    pagination_class = AppointmentCursorPagination
     permission_classes = (AppointmentRelatedModelPermission, )
 
 
-class AppointmentNoteViewSet(mixins.RetrieveModelMixin,
+class AppointmentNoteViewSet(ProfilingMixin,
+                             AtomicWriteMixin,
+                             ConditionalGetMixin,
+                             mixins.RetrieveModelMixin,
                              mixins.UpdateModelMixin,
                              mixins.DestroyModelMixin,
                              viewsets.GenericViewSet):
@@ -95,12 +162,69 @@ class AppointmentNoteViewSet(mixins.RetrieveModelMixin,
     serializer_class = AppointmentNoteSerializer
 
 
-class AppointmentDrivingTimeViewSet(mixins.RetrieveModelMixin,
+class AppointmentDrivingTimeViewSet(ProfilingMixin,
+                                    AtomicWriteMixin,
+                                    ConditionalGetMixin,
+                                    mixins.RetrieveModelMixin,
                                     mixins.CreateModelMixin,
                                     mixins.UpdateModelMixin,
                                     mixins.DestroyModelMixin,
                                     viewsets.GenericViewSet):
+    """
+    Driving times to appointments.
 
+    list:
+    Lists the driving times of the appointments of the user's organization by their time_point. Driving times
+    without a time_point aren't listed.
+    """
+    def list(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            appointment__organization_uuid=get_jwt_claims(request).organization_uuid, time_point__isnull=False)
+        not_modified_response = self.get_not_modified_response(queryset)
+        if not_modified_response is not None:
+            return not_modified_response
+        serializer = AppointmentDrivingTimeValuesSerializer(self.get_serializer_context())
+        page = self.paginate_queryset(serializer.get_values(queryset))
+        return self.get_paginated_response(serializer.to_representation(page))
+
+    def perform_content_negotiation(self, request, force=False):
+        # The report is rendered as JSON or CSV, chosen by the format parameter
+        return super().perform_content_negotiation(request, force=force or self.action == 'report')
+
+    @swagger_auto_schema(method='get', query_serializer=AppointmentDrivingTimeReportQuerySerializer)
+    @action(detail=False, methods=['get'])
+    def report(self, request):
+        """
+        Counts the driving times from `start` to `end` and sums their distances and times per day, week or month and
+        per owner and/or WorkflowLevel2 of their appointments, e.g. for payroll and mileage reports. Streamed as CSV
+        with `format=csv`.
+        """
+        query = AppointmentDrivingTimeReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            appointment__organization_uuid=get_jwt_claims(request).organization_uuid,
+            time_point__gte=timezone.make_aware(datetime.combine(params['start'], time.min)),
+            time_point__lt=timezone.make_aware(datetime.combine(params['end'] + timedelta(days=1), time.min)),
+        )
+        group_by = [name for name in REPORT_GROUP_BY if name in params['group_by']]
+        rows = report_driving_times(queryset, params['granularity'], group_by)
+        if params['format'] == 'csv':
+            fieldnames = ['date'] + group_by + ['count', 'distance', 'time']
+            response = StreamingHttpResponse(render_csv(rows, fieldnames), content_type=EXPORT_CONTENT_TYPES['csv'])
+            response['Content-Disposition'] = 'attachment; filename="driving-times.csv"'
+            return response
+        return Response({
+            'start': params['start'],
+            'end': params['end'],
+            'granularity': params['granularity'],
+            'group_by': group_by,
+            'results': rows,
+        })
+
+    replica_actions = ('list', 'report')
+    filter_class = AppointmentDrivingTimeFilter
+    pagination_class = DrivingTimeCursorPagination
     queryset = AppointmentDrivingTime.objects.all()
     serializer_class = AppointmentDrivingTimeSerializer
     permission_classes = (AppointmentRelatedModelPermission, )
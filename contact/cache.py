@@ -0,0 +1,59 @@
+import hashlib
+
+from django.db.models import Q
+
+from crm import cache
+
+GLOBAL_TYPES_VERSION = 'contact:types:global'
+
+
+def _organization_types_version(organization_uuid):
+    return 'contact:types:{}'.format(organization_uuid)
+
+
+def types_version(organization_uuid):
+    """
+    Returns a version that changes whenever a Type the organization has access to changes. Without a shared cache
+    it's a digest of the names of the Types, read from the database.
+    """
+    if not cache.is_shared():
+        type_names = sorted(get_type_names(organization_uuid).items())
+        return hashlib.sha256(repr(type_names).encode()).hexdigest()
+    return '{}:{}'.format(cache.get_version(_organization_types_version(organization_uuid)),
+                          cache.get_version(GLOBAL_TYPES_VERSION))
+
+
+def type_list_key(organization_uuid):
+    """
+    Returns the cache key of the Types an organization has access to.
+    """
+    return cache.versioned_key('contact:types:list:{}'.format(organization_uuid),
+                               _organization_types_version(organization_uuid), GLOBAL_TYPES_VERSION)
+
+
+def get_type_names(organization_uuid):
+    """
+    Returns the names of the Types an organization has access to by their UUID, only the global ones without an
+    organization.
+    """
+    from .models import Type
+
+    def type_names():
+        if organization_uuid is None:
+            types = Type.objects.filter(is_global=True)
+        else:
+            types = Type.objects.filter(Q(organization_uuid=organization_uuid) | Q(is_global=True))
+        return {str(uuid): name for uuid, name in types.values_list('uuid', 'name')}
+
+    key = cache.versioned_key('contact:types:names:{}'.format(organization_uuid),
+                              _organization_types_version(organization_uuid), GLOBAL_TYPES_VERSION)
+    return cache.get_or_set(key, type_names)
+
+
+def invalidate_types(organization_uuid, is_global):
+    """
+    Invalidates the cached Types of an organization, or of all organizations if the Type is global.
+    """
+    cache.bump_version(_organization_types_version(organization_uuid))
+    if is_global:
+        cache.bump_version(GLOBAL_TYPES_VERSION)
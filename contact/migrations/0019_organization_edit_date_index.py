@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0018_auto_20190624_1448'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['organization_uuid', 'edit_date'], name='contact_con_organiz_56722a_idx'),
+        ),
+    ]
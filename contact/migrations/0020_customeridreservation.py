@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0019_organization_edit_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerIdReservation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization_uuid', models.CharField(max_length=36, unique=True, verbose_name='Organization UUID')),
+                ('last_customer_id', models.IntegerField()),
+            ],
+        ),
+    ]
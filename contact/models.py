@@ -2,12 +2,16 @@ import uuid
 
 from django.contrib.postgres.fields import ArrayField, HStoreField
 from django.contrib.postgres.indexes import GinIndex
-from django.db.models import Q
+from django.db.models import Max, Q, Subquery
+from django.db.models.functions import Greatest
 from django.db.models.constraints import UniqueConstraint
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
-from .validators import validate_emails, validate_phones, validate_addresses
+from crm.models import OutboxModelMixin
+
+from .validators import (ADDRESS_TYPE_CHOICES, EMAIL_TYPE_CHOICES, PHONE_TYPE_CHOICES,
+                         validate_emails, validate_phones, validate_addresses)
 
 
 TITLE_CHOICES = (
@@ -25,27 +29,6 @@ CUSTOMER_TYPE_CHOICES = (
     ('public', 'Public'),
 )
 
-ADDRESS_TYPE_CHOICES = (
-    'home',
-    'billing',
-    'business',
-    'delivery',
-    'mailing',
-)
-
-PHONE_TYPE_CHOICES = (
-    'office',
-    'mobile',
-    'home',
-    'fax',
-)
-
-EMAIL_TYPE_CHOICES = (
-    'office',
-    'private',
-    'other',
-)
-
 
 class Type(models.Model):
     """
@@ -61,7 +44,19 @@ class Type(models.Model):
         return self.name
 
 
-class Contact(models.Model):
+class CustomerIdReservation(models.Model):
+    """
+    The last customer_id of an organization reserved for an import, so contacts created meanwhile don't take the
+    customer_ids the import is going to set.
+    """
+    organization_uuid = models.CharField(max_length=36, unique=True, verbose_name='Organization UUID')
+    last_customer_id = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.organization_uuid}: {self.last_customer_id}"
+
+
+class Contact(OutboxModelMixin, models.Model):
     """
     A Contact is a data model for an individual with common contact information.
     You can extend a BiFrost CoreUser by creating a one-to-one relationship between a Contact and a CoreUser
@@ -129,16 +124,36 @@ class Contact(models.Model):
         return f"{self.first_name} {self.last_name}"
 
     def get_default_customer_id(self) -> str:
-        """Figure out next free unique customer_id and return it."""
+        """Figure out next free unique customer_id and return it, skipping the ones reserved by an import."""
         start_index = 10001
-        try:
-            latest_customer_id = self.__class__.objects.filter(
-                organization_uuid=self.organization_uuid).exclude(
-                customer_id=None).order_by('-customer_id').first().customer_id
-            next_customer_id = latest_customer_id + 1 if latest_customer_id else start_index
-        except AttributeError:
-            next_customer_id = start_index
-        return next_customer_id
+        reserved = CustomerIdReservation.objects.filter(
+            organization_uuid=self.organization_uuid).values('last_customer_id')
+        latest_customer_id = self.__class__.objects.filter(organization_uuid=self.organization_uuid).aggregate(
+            latest=Greatest(Max('customer_id'), Subquery(reserved)))['latest']
+        return latest_customer_id + 1 if latest_customer_id else start_index
+
+    @classmethod
+    def reserve_customer_ids(cls, organization_uuid, count, minimum=0):
+        """
+        Reserves `count` consecutive free customer_ids of the organization, starting at `minimum` or later, and returns
+        the first one. New contacts get customer_ids after the reserved ones, even before these are used.
+        """
+        with transaction.atomic():
+            reservation, _ = CustomerIdReservation.objects.select_for_update().get_or_create(
+                organization_uuid=organization_uuid, defaults={'last_customer_id': 0})
+            first_customer_id = max(cls(organization_uuid=organization_uuid).get_default_customer_id(), minimum)
+            reservation.last_customer_id = first_customer_id + count - 1
+            reservation.save()
+        return first_customer_id
+
+    @classmethod
+    def release_customer_ids(cls, organization_uuid, last_customer_id):
+        """
+        Releases the customer_ids reserved up to `last_customer_id`, so new contacts get the ones left unused again.
+        Keeps the reservation if another import reserved customer_ids after them meanwhile.
+        """
+        CustomerIdReservation.objects.filter(organization_uuid=organization_uuid,
+                                             last_customer_id=last_customer_id).delete()
 
     def save(self, **kwargs):
         if not self.customer_id:
@@ -149,6 +164,7 @@ class Contact(models.Model):
         indexes = [
             GinIndex(fields=['workflowlevel1_uuids']),
             GinIndex(fields=['workflowlevel2_uuids']),
+            models.Index(fields=['organization_uuid', 'edit_date']),
         ]
         constraints = [
             UniqueConstraint(
@@ -1,4 +1,5 @@
 from rest_framework.exceptions import PermissionDenied
+from crm.authentication import get_jwt_claims
 from crm.permissions import AllowOptionsAuthentication
 
 
@@ -11,9 +12,7 @@ class ContactPermission(AllowOptionsAuthentication):
             return True
 
         organization_uuid = str(obj.organization_uuid)
-        if getattr(request, 'session', None) and \
-                request.session.get('jwt_organization_uuid') == \
-                organization_uuid:
+        if get_jwt_claims(request).organization_uuid == organization_uuid:
             return True
         else:
             raise PermissionDenied('User is not in the same organization as '
@@ -1,4 +1,8 @@
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from crm.values import ValuesSerializer
+from .cache import get_type_names
 from .models import Contact, Type
 
 
@@ -9,17 +13,52 @@ class TypeSerializer(serializers.ModelSerializer):
         exclude = ('organization_uuid', )
 
 
+class ContactTypeNameField(serializers.CharField):
+    """
+    Name of the Contact's Type, looked up in the cached Type names of the Contact's organization.
+    """
+    def get_attribute(self, instance):
+        if instance.contact_type_id is None:
+            raise SkipField()
+
+        # The field is shared by all rows of a list, so the names are fetched once per organization and page
+        if not hasattr(self, '_type_names'):
+            self._type_names = {}
+        type_names = self._type_names
+        # Contacts without an organization only have access to the global Types
+        organization_uuid = instance.organization_uuid and str(instance.organization_uuid)
+        if organization_uuid not in type_names:
+            type_names[organization_uuid] = get_type_names(organization_uuid)
+        name = type_names[organization_uuid].get(str(instance.contact_type_id))
+        if name is None:
+            name = instance.contact_type.name
+        return name
+
+
 class ContactSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
     organization_uuid = serializers.ReadOnlyField()
     title_display = serializers.CharField(source='get_title_display', read_only=True)
-    contact_type_name = serializers.CharField(read_only=True, source='contact_type.name')
+    contact_type_name = ContactTypeNameField(read_only=True)
 
     class Meta:
         model = Contact
         exclude = ('core_user_uuid', )
 
 
+class ContactValuesSerializer(ValuesSerializer):
+    """
+    ContactSerializer of `.values()` rows, for lists.
+    """
+    serializer_class = ContactSerializer
+
+    def compile_field(self, name, field):
+        if isinstance(field, ContactTypeNameField):
+            # Joined instead of looked up in the cache, omitted without a type
+            return 'contact_type__name', None, True
+        return super().compile_field(name, field)
+
+
 class ContactNameSerializer(serializers.ModelSerializer):
     uuid = serializers.ReadOnlyField()
 
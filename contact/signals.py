@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_types
+from .models import Type
+
+
+@receiver(pre_save, sender=Type)
+def pre_save_handler_type(sender, instance, *args, **kwargs):
+    # Remember the stored organization and scope, the cached Types of both need to be invalidated
+    instance._stored_type = Type.objects.filter(pk=instance.pk).values('organization_uuid', 'is_global').first()
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+def post_write_handler_type(sender, instance, *args, **kwargs):
+    stored_type = getattr(instance, '_stored_type', None)
+    if stored_type:
+        invalidate_types(stored_type['organization_uuid'], stored_type['is_global'])
+    invalidate_types(instance.organization_uuid, instance.is_global)
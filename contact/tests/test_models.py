@@ -239,6 +239,34 @@ class ContactTest(TestCase):
         self.assertEqual(contact.customer_id, 10001)
         self.assertEqual(contact2.customer_id, 10002)
 
+    def test_reserve_customer_ids(self):
+        organization_uuid = str(uuid.uuid4())
+        Contact.objects.create(organization_uuid=organization_uuid, workflowlevel1_uuids=[str(uuid.uuid4)],
+                               customer_id=10005)
+        self.assertEqual(Contact.reserve_customer_ids(organization_uuid, 10), 10006)
+        self.assertEqual(Contact.reserve_customer_ids(organization_uuid, 5, minimum=20000), 20000)
+
+        # Contacts created meanwhile skip the reserved customer_ids, other organizations are not affected
+        contact = Contact.objects.create(organization_uuid=organization_uuid, workflowlevel1_uuids=[str(uuid.uuid4)])
+        self.assertEqual(contact.customer_id, 20005)
+        contact = Contact.objects.create(organization_uuid=str(uuid.uuid4()), workflowlevel1_uuids=[str(uuid.uuid4)])
+        self.assertEqual(contact.customer_id, 10001)
+
+    def test_release_customer_ids(self):
+        organization_uuid = str(uuid.uuid4())
+        first_customer_id = Contact.reserve_customer_ids(organization_uuid, 10)
+        Contact.objects.create(organization_uuid=organization_uuid, workflowlevel1_uuids=[str(uuid.uuid4)],
+                               customer_id=first_customer_id)
+
+        # Not released while another import reserved customer_ids after them
+        second_customer_id = Contact.reserve_customer_ids(organization_uuid, 5)
+        Contact.release_customer_ids(organization_uuid, first_customer_id + 9)
+        self.assertEqual(Contact(organization_uuid=organization_uuid).get_default_customer_id(), 10016)
+
+        Contact.release_customer_ids(organization_uuid, second_customer_id + 4)
+        with self.assertNumQueries(1):
+            self.assertEqual(Contact(organization_uuid=organization_uuid).get_default_customer_id(), 10002)
+
     def test_unique_customer_id(self):
         organization_uuid = str(uuid.uuid4())
         Contact.objects.create(organization_uuid=organization_uuid,
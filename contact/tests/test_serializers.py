@@ -1,9 +1,17 @@
-from django.test import TestCase
+import uuid
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIRequestFactory
 from rest_framework.request import Request
 
+from crm.values import ValuesSerializer
 from . import model_factories as mfactories
-from ..serializers import ContactSerializer, ContactNameSerializer
+from ..models import Contact
+from ..serializers import ContactSerializer, ContactNameSerializer, ContactValuesSerializer
 
 
 class ContactSerializerTest(TestCase):
@@ -60,6 +68,28 @@ class ContactSerializerTest(TestCase):
         extended_keys = self.keys + ['contact_type_name']
         self.assertEqual(set(data.keys()), set(extended_keys))
 
+    @override_settings(CACHE_SHARED=True)
+    def test_contact_type_name_cached(self):
+        org_type = mfactories.Type(name='Supplier')
+        contacts = [mfactories.Contact(contact_type=org_type, organization_uuid=org_type.organization_uuid)
+                    for _ in range(3)]
+        serializer_context = {'request': Request(self.factory.get('/'))}
+
+        with self.assertNumQueries(1):
+            data = ContactSerializer(contacts, many=True, context=serializer_context).data
+        self.assertEqual([x['contact_type_name'] for x in data], ['Supplier'] * 3)
+
+        with self.assertNumQueries(0):
+            data = ContactSerializer(contacts, many=True, context=serializer_context).data
+        self.assertEqual([x['contact_type_name'] for x in data], ['Supplier'] * 3)
+
+    def test_contact_type_name_without_organization(self):
+        global_type = mfactories.Type(name='Customer', is_global=True)
+        contact = mfactories.Contact(contact_type=global_type, organization_uuid=None)
+        serializer_context = {'request': Request(self.factory.get('/'))}
+        data = ContactSerializer(contact, context=serializer_context).data
+        self.assertEqual(data['contact_type_name'], 'Customer')
+
     def test_title_display_field(self):
         contact = mfactories.Contact(title='mr')
         request = self.factory.get('/')
@@ -69,6 +99,53 @@ class ContactSerializerTest(TestCase):
         self.assertEqual(serializer['title_display'].value, "Mr.")
 
 
+class ContactValuesSerializerTest(TestCase):
+    def setUp(self):
+        organization_uuid = str(uuid.uuid4())
+        mfactories.Contact(organization_uuid=organization_uuid, contact_type=mfactories.Type(name='Tenant'),
+                           addresses=[{'type': 'home', 'street': 'Wöhlertstraße', 'house_number': '12'}],
+                           siteprofile_uuids=[uuid.uuid4()], workflowlevel2_uuids=[str(uuid.uuid4())])
+        mfactories.Contact(organization_uuid=organization_uuid, title=None, customer_type='',
+                           phones=[{'type': 'mobile', 'number': '+49 30 1234567'}])
+        mfactories.Contact(organization_uuid=organization_uuid, title='', middle_name='Eunice', suffix='dr.')
+        self.queryset = Contact.objects.filter(organization_uuid=organization_uuid).order_by('id')
+        self.context = {'request': Request(APIRequestFactory().get('/'))}
+
+    def _render(self):
+        renderer = JSONRenderer()
+        values_serializer = ContactValuesSerializer(self.context)
+        return (renderer.render(ContactSerializer(self.queryset, many=True, context=self.context).data),
+                renderer.render(values_serializer.to_representation(values_serializer.get_values(self.queryset))))
+
+    def test_same_as_contact_serializer(self):
+        expected, content = self._render()
+        self.assertIn('"contact_type_name":"Tenant"'.encode(), content)
+        self.assertEqual(content, expected)
+
+    def test_same_as_contact_serializer_in_utc(self):
+        with timezone.override('UTC'):
+            expected, content = self._render()
+        self.assertIn(b'Z"', content)
+        self.assertEqual(content, expected)
+
+    def test_unsupported_field(self):
+        class ContactGreetingSerializer(serializers.ModelSerializer):
+            greeting = serializers.SerializerMethodField()
+
+            def get_greeting(self, obj):
+                return f'Hello {obj.first_name}'
+
+            class Meta:
+                model = Contact
+                fields = ('id', 'greeting')
+
+        class ContactGreetingValuesSerializer(ValuesSerializer):
+            serializer_class = ContactGreetingSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            ContactGreetingValuesSerializer()
+
+
 class ContactNameSerializerTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.test import SimpleTestCase
+
+from .. import validators
+
+
+class ContactArrayValidatorsTest(SimpleTestCase):
+    def test_schemas_built_once(self):
+        with mock.patch('contact.validators.Schema') as schema:
+            validators.validate_addresses([{'type': 'home', 'street': 'Wöhlertstraße'}])
+            validators.validate_emails([{'type': 'office', 'email': 'contact@example.com'}])
+            validators.validate_phones([{'type': 'mobile', 'number': '+49 30 1234567'}])
+        schema.assert_not_called()
+
+    def test_validator_stops_at_first_error(self):
+        with self.assertRaises(ValidationError) as context:
+            validators.validate_emails([{'type': 'office', 'email': 'bad'}, {'type': 'fax', 'email': 'a@b.de'}])
+        self.assertEqual(context.exception.messages, ['Enter a valid email address.'])
+
+    def test_validate_email_without_address(self):
+        with self.assertRaises(ValidationError):
+            validators.validate_emails([{'type': 'office'}])
+
+    def test_validate_contact_arrays(self):
+        contacts = [
+            {'first_name': 'David', 'emails': [{'type': 'office', 'email': 'contact@bowie.co.uk'}],
+             'phones': None},
+            {'addresses': [{'type': 'home', 'city': 'Berlin'}, {'type': 'castle'}],
+             'emails': [{'type': 'office', 'email': 'bad'}, {'type': 'fax', 'email': 'simone@label.com'}],
+             'phones': [{'type': 'mobile', 'number': '01'}]},
+            {'emails': [{'type': 'private', 'email': 'bad'}]},
+        ]
+
+        errors = validators.validate_contact_arrays(contacts)
+
+        self.assertEqual(set(errors), {1, 2})
+        self.assertEqual(set(errors[1]), {'addresses', 'emails', 'phones'})
+        self.assertEqual(len(errors[1]['addresses']), 1)
+        self.assertTrue(errors[1]['addresses'][0].startswith("Invalid value: {'type': 'castle'}."))
+        self.assertEqual(errors[1]['emails'][0], 'Enter a valid email address.')
+        self.assertTrue(errors[1]['emails'][1].startswith("Invalid value: {'type': 'fax', "))
+        self.assertTrue(errors[1]['phones'][0].startswith("Invalid value: {'type': 'mobile', 'number': '01'}."))
+        self.assertEqual(errors[2], {'emails': ['Enter a valid email address.']})
+
+    def test_validate_contact_arrays_valid(self):
+        contacts = [{'emails': [{'type': 'office', 'email': 'contact@example.com'}]}] * 3
+        with mock.patch('contact.validators.validate_email', side_effect=validate_email) as validate:
+            self.assertEqual(validators.validate_contact_arrays(contacts), {})
+        # Every address is validated once per batch
+        validate.assert_called_once_with('contact@example.com')
@@ -1,13 +1,18 @@
+import csv
 import json
+import time
 import uuid
 
-from django.db import transaction, IntegrityError
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection, transaction, IntegrityError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
 
 from rest_framework.test import APIRequestFactory
 
 from . import model_factories as mfactories
-from ..models import Contact, EMAIL_TYPE_CHOICES, PHONE_TYPE_CHOICES
+from ..models import Contact, EMAIL_TYPE_CHOICES, PHONE_TYPE_CHOICES, Type
 from ..views import ContactViewSet
 
 
@@ -109,6 +114,94 @@ class ContactListViewsTest(TestCase):
         self.assertEqual(len(response.data['results']), 50)
         self.assertEqual(response.data['next'], 'http://testserver/?limit=50&offset=50')
 
+    def _count_list_queries(self):
+        request = self.factory.get('')
+        request.user = self.user
+        request.session = self.session
+        view = ContactViewSet.as_view({'get': 'list'})
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        return len(response.data['results']), len(queries)
+
+    def test_list_contacts_query_count(self):
+        # Types of another organization aren't in the cached Type names and are joined instead
+        mfactories.Contact(organization_uuid=self.organization_uuid, contact_type=mfactories.Type())
+        cache.clear()
+        results, queries = self._count_list_queries()
+        self.assertEqual(results, 1)
+
+        for _ in range(20):
+            mfactories.Contact(organization_uuid=self.organization_uuid, contact_type=mfactories.Type())
+        cache.clear()
+        self.assertEqual(self._count_list_queries(), (21, queries))
+
+    def _list(self, **headers):
+        request = self.factory.get('', **headers)
+        request.user = self.user
+        request.session = self.session
+        view = ContactViewSet.as_view({'get': 'list'})
+        return view(request)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_list_contacts_not_modified(self):
+        contact = mfactories.Contact(organization_uuid=self.organization_uuid)
+        mfactories.Contact(organization_uuid=self.organization_uuid)
+        response = self._list()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        contact.first_name = 'Changed'
+        contact.save()
+        response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        contact.delete()
+        response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_list_contacts_if_modified_since_after_delete(self):
+        contact = mfactories.Contact(organization_uuid=self.organization_uuid)
+        mfactories.Contact(organization_uuid=self.organization_uuid)
+        if_modified_since = http_date(time.time() + 60)
+        contact.delete()
+
+        response = self._list(HTTP_IF_MODIFIED_SINCE=if_modified_since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_list_contacts_type_changed_by_another_worker(self):
+        contact_type = mfactories.Type(organization_uuid=self.organization_uuid)
+        mfactories.Contact(organization_uuid=self.organization_uuid, contact_type=contact_type)
+        etag = self._list()['ETag']
+
+        # Without the signals that bump the version in the cache of this process
+        Type.objects.filter(pk=contact_type.pk).update(name='Changed')
+        response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['contact_type_name'], 'Changed')
+
+    def test_list_contacts_modified_contact_type(self):
+        contact_type = mfactories.Type(organization_uuid=self.organization_uuid)
+        mfactories.Contact(organization_uuid=self.organization_uuid, contact_type=contact_type)
+        etag = self._list()['ETag']
+
+        contact_type.name = 'Changed'
+        contact_type.save()
+        response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['contact_type_name'], 'Changed')
+
     def test_list_contacts_diff_user_same_org(self):
         mfactories.Contact(
             first_name='David',
@@ -336,6 +429,13 @@ class ContactRetrieveViewsTest(TestCase):
         response = view(request, pk=contact.pk)
 
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], http_date(contact.edit_date.timestamp()))
+
+        request = self.factory.get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        request.user = self.user
+        request.session = self.session
+        response = view(request, pk=contact.pk)
+        self.assertEqual(response.status_code, 304)
 
     def test_retrieve_contact_superuser(self):
         contact = mfactories.Contact(core_user_uuid=uuid.uuid4())
@@ -916,3 +1016,60 @@ class ContactDeleteViewsTest(TestCase):
         response = view(request, pk=contact.pk)
 
         self.assertEquals(response.status_code, 403)
+
+
+class ContactExportViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+            'jwt_username': 'Test User',
+            'jwt_core_user_uuid': uuid.uuid4()
+        }
+
+    def _export(self, query=''):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = ContactViewSet.as_view({'get': 'export'})
+        return view(request)
+
+    def test_export_ndjson(self):
+        contact_type = mfactories.Type(name='Supplier', organization_uuid=self.organization_uuid)
+        contacts = [mfactories.Contact(organization_uuid=self.organization_uuid, first_name=first_name,
+                                       contact_type=contact_type)
+                    for first_name in ('Nina', 'David')]
+        mfactories.Contact()
+
+        response = self._export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="contacts.ndjson"')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['uuid'] for row in rows], [str(contacts[1].uuid), str(contacts[0].uuid)])
+        self.assertEqual([row['contact_type_name'] for row in rows], ['Supplier', 'Supplier'])
+
+    def test_export_csv(self):
+        contact = mfactories.Contact(organization_uuid=self.organization_uuid, first_name='Nina',
+                                     emails=[{'type': 'office', 'email': 'nina@example.com'}])
+
+        response = self._export('?format=csv&first_name=Nina')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['uuid'], str(contact.uuid))
+        self.assertEqual(json.loads(rows[0]['emails']), [{'type': 'office', 'email': 'nina@example.com'}])
+        self.assertEqual(rows[0]['contact_type_name'], '')
+
+    def test_export_invalid_format(self):
+        response = self._export('?format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_anonymoususer(self):
+        request = self.factory.get('')
+        view = ContactViewSet.as_view({'get': 'export'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
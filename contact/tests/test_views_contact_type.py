@@ -1,7 +1,8 @@
 import json
 import uuid
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 from rest_framework.test import APIRequestFactory
 
@@ -21,6 +22,7 @@ class ContactTypeBaseViewsTest(TestCase):
             'jwt_core_user_uuid': uuid.uuid4(),
             'jwt_username': 'Test User',
         }
+        cache.clear()
 
 
 class ContactTypeListViewsTest(ContactTypeBaseViewsTest):
@@ -54,6 +56,41 @@ class ContactTypeListViewsTest(ContactTypeBaseViewsTest):
         self.assertIn(str(org_global_type.uuid), response_uuids)
         self.assertNotIn(str(another_org_not_global_type.uuid), response_uuids)
 
+    def _list(self):
+        request = self.factory.get('')
+        request.user = self.user
+        request.session = self.session
+        view = TypeViewSet.as_view({'get': 'list'})
+        return view(request)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_list_cached(self):
+        org_type = mfactories.Type(organization_uuid=self.organization_uuid)
+        self.assertEqual(len(self._list().data), 1)
+
+        with self.assertNumQueries(0):
+            response = self._list()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['uuid'], str(org_type.uuid))
+
+    def test_list_cache_invalidated_on_type_write(self):
+        org_type = mfactories.Type(organization_uuid=self.organization_uuid)
+        self.assertEqual(len(self._list().data), 1)
+
+        global_type = mfactories.Type(is_global=True)
+        self.assertEqual(len(self._list().data), 2)
+
+        org_type.name = 'Renamed'
+        org_type.save()
+        self.assertIn('Renamed', [x['name'] for x in self._list().data])
+
+        global_type.is_global = False
+        global_type.save()
+        self.assertEqual(len(self._list().data), 1)
+
+        org_type.delete()
+        self.assertEqual(len(self._list().data), 0)
+
 
 class ContactTypeCreateViewsTest(ContactTypeBaseViewsTest):
 
@@ -5,61 +5,118 @@ from voluptuous.error import MultipleInvalid
 
 from . import models
 
+ADDRESS_TYPE_CHOICES = (
+    'home',
+    'billing',
+    'business',
+    'delivery',
+    'mailing',
+)
+
+PHONE_TYPE_CHOICES = (
+    'office',
+    'mobile',
+    'home',
+    'fax',
+)
+
+EMAIL_TYPE_CHOICES = (
+    'office',
+    'private',
+    'other',
+)
+
+ADDRESS_SCHEMA = Schema({
+    'type': All(Any(str), Any(*ADDRESS_TYPE_CHOICES)),
+    'street': All(Any(str), Length(max=100)),
+    'house_number': All(Any(str), Length(max=20)),
+    'postal_code': All(Any(str), Length(max=20)),
+    'city': All(Any(str), Length(max=85)),
+    'country': All(Any(str), Length(max=50)),
+})
+
+EMAIL_SCHEMA = Schema({
+    'type': All(Any(str), Any(*EMAIL_TYPE_CHOICES)),
+    'email': All(Any(str), Length(min=3, max=254)),
+})
+
+PHONE_SCHEMA = Schema({
+    'type': All(Any(str), Any(*PHONE_TYPE_CHOICES)),
+    'number': All(Any(str), Length(min=3, max=20)),
+})
+
+# Schema of the elements of the array fields of a Contact, and the key of an element that's an email address
+ARRAY_FIELD_SCHEMAS = {
+    'addresses': (ADDRESS_SCHEMA, None),
+    'emails': (EMAIL_SCHEMA, 'email'),
+    'phones': (PHONE_SCHEMA, None),
+}
+
 
 def _get_clean_help_text(model, field_name):
     help_text = model._meta.get_field(field_name).help_text
     return ' '.join(help_text.split())
 
 
-def validate_addresses(values):
-    schema = Schema({
-        'type': All(Any(str), Any(*models.ADDRESS_TYPE_CHOICES)),
-        'street': All(Any(str), Length(max=100)),
-        'house_number': All(Any(str), Length(max=20)),
-        'postal_code': All(Any(str), Length(max=20)),
-        'city': All(Any(str), Length(max=85)),
-        'country': All(Any(str), Length(max=50)),
-    })
+def _iter_errors(field_name, values, email_errors=None):
+    """
+    Yields a ValidationError for every invalid element of the values of the array field. `email_errors` caches the
+    result of validating an email address, e.g. across the contacts of a batch.
+    """
+    schema, email_key = ARRAY_FIELD_SCHEMAS[field_name]
+    if email_errors is None:
+        email_errors = {}
     for value in values:
         try:
             schema(value)
         except MultipleInvalid:
-            help_text = _get_clean_help_text(models.Contact, 'addresses')
-            raise ValidationError(
+            yield ValidationError(
                 'Invalid value: %(value)s. %(help_text)s',
-                params={'value': value, 'help_text': help_text},
+                params={'value': value, 'help_text': _get_clean_help_text(models.Contact, field_name)},
                 code='invalid')
+            continue
+
+        if email_key:
+            email = value.get(email_key)
+            if email not in email_errors:
+                try:
+                    validate_email(email)
+                except ValidationError as error:
+                    email_errors[email] = error
+                else:
+                    email_errors[email] = None
+            if email_errors[email] is not None:
+                yield email_errors[email]
+
+
+def validate_addresses(values):
+    for error in _iter_errors('addresses', values):
+        raise error
 
 
 def validate_emails(values):
-    schema = Schema({
-        'type': All(Any(str), Any(*models.EMAIL_TYPE_CHOICES)),
-        'email': All(Any(str), Length(min=3, max=254)),
-    })
-    for value in values:
-        try:
-            schema(value)
-        except MultipleInvalid:
-            help_text = _get_clean_help_text(models.Contact, 'emails')
-            raise ValidationError(
-                'Invalid value: %(value)s. %(help_text)s',
-                params={'value': value, 'help_text': help_text},
-                code='invalid')
-        else:
-            validate_email(value['email'])
+    for error in _iter_errors('emails', values):
+        raise error
 
 
 def validate_phones(values):
-    schema = Schema({
-        'type': All(Any(str), Any(*models.PHONE_TYPE_CHOICES)),
-        'number': All(Any(str), Length(min=3, max=20)),
-    })
-    for value in values:
-        try:
-            schema(value)
-        except MultipleInvalid:
-            help_text = _get_clean_help_text(models.Contact, 'phones')
-            raise ValidationError(
-                'Invalid value: %(value)s. %(help_text)s',
-                params={'value': value, 'help_text': help_text},
-                code='invalid')
+    for error in _iter_errors('phones', values):
+        raise error
+
+
+def validate_contact_arrays(contacts):
+    """
+    Validates the addresses, emails and phones of a list of contact dicts, e.g. the rows of an import, in one pass.
+    Unlike the validators of the fields, which stop at the first invalid element, it returns the messages of all
+    invalid elements by index of the contact and field, e.g. `{3: {'emails': ['Enter a valid email address.']}}`,
+    or an empty dict if all are valid.
+    """
+    errors = {}
+    email_errors = {}
+    for index, contact in enumerate(contacts):
+        for field_name in ARRAY_FIELD_SCHEMAS:
+            messages = [message for error in _iter_errors(field_name, contact.get(field_name) or (), email_errors)
+                        for message in error.messages]
+            if messages:
+                errors.setdefault(index, {})[field_name] = messages
+    return errors
@@ -1,54 +1,84 @@
 from rest_framework import viewsets, filters as drf_filters
+from rest_framework.response import Response
 from django_filters import rest_framework as django_filters
 
-from crm.mixins import OrganizationQuerySetWithGlobalFilterMixin, OrganizationExtensionMixin
+from crm import cache as crm_cache
+from crm.authentication import get_jwt_claims
+from crm.mixins import (AtomicWriteMixin, ConditionalGetMixin, ExportMixin, OrganizationQuerySetWithGlobalFilterMixin,
+                        OrganizationExtensionMixin, ProfilingMixin)
 from crm.pagination import ContactLimitOffsetPagination
+from .cache import type_list_key, types_version
 from .models import Contact, Type
 from .permissions import ContactPermission
-from .serializers import ContactSerializer, TypeSerializer
+from .serializers import ContactSerializer, ContactValuesSerializer, TypeSerializer
 from . import filters
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(ProfilingMixin, AtomicWriteMixin, ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     """
     User's contacts.
     """
     def list(self, request):
         # Use this or the ordering filter won't work
         queryset = self.filter_queryset(self.get_queryset())
-        organization_uuid = request.session.get('jwt_organization_uuid')
+        organization_uuid = get_jwt_claims(request).organization_uuid
         queryset = queryset.filter(organization_uuid=organization_uuid)
-        queryset = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(queryset, many=True)
-        return self.get_paginated_response(serializer.data)
+        not_modified_response = self.get_not_modified_response(queryset)
+        if not_modified_response is not None:
+            return not_modified_response
+        # Serialized from the values of the rows, without model instances and serializer fields
+        serializer = ContactValuesSerializer(self.get_serializer_context())
+        page = self.paginate_queryset(serializer.get_values(queryset))
+        return self.get_paginated_response(serializer.to_representation(page))
+
+    def get_export_queryset(self):
+        organization_uuid = get_jwt_claims(self.request).organization_uuid
+        return super().get_export_queryset().filter(organization_uuid=organization_uuid)
+
+    def get_validator_version(self):
+        # contact_type_name isn't covered by the edit_date of the contacts
+        return types_version(get_jwt_claims(self.request).organization_uuid)
 
     def perform_create(self, serializer):
-        core_user_uuid = self.request.session.get('jwt_core_user_uuid')
-        organization_uuid = self.request.session.get('jwt_organization_uuid')
-        serializer.save(core_user_uuid=core_user_uuid,
-                        organization_uuid=organization_uuid)
+        claims = get_jwt_claims(self.request)
+        serializer.save(core_user_uuid=claims.core_user_uuid,
+                        organization_uuid=claims.organization_uuid)
 
     def update(self, request, *args, **kwargs):
         kwargs['partial'] = True
         return super(ContactViewSet, self).update(request, *args, **kwargs)
 
     ordering = ('first_name',)
+    replica_actions = ('list', 'export')
+    export_filename = 'contacts'
     filter_backends = (drf_filters.OrderingFilter,
                        drf_filters.SearchFilter,
                        django_filters.DjangoFilterBackend,
                        filters.StartsWithSearchFilter,)
     filter_class = filters.ContactFilter
     search_fields = ('first_name', 'last_name')
-    queryset = Contact.objects.all()
+    queryset = Contact.objects.select_related('contact_type')
     serializer_class = ContactSerializer
     permission_classes = (ContactPermission,)
     pagination_class = ContactLimitOffsetPagination
 
 
-class TypeViewSet(OrganizationQuerySetWithGlobalFilterMixin,
+class TypeViewSet(ProfilingMixin,
+                  OrganizationQuerySetWithGlobalFilterMixin,
                   OrganizationExtensionMixin,
                   viewsets.ModelViewSet):
 
+    def list(self, request, *args, **kwargs):
+        # Types rarely change, the default list of an organization is served from the cache
+        organization_uuid = get_jwt_claims(request).organization_uuid
+        if not organization_uuid or request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        data = crm_cache.get_or_set(type_list_key(organization_uuid),
+                                    lambda: list(super(TypeViewSet, self).list(request, *args, **kwargs).data))
+        return Response(data)
+
+    replica_actions = ('list', 'retrieve')
     queryset = Type.objects.all()
     serializer_class = TypeSerializer
     permission_classes = (ContactPermission,)
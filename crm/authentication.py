@@ -0,0 +1,144 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from oauth2_provider_jwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from oauth2_provider_jwt.utils import decode_jwt
+from rest_framework import exceptions
+
+from . import metrics
+
+JWT_SESSION_PREFIX = 'jwt_'
+
+
+class JWTClaims(dict):
+    """
+    Decoded claims of the JWT of a request, returned as `request.auth` by JWTAuthentication.
+    """
+    @property
+    def organization_uuid(self):
+        return self.get('organization_uuid')
+
+    @property
+    def core_user_uuid(self):
+        return self.get('core_user_uuid')
+
+    @property
+    def username(self):
+        return self.get('username')
+
+
+class VerifiedTokenCache(object):
+    """
+    Bounded LRU cache of the claims of tokens whose signature has been verified, keyed by the SHA-256 of the token.
+    An entry is evicted when the token expires; tokens without `exp` aren't cached.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                metrics.JWT_CACHE_LOOKUPS.labels('miss').inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.JWT_CACHE_LOOKUPS.labels('hit').inc()
+            return entry[1]
+
+    def set(self, token, payload):
+        expires_at = payload.get('exp')
+        if not self.maxsize or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+verified_tokens = VerifiedTokenCache(settings.JWT_VERIFIED_TOKEN_CACHE_SIZE)
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    """
+    Authenticates a request by its JWT without storing the claims in the session, so stateless API calls don't
+    read or write a `django_session` row. The claims are available with `get_jwt_claims(request)`.
+    The signature of a token is verified once per process, until the token expires.
+    """
+    def authenticate(self, request):
+        jwt_value = self._get_jwt_value(request)
+        if jwt_value is None:
+            return None
+
+        payload = verified_tokens.get(jwt_value)
+        if payload is None:
+            try:
+                payload = decode_jwt(jwt_value)
+            except jwt.ExpiredSignatureError:
+                raise exceptions.AuthenticationFailed('Signature has expired.')
+            except jwt.DecodeError:
+                raise exceptions.AuthenticationFailed('Error decoding signature.')
+            except jwt.InvalidTokenError:
+                raise exceptions.AuthenticationFailed()
+            verified_tokens.set(jwt_value, payload)
+
+        user = self.authenticate_credentials(payload)
+        return user, JWTClaims(payload)
+
+
+def get_jwt_claims(request):
+    """
+    Returns the JWT claims of the request. Falls back to the `jwt_*` keys of the session for requests
+    authenticated by a different authentication class.
+    """
+    auth = getattr(request, 'auth', None)
+    if isinstance(auth, JWTClaims):
+        return auth
+
+    session = getattr(request, 'session', None) or {}
+    return JWTClaims((key[len(JWT_SESSION_PREFIX):], value) for key, value in session.items()
+                     if key.startswith(JWT_SESSION_PREFIX))
+
+
+def get_unverified_jwt_claims(request):
+    """
+    Returns the claims of the JWT of the request without verifying its signature, before the view authenticated
+    it. Only for decisions that don't grant access, like routing its reads to the primary.
+    """
+    jwt_value = JWTAuthentication()._get_jwt_value(request)
+    if jwt_value is None:
+        return JWTClaims()
+    try:
+        return JWTClaims(jwt.decode(jwt_value, options={'verify_signature': False}))
+    except jwt.InvalidTokenError:
+        return JWTClaims()
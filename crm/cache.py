@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _new_version():
+    # Time-based, so a version key that got evicted never restarts at a version of older cached values
+    return int(time.time() * 1000)
+
+
+def is_shared():
+    """
+    Returns whether the cache is shared by all workers, so the versions bumped by one are seen by the others.
+    """
+    return settings.CACHE_SHARED
+
+
+def get_version(name):
+    """
+    Returns the current version of the cached values called `name`.
+    """
+    version_key = 'version:{}'.format(name)
+    return cache.get_or_set(version_key, _new_version, timeout=None)
+
+
+def bump_version(name):
+    """
+    Invalidates all cached values whose key contains the version of `name`.
+    """
+    version_key = 'version:{}'.format(name)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, _new_version(), timeout=None)
+
+
+def versioned_key(prefix, *version_names):
+    """
+    Returns a cache key that changes whenever one of the versions in `version_names` is bumped.
+    """
+    versions = ':'.join('{}'.format(get_version(name)) for name in version_names)
+    return '{}:{}'.format(prefix, versions)
+
+
+def get_or_set(key, default):
+    """
+    Returns the value of `key`, calling `default` to compute and cache it if missing. Without a shared cache
+    `default` is always called, as the key may have been invalidated by another worker.
+    """
+    if not is_shared():
+        return default()
+    value = cache.get(key)
+    if value is None:
+        value = default()
+        cache.set(key, value, timeout=settings.CACHE_TIMEOUT)
+    return value
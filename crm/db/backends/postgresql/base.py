@@ -0,0 +1,141 @@
+import collections
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+Database = base.Database
+
+
+class ConnectionPool(object):
+    """
+    Pool of database connections shared by all threads (or greenlets) of a process.
+
+    At most `max_size` connections are in use at the same time. Further requests wait up to `timeout` seconds
+    for a free connection.
+    """
+    def __init__(self, max_size, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @property
+    def idle_count(self):
+        return len(self._idle)
+
+    def get(self, connect):
+        """Return an idle connection or a new one created by `connect`."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                'No database connection available in the pool within {} seconds.'.format(self.timeout))
+        try:
+            with self._lock:
+                # Reuse the most recently returned connection, so idle ones can time out on the server
+                connection = self._idle.pop() if self._idle else None
+            return connection or connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, connection, discard=False):
+        """Return the connection to the pool, rolled back to a clean state. Close it if it is not reusable."""
+        try:
+            if not discard and not connection.closed:
+                status = connection.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            if discard or connection.closed:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend with health-checked persistent connections and an optional connection pool.
+
+    Additional keys of the database settings:
+
+    - CONN_HEALTH_CHECKS: Before a persistent or pooled connection is reused by a new request, check it with
+      `SELECT 1` and reconnect if it's broken.
+    - CONN_POOL_SIZE: Size of the connection pool of the process, 0 disables it. With a pool, connections are taken
+      from it on connect and returned to it on close, so it should be combined with CONN_MAX_AGE = 0. Useful for
+      gevent or threaded workers, which would hold one persistent connection per greenlet or thread otherwise.
+    - CONN_POOL_TIMEOUT: Seconds to wait for a free connection of the pool, None waits forever.
+    """
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_checks_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        pool_size = self.settings_dict.get('CONN_POOL_SIZE')
+        if not pool_size:
+            return None
+        # Pools must not be shared with forked processes
+        key = (self.alias, os.getpid())
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = ConnectionPool(pool_size, self.settings_dict.get('CONN_POOL_TIMEOUT'))
+            return self._pools[key]
+
+    def _is_usable(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            connection = super().get_new_connection(conn_params)
+        else:
+            connection = pool.get(lambda: Database.connect(**conn_params))
+            while self.health_checks_enabled and not self._is_usable(connection):
+                pool.put(connection, discard=True)
+                connection = pool.get(lambda: Database.connect(**conn_params))
+            options = self.settings_dict['OPTIONS']
+            self.isolation_level = options.get('isolation_level', connection.isolation_level)
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        self.health_check_done = True
+        return connection
+
+    def ensure_connection(self):
+        """Check a reused connection once per request before it's used."""
+        if self.connection is not None and not self.health_check_done:
+            self.health_check_done = True
+            if self.health_checks_enabled and not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # A connection closed within an atomic block stays referenced by this wrapper, so it can't be shared.
+            return pool.put(self.connection, discard=self.errors_occurred or self.in_atomic_block)
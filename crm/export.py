@@ -0,0 +1,55 @@
+import csv
+import json
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_batches(iterable, size):
+    """
+    Yields lists of up to `size` items of the iterable.
+    """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+class _Echo(object):
+    """
+    File-like object returning what's written, so csv.writer produces the lines instead of buffering them.
+    """
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=JSONEncoder)
+    return value
+
+
+def render_ndjson(rows):
+    """
+    Yields every row as a line of JSON.
+    """
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder) + '\n'
+
+
+def render_csv(rows, fieldnames):
+    """
+    Yields a header and every row as a line of CSV. Nested values are written as JSON.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fieldnames)
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(fieldname)) for fieldname in fieldnames])
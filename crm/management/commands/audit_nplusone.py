@@ -0,0 +1,77 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from crm.authentication import JWT_SESSION_PREFIX
+from crm.nplusone import QueryRecorder, allow_nplusone, format_repeated
+from crm.urls import router
+
+
+class Command(BaseCommand):
+    help = 'Requests the list and an object of every endpoint of the router and reports their N+1 queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization-uuid', required=True,
+                            help='Organization whose data is listed.')
+        parser.add_argument('--threshold', type=int, default=None,
+                            help='Times a query may be repeated (default: NPLUSONE_THRESHOLD).')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = options['organization_uuid']
+        threshold = settings.NPLUSONE_THRESHOLD if options['threshold'] is None else options['threshold']
+
+        failed = 0
+        for prefix, viewset, basename in router.registry:
+            for action, path in self.get_paths(prefix, viewset):
+                with allow_nplusone(), QueryRecorder().record() as recorder:
+                    response = viewset.as_view({'get': action})(self.get_request(path), **path[1])
+                    response.render()
+                repeated = recorder.find_repeated(threshold)
+                query_count = sum(count for count, _ in recorder.queries.values())
+                name = f'GET {path[0]} ({viewset.__name__}.{action}, {response.status_code})'
+                if repeated:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'{name}: N+1 queries\n{format_repeated(repeated)}'))
+                else:
+                    self.stdout.write(f'{name}: {query_count} queries')
+
+        if failed:
+            raise CommandError(f'{failed} endpoints run N+1 queries.')
+
+    def get_paths(self, prefix, viewset):
+        """
+        Returns the action and the path and URL kwargs of the list and the first object of the viewset.
+        """
+        paths = []
+        if hasattr(viewset, 'list'):
+            paths.append(('list', (f'/{prefix}/', {})))
+        if hasattr(viewset, 'retrieve'):
+            lookup_field = viewset.lookup_field
+            instance = self.get_instance(viewset)
+            if instance is not None:
+                lookup_value = str(getattr(instance, lookup_field))
+                paths.append(('retrieve', (f'/{prefix}/{lookup_value}/', {lookup_field: lookup_value})))
+        return paths
+
+    def get_instance(self, viewset):
+        queryset = viewset.queryset
+        field_names = {field.name for field in queryset.model._meta.get_fields()}
+        if 'organization_uuid' in field_names:
+            queryset = queryset.filter(organization_uuid=self.organization_uuid)
+        elif 'appointment' in field_names:
+            queryset = queryset.filter(appointment__organization_uuid=self.organization_uuid)
+        return queryset.order_by('pk').first()
+
+    def get_request(self, path):
+        request = self.factory.get(path)
+        request.session = {
+            f'{JWT_SESSION_PREFIX}organization_uuid': self.organization_uuid,
+            f'{JWT_SESSION_PREFIX}username': 'audit_nplusone',
+            f'{JWT_SESSION_PREFIX}core_user_uuid': str(uuid.uuid4()),
+        }
+        force_authenticate(request, user=User(username='audit_nplusone', is_superuser=True))
+        return request
@@ -0,0 +1,122 @@
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from appointment.models import Appointment, AppointmentDrivingTime, AppointmentNote
+from appointment.serializers import AppointmentSerializer
+from contact.models import Contact
+from contact.serializers import ContactSerializer
+from crm.parsers import ORJSONParser
+from crm.renderers import ORJSONRenderer, orjson
+
+
+def _prefetched(model, objects):
+    # Related managers return the prefetched objects without a query, so unsaved instances can be serialized
+    queryset = model.objects.none()
+    queryset._result_cache = list(objects)
+    return queryset
+
+
+def build_contacts(count, organization_uuid):
+    now = timezone.now()
+    return [
+        Contact(
+            id=index, uuid=uuid.uuid4(), first_name=f'First {index}', last_name=f'Last {index}', title='mr',
+            customer_type='customer', company='Humanitec GmbH', organization_uuid=organization_uuid,
+            addresses=[{'type': 'home', 'street': 'Wöhlertstraße', 'house_number': str(index), 'postal_code': '10115',
+                        'city': 'Berlin', 'country': 'Germany'}],
+            emails=[{'type': 'office', 'email': f'contact{index}@example.com'}],
+            phones=[{'type': 'mobile', 'number': f'+49 30 {index:08d}'}],
+            siteprofile_uuids=[uuid.uuid4()], workflowlevel1_uuids=[str(uuid.uuid4())],
+            workflowlevel2_uuids=[str(uuid.uuid4())], notes='Prefers calls in the morning.',
+            create_date=now, edit_date=now)
+        for index in range(1, count + 1)
+    ]
+
+
+def build_appointments(count, organization_uuid):
+    now = timezone.now()
+    contacts = build_contacts(count, organization_uuid)
+    appointments = []
+    for index, contact in enumerate(contacts, 1):
+        start_date = now + timedelta(hours=index)
+        appointment = Appointment(
+            id=index, uuid=uuid.uuid4(), owner=uuid.uuid4(), name=f'Appointment {index}', start_date=start_date,
+            end_date=start_date + timedelta(hours=2), type=['inspection'], address='Wöhlertstraße 12, Berlin',
+            siteprofile_uuid=uuid.uuid4(), invitee_uuids=[uuid.uuid4()], organization_uuid=organization_uuid,
+            workflowlevel2_uuids=[uuid.uuid4()], contact_uuid=contact.uuid, summary='Checked the heating.',
+            edit_date=now)
+        appointment._contact = contact
+        appointment._prefetched_objects_cache = {
+            'notes': _prefetched(AppointmentNote, [
+                AppointmentNote(id=index * 2 + note_type, note=f'Note {note_type}', type=note_type, edit_date=now)
+                for note_type in (1, 2)]),
+            'driving_times': _prefetched(AppointmentDrivingTime, [
+                AppointmentDrivingTime(uuid=uuid.uuid4(), distance=Decimal('12.50'), time=25, appointment=appointment,
+                                       time_point=start_date - timedelta(minutes=25), edit_date=now)]),
+        }
+        appointments.append(appointment)
+    return appointments
+
+
+class Command(BaseCommand):
+    help = ('Compares render and parse time and peak memory of JSONRenderer and ORJSONRenderer for a page of '
+            'appointments and a page of contacts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=2000, help='Appointments of the page')
+        parser.add_argument('--contacts', type=int, default=7000, help='Contacts of the page')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, the fastest is reported')
+
+    @staticmethod
+    def measure(func, repeat):
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            durations.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, min(durations), peak
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson isn\'t installed, ORJSONRenderer falls back to JSONRenderer.')
+
+        organization_uuid = str(uuid.uuid4())
+        pages = (
+            ('{} appointments'.format(options['appointments']),
+             AppointmentSerializer(build_appointments(options['appointments'], organization_uuid), many=True).data),
+            ('{} contacts'.format(options['contacts']),
+             ContactSerializer(build_contacts(options['contacts'], organization_uuid), many=True).data),
+        )
+        benchmarks = (
+            ('JSONRenderer', JSONRenderer(), JSONParser()),
+            ('ORJSONRenderer', ORJSONRenderer(), ORJSONParser()),
+        )
+
+        self.stdout.write('{:<20} {:<16} {:>10} {:>12} {:>10} {:>12} {:>10}'.format(
+            'page', 'renderer', 'render ms', 'render peak', 'parse ms', 'parse peak', 'size'))
+        for page_name, data in pages:
+            outputs = []
+            for renderer_name, renderer, parser in benchmarks:
+                content, render_duration, render_peak = self.measure(lambda: renderer.render(data), options['repeat'])
+                _, parse_duration, parse_peak = self.measure(lambda: parser.parse(BytesIO(content)), options['repeat'])
+                outputs.append(content)
+                self.stdout.write('{:<20} {:<16} {:>10.1f} {:>10.1f}MB {:>10.1f} {:>10.1f}MB {:>8.1f}MB'.format(
+                    page_name, renderer_name, render_duration * 1000, render_peak / 2 ** 20, parse_duration * 1000,
+                    parse_peak / 2 ** 20, len(content) / 2 ** 20))
+            if len(set(outputs)) != 1:
+                self.stderr.write(f'The renderers produced different output for the {page_name}.')
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from crm.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = 'Deletes the outbox events older than OUTBOX_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        created_before = timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+        count, _ = OutboxEvent.objects.filter(created_at__lt=created_before).delete()
+        self.stdout.write(f'Deleted {count} outbox events older than {created_before}.')
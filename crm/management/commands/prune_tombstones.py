@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from crm.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Deletes the tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS, sync tokens that old have expired'
+
+    def handle(self, *args, **options):
+        deleted_before = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        count, _ = Tombstone.objects.filter(deleted_at__lt=deleted_before).delete()
+        self.stdout.write(f'Deleted {count} tombstones older than {deleted_before}.')
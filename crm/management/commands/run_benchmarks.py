@@ -0,0 +1,188 @@
+import json
+import time
+import uuid
+from collections import namedtuple
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+
+from appointment.models import Appointment
+from contact.models import Contact
+from crm.authentication import verified_tokens
+from .seed_benchmark_data import FIRST_NAMES, LAST_NAMES, REFERENCE_DATE
+
+BENCHMARK_TOKEN = 'benchmark.token.signature'
+SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+Scenario = namedtuple('Scenario', ['name', 'method', 'path', 'data'])
+
+
+def percentile(values, percent):
+    """
+    Returns the percentile of the sorted values, interpolated between the closest ranks.
+    """
+    rank = (len(values) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+class Command(BaseCommand):
+    help = ('Runs list, filter, search, create, update and export requests against the data of an organization, '
+            'e.g. seeded by seed_benchmark_data, and reports their latency percentiles and queries as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization-uuid', help='Organization of the requests (default: the one with the '
+                                                        'most contacts)')
+        parser.add_argument('--runs', type=int, default=50, help='Measured requests per scenario')
+        parser.add_argument('--export-runs', type=int, default=3, help='Measured requests per export scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Requests per scenario before measuring')
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='Run only this scenario')
+        parser.add_argument('--output', help='File the JSON report is written to (default: stdout)')
+
+    def handle(self, *args, **options):
+        organization_uuid = options['organization_uuid'] or self.get_largest_organization()
+        scenarios = self.get_scenarios(organization_uuid)
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError('Unknown scenarios: {}.'.format(', '.join(sorted(unknown))))
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {BENCHMARK_TOKEN}')
+        verified_tokens.set(BENCHMARK_TOKEN, {
+            'iss': 'bifrost',
+            'exp': time.time() + 24 * 3600,
+            'organization_uuid': organization_uuid,
+            'core_user_uuid': str(uuid.uuid4()),
+            'username': 'benchmark',
+        })
+        if verified_tokens.get(BENCHMARK_TOKEN) is None:
+            raise CommandError('The benchmarks authenticate through the cache of verified tokens, '
+                               'JWT_VERIFIED_TOKEN_CACHE_SIZE must not be 0.')
+
+        # Allows the host of the test client and keeps the emails of the notifications in memory
+        test_settings = override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver'],
+                                          EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+        try:
+            results = {}
+            with test_settings:
+                for scenario in scenarios:
+                    runs = options['export_runs'] if scenario.name.startswith('export') else options['runs']
+                    results[scenario.name] = self.run_scenario(scenario, runs, options['warmup'])
+                    self.stderr.write('{}: p50 {p50_ms} ms, p95 {p95_ms} ms, p99 {p99_ms} ms, {queries} queries'
+                                      .format(scenario.name, **results[scenario.name]))
+        finally:
+            verified_tokens.clear()
+
+        report = json.dumps({
+            'organization_uuid': organization_uuid,
+            'contacts': Contact.objects.filter(organization_uuid=organization_uuid).count(),
+            'appointments': Appointment.objects.filter(organization_uuid=organization_uuid).count(),
+            'scenarios': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    @staticmethod
+    def get_largest_organization():
+        organization = (Contact.objects.values('organization_uuid').annotate(contacts=Count('id'))
+                        .order_by('-contacts').first())
+        if organization is None:
+            raise CommandError('There are no contacts, seed them with seed_benchmark_data.')
+        return organization['organization_uuid']
+
+    @staticmethod
+    def get_scenarios(organization_uuid):
+        contact = Contact.objects.filter(organization_uuid=organization_uuid).order_by('id').first()
+        appointment = Appointment.objects.filter(organization_uuid=organization_uuid).order_by('id').first()
+        if contact is None or appointment is None:
+            raise CommandError(f'The organization {organization_uuid} has no contacts or appointments.')
+
+        start_date = REFERENCE_DATE - timedelta(days=30)
+        return [
+            Scenario('list_contacts', 'get', '/contact/', None),
+            Scenario('filter_contacts', 'get', '/contact/',
+                     {'workflowlevel2_uuids': contact.workflowlevel2_uuids[0], 'ordering': '-last_name'}),
+            Scenario('search_contacts', 'get', '/contact/', {'search': LAST_NAMES[0]}),
+            Scenario('search_contacts_starts_with', 'get', '/contact/', {'starts_with': FIRST_NAMES[0][:2]}),
+            Scenario('create_contact', 'post', '/contact/', {
+                'first_name': FIRST_NAMES[1], 'last_name': LAST_NAMES[1], 'workflowlevel1_uuids': [str(uuid.uuid4())],
+                'emails': [{'type': 'office', 'email': 'benchmark@example.com'}],
+                'phones': [{'type': 'mobile', 'number': '+49 151 1234567'}],
+            }),
+            Scenario('update_contact', 'patch', f'/contact/{contact.id}/', {'notes': 'Updated by the benchmark.'}),
+            Scenario('list_appointments', 'get', '/appointment/', None),
+            Scenario('filter_appointments', 'get', '/appointment/', {
+                'start_date_gte': start_date.date().isoformat(),
+                'start_date_lte': (start_date + timedelta(days=7)).date().isoformat(),
+                'page_size': 200,
+            }),
+            Scenario('create_appointment', 'post', '/appointment/', {
+                'name': 'Benchmark', 'type': ['inspection'], 'start_date': start_date.isoformat(),
+                'end_date': (start_date + timedelta(hours=1)).isoformat(),
+                'notes': [{'type': 1, 'note': 'Created by the benchmark.'}],
+            }),
+            Scenario('update_appointment', 'patch', f'/appointment/{appointment.uuid}/',
+                     {'summary': 'Updated by the benchmark.'}),
+            Scenario('export_contacts', 'get', '/contact/export/', {'format': 'ndjson'}),
+            Scenario('export_appointments', 'get', '/appointment/export/', {'format': 'csv'}),
+        ]
+
+    def request(self, scenario):
+        if scenario.method == 'get':
+            response = self.client.get(scenario.path, scenario.data)
+        else:
+            response = getattr(self.client, scenario.method)(scenario.path, json.dumps(scenario.data),
+                                                             content_type='application/json')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        if response.status_code >= 400:
+            raise CommandError(f'{scenario.method.upper()} {scenario.path} returned {response.status_code}: '
+                               f'{response.content[:500]}')
+
+    def run_scenario(self, scenario, runs, warmup):
+        durations = []
+        query_counts = []
+
+        def count_query(execute, sql, params, many, context):
+            # The transaction of a write is a savepoint in the one of the benchmark, which isn't run in production
+            if not sql.startswith(SAVEPOINT_STATEMENTS):
+                query_counts[-1] += 1
+            return execute(sql, params, many, context)
+
+        for run in range(warmup + runs):
+            query_counts.append(0)
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count_query))
+                if scenario.method != 'get':
+                    # Every run writes the same, the database stays the same for the next benchmark
+                    stack.enter_context(transaction.atomic())
+                started = time.perf_counter()
+                self.request(scenario)
+                durations.append(time.perf_counter() - started)
+                if scenario.method != 'get':
+                    transaction.set_rollback(True)
+
+        durations = sorted(durations[warmup:])
+        query_counts = sorted(query_counts[warmup:])
+        return {
+            'method': scenario.method.upper(),
+            'path': scenario.path,
+            'runs': runs,
+            'p50_ms': round(percentile(durations, 50) * 1000, 2),
+            'p95_ms': round(percentile(durations, 95) * 1000, 2),
+            'p99_ms': round(percentile(durations, 99) * 1000, 2),
+            'max_ms': round(durations[-1] * 1000, 2),
+            'queries': query_counts[len(query_counts) // 2],
+        }
@@ -0,0 +1,192 @@
+import random
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import pytz
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from appointment.models import Appointment, AppointmentDrivingTime, AppointmentNote, AppointmentNotification
+from contact.models import Contact, Type
+
+FIRST_NAMES = ('Anna', 'Ben', 'Clara', 'David', 'Emma', 'Felix', 'Greta', 'Hannah', 'Jonas', 'Lea', 'Leon', 'Lukas',
+               'Marie', 'Mia', 'Noah', 'Paul', 'Sophie', 'Tim', 'Jürgen', 'Zoë')
+LAST_NAMES = ('Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz', 'Hoffmann',
+              'Schäfer', 'Koch', 'Bauer', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann', 'Schwarz', 'Zimmermann')
+STREETS = ('Hauptstraße', 'Schulstraße', 'Gartenstraße', 'Bahnhofstraße', 'Dorfstraße', 'Bergstraße', 'Birkenweg',
+           'Lindenstraße', 'Kirchstraße', 'Wöhlertstraße')
+CITIES = (('10115', 'Berlin'), ('20095', 'Hamburg'), ('80331', 'München'), ('50667', 'Köln'), ('60311', 'Frankfurt'),
+          ('70173', 'Stuttgart'), ('40213', 'Düsseldorf'), ('04109', 'Leipzig'), ('01067', 'Dresden'))
+COMPANIES = ('Humanitec GmbH', 'Heizung Schmidt KG', 'Solar Nord GmbH', 'Bad & Wärme AG', None, None)
+CONTACT_TYPES = ('Customer', 'Prospect', 'Supplier', 'Partner')
+APPOINTMENT_TYPES = ('inspection', 'installation', 'maintenance', 'repair', 'consultation')
+NOTES = ('Please call before arriving.', 'Key is at the neighbours.', 'Customer asked for an offer.',
+         'Replace the filter next time.', 'Parking in the backyard.')
+
+TIMEZONE = pytz.timezone('Europe/Berlin')
+# The dates are spread around a fixed date, so every run seeds the same data
+REFERENCE_DATE = datetime(2019, 7, 1, tzinfo=pytz.utc)
+
+
+def organization_uuids(count, seed):
+    """
+    Returns the UUIDs of the organizations seeded with the seed, the same on every run.
+    """
+    rng = random.Random('organizations-{}'.format(seed))  # nosec
+    return [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)]
+
+
+def split_by_weight(total, count):
+    """
+    Splits the total into `count` parts of decreasing size (1, 1/2, 1/3, ...): a few large tenants and a long tail
+    of small ones.
+    """
+    weights = [1 / rank for rank in range(1, count + 1)]
+    parts = [int(total * weight / sum(weights)) for weight in weights]
+    parts[0] += total - sum(parts)
+    return parts
+
+
+class Command(BaseCommand):
+    help = ('Seeds organizations with contacts and appointments with notes and driving times for benchmarks. '
+            'The same seed generates the same organizations, whose data is replaced.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizations', type=int, default=10, help='Organizations to seed')
+        parser.add_argument('--contacts', type=int, default=1000000, help='Contacts of all organizations')
+        parser.add_argument('--appointments', type=int, default=5000000, help='Appointments of all organizations')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per query')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random data')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])  # nosec
+        self.batch_size = options['batch_size']
+        self.now = REFERENCE_DATE
+
+        organizations = organization_uuids(options['organizations'], options['seed'])
+        self.delete(organizations)
+        global_types = self.create_types(None)
+        contact_counts = split_by_weight(options['contacts'], len(organizations))
+        appointment_counts = split_by_weight(options['appointments'], len(organizations))
+
+        for organization_uuid, contact_count, appointment_count in zip(organizations, contact_counts,
+                                                                       appointment_counts):
+            types = global_types + self.create_types(organization_uuid)
+            contact_uuids = self.create_contacts(organization_uuid, contact_count, types)
+            self.create_appointments(organization_uuid, appointment_count, contact_uuids)
+            self.stdout.write(f'{organization_uuid}: {contact_count} contacts, {appointment_count} appointments')
+
+        with connection.cursor() as cursor:
+            for model in (Contact, Appointment, AppointmentNote, AppointmentDrivingTime):
+                cursor.execute('ANALYZE {}'.format(model._meta.db_table))
+
+    def delete(self, organizations):
+        """
+        Deletes the data of the organizations of a previous run with SQL, as the ORM would fetch all rows first.
+        """
+        models = (Appointment, AppointmentNote, AppointmentNotification, AppointmentDrivingTime, Contact, Type)
+        tables = {model.__name__: model._meta.db_table for model in models}
+        tables['AppointmentNotes'] = Appointment.notes.through._meta.db_table
+        appointments = 'SELECT id FROM {Appointment} WHERE organization_uuid = ANY(%(organizations)s::uuid[])'
+        statements = (
+            'DELETE FROM {AppointmentNote} WHERE id IN (SELECT appointmentnote_id FROM {AppointmentNotes} '
+            'WHERE appointment_id IN (' + appointments + '))',
+            'DELETE FROM {AppointmentNotes} WHERE appointment_id IN (' + appointments + ')',
+            'DELETE FROM {AppointmentDrivingTime} WHERE appointment_id IN (' + appointments + ')',
+            'DELETE FROM {AppointmentNotification} WHERE appointment_id IN (' + appointments + ')',
+            'DELETE FROM {Appointment} WHERE organization_uuid = ANY(%(organizations)s::uuid[])',
+            'DELETE FROM {Contact} WHERE organization_uuid = ANY(%(organizations)s)',
+            'DELETE FROM {Type} WHERE organization_uuid = ANY(%(organizations)s::uuid[]) '
+            'OR (is_global AND name LIKE %(global_types)s)',
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            for statement in statements:
+                # The table names are the ones of the models
+                cursor.execute(statement.format(**tables),  # nosec
+                               {'organizations': organizations, 'global_types': 'Benchmark %'})
+
+    def create_types(self, organization_uuid):
+        if organization_uuid is None:
+            types = [Type(name=f'Benchmark {name}', organization_uuid=uuid.uuid4(), is_global=True)
+                     for name in CONTACT_TYPES[:2]]
+        else:
+            types = [Type(name=name, organization_uuid=organization_uuid) for name in CONTACT_TYPES]
+        return Type.objects.bulk_create(types)
+
+    def _batches(self, count):
+        for start in range(0, count, self.batch_size):
+            yield range(start, min(start + self.batch_size, count))
+
+    def build_contact(self, organization_uuid, customer_id, types):
+        rng = self.rng
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        postal_code, city = rng.choice(CITIES)
+        email = f'{first_name}.{last_name}{customer_id}@example.com'.lower()
+        addresses = [{'type': 'home', 'street': rng.choice(STREETS), 'house_number': str(rng.randint(1, 200)),
+                      'postal_code': postal_code, 'city': city, 'country': 'Germany'}]
+        if rng.random() < 0.3:
+            addresses.append(dict(addresses[0], type='billing'))
+        phones = [{'type': 'mobile', 'number': f'+49 1{rng.randint(50, 79)} {rng.randint(1000000, 9999999)}'}]
+        if rng.random() < 0.5:
+            phones.append({'type': 'home', 'number': f'+49 {rng.randint(30, 89)} {rng.randint(100000, 999999)}'})
+        created = self.now - timedelta(days=rng.randint(0, 1000), seconds=rng.randint(0, 86399))
+        return Contact(
+            customer_id=customer_id, first_name=first_name, last_name=last_name,
+            title=rng.choice(('mr', 'ms', 'mrs', None)), contact_type=rng.choice(types),
+            customer_type=rng.choice(('customer', 'contact', 'company')), company=rng.choice(COMPANIES),
+            addresses=addresses, emails=[{'type': 'private', 'email': email}], phones=phones,
+            siteprofile_uuids=[uuid.UUID(int=rng.getrandbits(128), version=4)],
+            workflowlevel1_uuids=[str(uuid.UUID(int=rng.getrandbits(128), version=4))],
+            workflowlevel2_uuids=[str(uuid.UUID(int=rng.getrandbits(128), version=4))],
+            notes=rng.choice(NOTES), organization_uuid=organization_uuid,
+            uuid=uuid.UUID(int=rng.getrandbits(128), version=4), create_date=created)
+
+    def create_contacts(self, organization_uuid, count, types):
+        contact_uuids = []
+        for batch in self._batches(count):
+            contacts = [self.build_contact(organization_uuid, 10001 + index, types) for index in batch]
+            Contact.objects.bulk_create(contacts, batch_size=self.batch_size)
+            contact_uuids.extend(contact.uuid for contact in contacts)
+        return contact_uuids
+
+    def build_appointment(self, organization_uuid, contact_uuids, owners):
+        rng = self.rng
+        day = (self.now + timedelta(days=rng.randint(-730, 180))).date()
+        start_date = TIMEZONE.localize(datetime.combine(day, time(rng.randint(7, 17), rng.choice((0, 15, 30, 45)))))
+        postal_code, city = rng.choice(CITIES)
+        return Appointment(
+            uuid=uuid.UUID(int=rng.getrandbits(128), version=4), owner=rng.choice(owners),
+            name=f'{rng.choice(APPOINTMENT_TYPES).title()} {rng.choice(LAST_NAMES)}',
+            start_date=start_date, end_date=start_date + timedelta(minutes=rng.choice((30, 60, 90, 120, 240))),
+            type=[rng.choice(APPOINTMENT_TYPES)],
+            address=f'{rng.choice(STREETS)} {rng.randint(1, 200)}, {postal_code} {city}',
+            invitee_uuids=rng.sample(owners, rng.randint(0, 2)), organization_uuid=organization_uuid,
+            workflowlevel2_uuids=[uuid.UUID(int=rng.getrandbits(128), version=4)],
+            contact_uuid=rng.choice(contact_uuids) if contact_uuids else None,
+            summary=rng.choice(NOTES) if start_date < self.now else '')
+
+    def create_appointments(self, organization_uuid, count, contact_uuids):
+        rng = self.rng
+        owners = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(max(3, count // 500))]
+        for batch in self._batches(count):
+            appointments = Appointment.objects.bulk_create(
+                [self.build_appointment(organization_uuid, contact_uuids, owners) for _ in batch],
+                batch_size=self.batch_size)
+
+            notes, note_appointments, driving_times = [], [], []
+            for appointment in appointments:
+                for note_type in rng.sample((1, 2, 3, 4), rng.choice((0, 1, 1, 2))):
+                    notes.append(AppointmentNote(note=rng.choice(NOTES), type=note_type))
+                    note_appointments.append(appointment.id)
+                for _ in range(rng.choice((0, 1, 1, 2))):
+                    driving_times.append(AppointmentDrivingTime(
+                        appointment=appointment, distance=Decimal(rng.randint(100, 9999)) / 100,
+                        time=rng.randint(5, 120), time_point=appointment.start_date - timedelta(hours=1)))
+
+            notes = AppointmentNote.objects.bulk_create(notes, batch_size=self.batch_size)
+            through = Appointment.notes.through
+            through.objects.bulk_create(
+                [through(appointment_id=appointment_id, appointmentnote_id=note.id)
+                 for appointment_id, note in zip(note_appointments, notes)], batch_size=self.batch_size)
+            AppointmentDrivingTime.objects.bulk_create(driving_times, batch_size=self.batch_size)
@@ -0,0 +1,142 @@
+import os
+import time
+from contextlib import ExitStack
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+
+from . import routers
+from .middleware import get_view_name, resolve_action
+
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_LATENCY = Histogram(
+    'crm_http_request_duration_seconds', 'Latency of the requests by view, action and status code.',
+    ['view', 'action', 'status'])
+REQUEST_QUERIES = Histogram(
+    'crm_http_request_db_queries', 'Database queries per request by view and action.',
+    ['view', 'action'], buckets=QUERY_BUCKETS)
+DB_QUERIES = Counter(
+    'crm_db_queries', 'Database queries of the requests by view and action.', ['view', 'action'])
+
+NOTIFICATIONS_SENT = Counter(
+    'crm_appointment_notifications_sent', 'Appointment notifications sent by email.')
+NOTIFICATION_FAILURES = Counter(
+    'crm_appointment_notification_failures', 'Appointment notifications that failed to be sent.')
+NOTIFICATION_SEND_LATENCY = Histogram(
+    'crm_appointment_notification_send_seconds', 'Time to send an appointment notification by email.')
+
+IMPORT_ROWS_PENDING = Gauge(
+    'crm_import_csv_rows_pending', 'Rows of the running csv imports that are yet to be imported.',
+    multiprocess_mode='livesum')
+IMPORT_ROWS_PROCESSED = Counter(
+    'crm_import_csv_rows_processed', 'Rows of csv imports by result: imported, dismissed or failed.', ['result'])
+
+JWT_CACHE_LOOKUPS = Counter(
+    'crm_jwt_verified_token_cache_lookups', 'Lookups of tokens in the cache of verified JWTs by result: hit or miss.',
+    ['result'])
+
+
+def get_multiprocess_dir():
+    """
+    Returns the directory the processes share their metrics through, e.g. the workers of gunicorn, or None.
+    """
+    return os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+
+def count_notifications():
+    """
+    Returns the number of pending and sent (by `sent_at`) appointment notifications, read from a replica if any.
+    """
+    notification_model = apps.get_model('appointment', 'AppointmentNotification')
+    replica_enabled = routers.replica_enabled()
+    routers.use_replica(True)
+    try:
+        return notification_model.objects.aggregate(
+            pending=Count('pk', filter=Q(sent_at__isnull=True)), sent=Count('sent_at'))
+    finally:
+        routers.use_replica(replica_enabled)
+
+
+class NotificationCollector(object):
+    """
+    Counts the appointment notifications that are pending and sent in the database when scraped, so the numbers
+    are the same whichever process is scraped. The counts are cached for METRICS_NOTIFICATIONS_CACHE_SECONDS, so
+    frequent scrapes of the whole table don't load the database.
+    """
+    cache_key = 'metrics:appointment_notifications'
+
+    def describe(self):
+        yield GaugeMetricFamily('crm_appointment_notifications', 'Appointment notifications by state.',
+                                labels=['state'])
+
+    def collect(self):
+        counts = cache.get_or_set(self.cache_key, count_notifications,
+                                  timeout=settings.METRICS_NOTIFICATIONS_CACHE_SECONDS)
+        metric = GaugeMetricFamily('crm_appointment_notifications', 'Appointment notifications by state.',
+                                   labels=['state'])
+        for state in ('pending', 'sent'):
+            metric.add_metric([state], counts[state])
+        yield metric
+
+
+NOTIFICATION_REGISTRY = CollectorRegistry(auto_describe=True)
+NOTIFICATION_REGISTRY.register(NotificationCollector())
+
+
+class MetricsMiddleware(object):
+    """
+    Observes the latency and the number of database queries of every request, labeled by the view class and action
+    (see `resolve_action`). Requests that don't resolve to a view are labeled 'none'.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._metrics_labels = ('none', 'none')
+        query_count = [0]
+
+        def count_query(execute, sql, params, many, context):
+            query_count[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count_query))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            view, action = request._metrics_labels
+            REQUEST_LATENCY.labels(view, action, status).observe(time.perf_counter() - started)
+            REQUEST_QUERIES.labels(view, action).observe(query_count[0])
+            if query_count[0]:
+                DB_QUERIES.labels(view, action).inc(query_count[0])
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = (get_view_name(view_func), resolve_action(request, view_func))
+        return None
+
+
+def metrics_view(request):
+    """
+    Metrics in the Prometheus text format. If PROMETHEUS_MULTIPROC_DIR is set, the metrics of all processes
+    sharing it are merged.
+    """
+    if get_multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=get_multiprocess_dir())
+    else:
+        registry = REGISTRY
+    output = generate_latest(registry) + generate_latest(NOTIFICATION_REGISTRY)
+    return HttpResponse(output, content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from . import routers
+from .authentication import get_jwt_claims, get_unverified_jwt_claims
+
+REPLICA_STICKY_COOKIE = 'crm_primary_db'
+
+
+def get_view_name(view_func):
+    """
+    Returns the name of the view class, or of the function of function-based views.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    return view_class.__name__ if view_class else view_func.__name__
+
+
+def get_sticky_key(claims):
+    """
+    Returns the cache key keeping the reads of the JWT user, or of its organization, on the primary.
+    """
+    owner = claims.core_user_uuid or claims.organization_uuid
+    return 'primary:{}'.format(owner) if owner else None
+
+
+def resolve_action(request, view_func):
+    """
+    Returns the action of the view handling the request. ViewSets name their actions (e.g. 'list'), other views
+    their handlers (e.g. 'get').
+    """
+    method = request.method.lower()
+    return getattr(view_func, 'actions', {}).get(method, method)
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Allows the views to read from the replicas for safe requests, if they declare it in `replica_actions`.
+    See `resolve_action` for the names of the actions.
+
+    After a client wrote something, its reads stay on the primary for DATABASE_REPLICA_STICKY_SECONDS, so the client
+    reads its own writes, even if the replicas lag behind. JWT clients are kept there by a cache entry of their user,
+    as they don't keep cookies; other clients by a cookie.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.use_replica(False)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            sticky_key = get_sticky_key(get_jwt_claims(request))
+            if sticky_key:
+                cache.set(sticky_key, True, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+            response.set_cookie(REPLICA_STICKY_COOKIE, '1', max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                                httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS or \
+                REPLICA_STICKY_COOKIE in request.COOKIES:
+            return None
+        # The view authenticates the JWT later; an unverified user can at most send its own reads to the primary
+        sticky_key = get_sticky_key(get_unverified_jwt_claims(request))
+        if sticky_key and cache.get(sticky_key):
+            return None
+        view_class = getattr(view_func, 'cls', None)
+        routers.use_replica(resolve_action(request, view_func) in getattr(view_class, 'replica_actions', ()))
+        return None
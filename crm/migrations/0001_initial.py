@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Name of the model of the deleted object, e.g. "appointment"', max_length=50)),
+                ('object_id', models.CharField(help_text='UUID of the deleted object, or ID if it has no UUID', max_length=36)),
+                ('organization_uuid', models.CharField(blank=True, max_length=36, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['organization_uuid', 'deleted_at'], name='crm_tombsto_organiz_94011c_idx'),
+        ),
+    ]
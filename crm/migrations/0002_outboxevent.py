@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization_uuid', models.CharField(blank=True, max_length=36, null=True)),
+                ('model', models.CharField(help_text='Name of the model of the changed object, e.g. "appointment"', max_length=50)),
+                ('object_id', models.CharField(help_text='UUID of the changed object, or ID if it has no UUID', max_length=36)),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['organization_uuid', 'id'], name='crm_outboxe_organiz_4db436_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='crm_outboxe_organiz_4db436_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='transaction_id',
+            field=models.BigIntegerField(default=0, help_text='ID of the transaction that wrote the event (txid_current()), to relay the events in the order their transactions completed'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['organization_uuid', 'transaction_id', 'id'], name='crm_outboxe_organiz_e817ef_idx'),
+        ),
+    ]
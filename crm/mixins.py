@@ -1,9 +1,21 @@
-from django.db.models import Q
-from django.http import HttpRequest
-from rest_framework import status
+import hashlib
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Max, Q
+from django.http import HttpRequest, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import exceptions, status
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from .authentication import get_jwt_claims
+from .export import EXPORT_CONTENT_TYPES, iter_batches, render_csv, render_ndjson
+from .profiling import profile_phase
+
 
 class OrganizationExtensionMixin(object):
     """
@@ -12,7 +24,7 @@ class OrganizationExtensionMixin(object):
     @staticmethod
     def _extend_request(request):
         data = request.data.copy()
-        data['organization_uuid'] = request.session['jwt_organization_uuid']
+        data['organization_uuid'] = get_jwt_claims(request).organization_uuid
         request_extended = Request(HttpRequest())
         request_extended._full_data = data
         return request_extended
@@ -36,7 +48,7 @@ class OrganizationQuerySetWithGlobalFilterMixin(object):
     """
     def get_queryset(self):
         queryset = super().get_queryset()
-        organization_uuid = self.request.session.get('jwt_organization_uuid', None)
+        organization_uuid = get_jwt_claims(self.request).organization_uuid
         if not organization_uuid:
             return queryset.none()
         return queryset.filter(Q(organization_uuid=organization_uuid) | Q(is_global=True))
@@ -49,7 +61,7 @@ class OrganizationQuerySetWithGlobalFilterMixin(object):
         """
         if not request.query_params.get('is_global', 'false').lower() == 'true':
             queryset = super().get_queryset().filter(
-                Q(organization_uuid=self.request.session['jwt_organization_uuid']) |
+                Q(organization_uuid=get_jwt_claims(self.request).organization_uuid) |
                 Q(is_global=True))
         else:
             queryset = super().get_queryset().objects.all().filter(is_global=True)
@@ -61,3 +73,145 @@ class OrganizationQuerySetWithGlobalFilterMixin(object):
         else:
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
+
+
+class ConditionalGetMixin(object):
+    """
+    Adds ETag headers based on the `edit_date` of the objects to list and retrieve responses, and a Last-Modified
+    header to retrieve responses. Conditional requests of unchanged objects are answered with 304 Not Modified
+    without serializing them. Lists call `get_not_modified_response` with their filtered queryset before paginating
+    it.
+    """
+    def get_validator_version(self):
+        """
+        Returns a version of data that's serialized with the objects but doesn't change their `edit_date`.
+        """
+        return ''
+
+    def _get_not_modified_response(self, last_modified, *validators, send_last_modified=True):
+        validators = (self.request.get_full_path(), last_modified, self.get_validator_version()) + validators
+        validators = ':'.join(str(validator) for validator in validators)
+        self._etag = quote_etag(hashlib.sha256(validators.encode()).hexdigest())
+        send_last_modified = send_last_modified and last_modified
+        self._last_modified = int(last_modified.timestamp()) if send_last_modified else None
+        return get_conditional_response(self.request, etag=self._etag, last_modified=self._last_modified)
+
+    def get_not_modified_response(self, queryset):
+        """
+        Returns a 304 response if the list of the queryset didn't change, using one aggregate query.
+        The count is part of the ETag, so deleted objects change it as well. Only the ETag is sent: the latest
+        `edit_date` doesn't change when an object is deleted, or edited twice within a second, so `If-Modified-Since`
+        would answer stale lists with 304.
+        """
+        aggregate = queryset.order_by().aggregate(last_modified=Max('edit_date'), count=Count('pk'))
+        return self._get_not_modified_response(aggregate['last_modified'], aggregate['count'],
+                                               send_last_modified=False)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        not_modified_response = self._get_not_modified_response(instance.edit_date, instance.pk)
+        if not_modified_response is not None:
+            return not_modified_response
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code in (200, 304) and \
+                getattr(self, '_etag', None):
+            response['ETag'] = self._etag
+            if self._last_modified:
+                response['Last-Modified'] = http_date(self._last_modified)
+        return response
+
+
+class ProfilingMixin(object):
+    """
+    Splits the time of requests profiled by ProfilingMiddleware into authentication, permission checks and
+    filtering. The rest of the time of the view, apart from queries, counts as serialization.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        with profile_phase('serialize'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        with profile_phase('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with profile_phase('permission'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with profile_phase('permission'):
+            super().check_object_permissions(request, obj)
+
+    def filter_queryset(self, queryset):
+        with profile_phase('filter'):
+            return super().filter_queryset(queryset)
+
+
+class AtomicWriteMixin(object):
+    """
+    Runs unsafe requests in a transaction, so the changes of a request are committed together with their outbox
+    events, or rolled back together if the response is an error.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+
+        with transaction.atomic():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code >= 400:
+                transaction.set_rollback(True)
+            return response
+
+
+class ExportMixin(object):
+    """
+    Adds an `export` action streaming the filtered objects as NDJSON (default) or CSV, chosen with the `format`
+    query parameter. The objects are read with a server-side cursor and serialized one by one, so the memory used
+    doesn't depend on their number.
+    """
+    export_filename = 'export'
+
+    def get_export_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def prepare_export_batch(self, batch):
+        """
+        Called with every batch of EXPORT_CHUNK_SIZE objects before serializing them, e.g. to look up related objects.
+        """
+        return batch
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export isn't rendered by a renderer, its format is chosen by the format parameter
+        return super().perform_content_negotiation(request, force=force or self.action == 'export')
+
+    def _export_rows(self, queryset, serializer):
+        for batch in iter_batches(queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE),
+                                  settings.EXPORT_CHUNK_SIZE):
+            for instance in self.prepare_export_batch(batch):
+                yield serializer.to_representation(instance)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        export_format = request.query_params.get('format', 'ndjson')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            raise exceptions.ValidationError(
+                {'format': 'Choose one of: {}.'.format(', '.join(EXPORT_CONTENT_TYPES))})
+
+        queryset = self.get_export_queryset()
+        # The rows are read while streaming, after the request chose the database
+        queryset = queryset.using(router.db_for_read(queryset.model))
+        serializer = self.get_serializer()
+        rows = self._export_rows(queryset, serializer)
+        if export_format == 'csv':
+            fieldnames = [name for name, field in serializer.fields.items() if not field.write_only]
+            content = render_csv(rows, fieldnames)
+        else:
+            content = render_ndjson(rows)
+
+        response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(self.export_filename, export_format)
+        return response
@@ -0,0 +1,60 @@
+from django.db import models, router, transaction
+from django.utils import timezone
+
+
+class OutboxModelMixin(object):
+    """
+    Saves an object and the outbox event written by its post_save handler in one transaction, also outside of the
+    requests of AtomicWriteMixin, e.g. in the admin or import_csv. Deletes send pre_delete in their transaction.
+    """
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    Records a deleted object, so clients syncing the changes of their organization can delete it as well.
+    """
+    model = models.CharField(max_length=50, help_text='Name of the model of the deleted object, e.g. "appointment"')
+    object_id = models.CharField(max_length=36, help_text='UUID of the deleted object, or ID if it has no UUID')
+    organization_uuid = models.CharField(max_length=36, blank=True, null=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} ({self.deleted_at})'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization_uuid', 'deleted_at']),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """
+    Records a change of an object in the transaction of the change, to be relayed to other services.
+    """
+    ACTION_CREATED, ACTION_UPDATED, ACTION_DELETED = 'created', 'updated', 'deleted'
+    ACTIONS = (
+        (ACTION_CREATED, 'Created'),
+        (ACTION_UPDATED, 'Updated'),
+        (ACTION_DELETED, 'Deleted'),
+    )
+
+    organization_uuid = models.CharField(max_length=36, blank=True, null=True)
+    model = models.CharField(max_length=50, help_text='Name of the model of the changed object, e.g. "appointment"')
+    object_id = models.CharField(max_length=36, help_text='UUID of the changed object, or ID if it has no UUID')
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    created_at = models.DateTimeField(default=timezone.now)
+    transaction_id = models.BigIntegerField(
+        default=0, help_text='ID of the transaction that wrote the event (txid_current()), to relay the events in the '
+                             'order their transactions completed')
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} {self.action} ({self.created_at})'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization_uuid', 'transaction_id', 'id']),
+        ]
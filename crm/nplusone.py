@@ -0,0 +1,162 @@
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_IN_LISTS = re.compile(r'\bIN \(\?(?:, \?)*\)')
+
+_local = threading.local()
+
+RepeatedQuery = namedtuple('RepeatedQuery', ['sql', 'count', 'culprit', 'location'])
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    """
+    Returns the template of the query: literals and parameters are replaced by `?`, and lists of them by `(...)`,
+    so the queries of an N+1 pattern share it.
+    """
+    sql = _LITERALS.sub('?', sql)
+    return ' '.join(_IN_LISTS.sub('IN (...)', sql).split())
+
+
+def _is_project_frame(frame):
+    filename = frame.f_code.co_filename
+    return (filename.startswith(PROJECT_DIR) and filename != __file__ and 'site-packages' not in filename
+            and os.sep + 'tests' + os.sep not in filename)
+
+
+def _describe_frame(frame):
+    return '{}:{} in {}'.format(os.path.relpath(frame.f_code.co_filename, PROJECT_DIR), frame.f_lineno,
+                                frame.f_code.co_name)
+
+
+def _find_serializer_field(frame):
+    """
+    Returns the name of the serializer field being serialized in the frame, e.g. 'AppointmentSerializer.contact'.
+    """
+    if frame.f_code.co_name != 'to_representation':
+        return None
+    serializer, field = frame.f_locals.get('self'), frame.f_locals.get('field')
+    field_name = getattr(field, 'field_name', None)
+    if serializer is None or not field_name:
+        return None
+    return '{}.{}'.format(type(serializer).__name__, field_name)
+
+
+class QueryRecorder(object):
+    """
+    Records the template, the call site in the project and the serializer field of every query run while it
+    records. Queries are grouped by template and call stack: a query repeated from the same place, e.g. for
+    every object of a list, is an N+1 pattern.
+    """
+    def __init__(self):
+        self.queries = OrderedDict()
+
+    def __call__(self, execute, sql, params, many, context):
+        stack = []
+        culprit = None
+        frame = sys._getframe(1)
+        while frame is not None:
+            if culprit is None:
+                culprit = _find_serializer_field(frame)
+            if _is_project_frame(frame):
+                stack.append(_describe_frame(frame))
+            frame = frame.f_back
+
+        key = (normalize_sql(sql), tuple(stack))
+        if key in self.queries:
+            self.queries[key][0] += 1
+        else:
+            self.queries[key] = [1, culprit]
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def find_repeated(self, threshold=None):
+        """
+        Returns the queries repeated more than `threshold` (default: NPLUSONE_THRESHOLD) times from one place.
+        """
+        if threshold is None:
+            threshold = settings.NPLUSONE_THRESHOLD
+        return [RepeatedQuery(sql, count, culprit, stack[0] if stack else None)
+                for (sql, stack), (count, culprit) in self.queries.items() if count > threshold]
+
+
+def format_repeated(repeated_queries):
+    lines = []
+    for query in repeated_queries:
+        lines.append('{} queries by {} at {}: {}'.format(query.count, query.culprit or 'an unknown field',
+                                                         query.location or 'an unknown location', query.sql))
+    return '\n'.join(lines)
+
+
+@contextmanager
+def allow_nplusone():
+    """
+    Doesn't report the queries of the block, e.g. of a test that repeats queries on purpose.
+    """
+    previous = getattr(_local, 'allowed', False)
+    _local.allowed = True
+    try:
+        yield
+    finally:
+        _local.allowed = previous
+
+
+def is_allowed():
+    return getattr(_local, 'allowed', False)
+
+
+def raise_on_nplusone(dispatch):
+    """
+    Wraps the dispatch of a view to raise NPlusOneError if the view repeats a query, see QueryRecorder.
+    """
+    @functools.wraps(dispatch)
+    def wrapper(view, request, *args, **kwargs):
+        if is_allowed():
+            return dispatch(view, request, *args, **kwargs)
+        with QueryRecorder().record() as recorder:
+            response = dispatch(view, request, *args, **kwargs)
+        repeated = recorder.find_repeated()
+        if repeated:
+            raise NPlusOneError('N+1 queries in {} {}:\n{}'.format(request.method, request.path,
+                                                                   format_repeated(repeated)))
+        return response
+    return wrapper
+
+
+class NPlusOneMiddleware(object):
+    """
+    Logs the N+1 queries of the requests to the `crm.nplusone` logger, e.g. in staging.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder().record() as recorder:
+            response = self.get_response(request)
+        repeated = recorder.find_repeated()
+        if repeated:
+            logger.warning('N+1 queries in %s %s:\n%s', request.method, request.path, format_repeated(repeated))
+        return response
@@ -0,0 +1,102 @@
+import json
+import select
+import time
+
+import psycopg2
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .models import OutboxEvent
+
+OUTBOX_CHANNEL = 'crm_outbox'
+
+
+def record_event(model, object_id, action, organization_uuids, using='default'):
+    """
+    Writes an outbox event per organization and notifies the listeners of OUTBOX_CHANNEL. Postgres delivers the
+    notifications when the transaction of the change commits, and drops them if it's rolled back.
+    """
+    connection = connections[using]
+    transaction_id = RawSQL('txid_current()', ()) if connection.vendor == 'postgresql' else 0
+    events = [OutboxEvent.objects.using(using).create(model=model, object_id=object_id, action=action,
+                                                      organization_uuid=organization_uuid,
+                                                      transaction_id=transaction_id)
+              for organization_uuid in organization_uuids]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for event in events:
+                payload = json.dumps({'id': event.id, 'organization_uuid': event.organization_uuid})
+                cursor.execute('SELECT pg_notify(%s, %s)', [OUTBOX_CHANNEL, payload])
+    return events
+
+
+def get_commit_horizon(using='default'):
+    """
+    Returns the ID of the oldest transaction that's still running. All transactions with lower IDs have committed or
+    rolled back, so no event with a lower transaction_id can become visible anymore.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def serialize_event(event):
+    return {
+        'id': event.id,
+        'model': event.model,
+        'object_id': event.object_id,
+        'action': event.action,
+        'created_at': event.created_at.isoformat(),
+    }
+
+
+class OutboxListener(object):
+    """
+    Listens to the notifications of new outbox events on a dedicated connection, outside of Django's connection
+    handling, since it's kept open as long as the event stream.
+    """
+    def __init__(self, using='default'):
+        params = connections[using].get_connection_params()
+        # A PgBouncer in transaction pooling mode doesn't deliver notifications, the streams LISTEN on Postgres itself
+        if settings.EVENT_STREAM_LISTEN_HOST:
+            params.update(host=settings.EVENT_STREAM_LISTEN_HOST,
+                          port=settings.EVENT_STREAM_LISTEN_PORT or params.get('port'))
+        self.connection = psycopg2.connect(**params)
+        self.connection.set_session(autocommit=True)
+        with self.connection.cursor() as cursor:
+            cursor.execute('LISTEN crm_outbox')
+
+    def wait(self, organization_uuid, timeout):
+        """
+        Waits up to `timeout` seconds for an event of the organization. Returns if there was one.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if select.select([self.connection], [], [], remaining) == ([], [], []):
+                return False
+            self.connection.poll()
+            notifies = list(self.connection.notifies)
+            del self.connection.notifies[:]
+            if any(json.loads(notify.payload).get('organization_uuid') == organization_uuid for notify in notifies):
+                return True
+
+    def close(self):
+        self.connection.close()
+
+
+class OutboxPoller(object):
+    """
+    Stands in for OutboxListener where notifications can't be received, e.g. behind a PgBouncer in transaction
+    pooling mode without an EVENT_STREAM_LISTEN_HOST: the stream queries the outbox every
+    EVENT_STREAM_POLL_INTERVAL seconds.
+    """
+    def wait(self, organization_uuid, timeout):
+        time.sleep(min(settings.EVENT_STREAM_POLL_INTERVAL, timeout))
+        return True
+
+    def close(self):
+        pass
@@ -10,3 +10,9 @@ class AppointmentCursorPagination(CursorPagination):
     page_size = 30
     max_page_size = 2000
     page_size_query_param = 'page_size'
+
+
+class DrivingTimeCursorPagination(AppointmentCursorPagination):
+    # By the indexed time_point, with the UUID as a tiebreaker of driving times at the same time. A cursor can't
+    # point to null, so driving times without a time_point aren't listed
+    ordering = ('time_point', 'uuid')
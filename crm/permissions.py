@@ -1,6 +1,8 @@
 import logging
 from rest_framework.permissions import IsAuthenticated
 
+from .authentication import get_jwt_claims
+
 logger = logging.getLogger(__name__)
 
 
@@ -9,8 +11,7 @@ class AllowOptionsAuthentication(IsAuthenticated):
         if request.method == 'OPTIONS' or request.user.is_superuser:
             return True
 
-        if getattr(request, 'session', None) and \
-                request.session.get('jwt_username') and\
-                request.session.get('jwt_core_user_uuid'):
+        claims = get_jwt_claims(request)
+        if claims.username and claims.core_user_uuid:
             return True
         return False
@@ -0,0 +1,210 @@
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .middleware import get_view_name, resolve_action
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PHASES = ('auth', 'permission', 'filter', 'db', 'serialize', 'render')
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_local = threading.local()
+
+
+class RequestProfile(object):
+    """
+    Wall time of a request split into phases. Phases nest: the time of a query run while filtering counts for `db`
+    only, not for `filter` as well.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.query_count = 0
+        self.view = None
+        self._stack = []
+
+    def start(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self):
+        name, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        self.query_count += 1
+        with self.phase('db'):
+            return execute(sql, params, many, context)
+
+    def finish(self):
+        # Phases left open by an exception, e.g. a failed rendering
+        while self._stack:
+            self.stop()
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        entries = []
+        for name, duration in self.durations.items():
+            if name == 'db':
+                entries.append('db;desc="{} queries";dur={:.1f}'.format(self.query_count, duration * 1000))
+            elif duration:
+                entries.append('{};dur={:.1f}'.format(name, duration * 1000))
+        entries.append('total;dur={:.1f}'.format(self.total * 1000))
+        return ', '.join(entries)
+
+    def as_dict(self):
+        data = {f'{name}_ms': round(duration * 1000, 2) for name, duration in self.durations.items()}
+        data.update(view=self.view, db_queries=self.query_count, total_ms=round(self.total * 1000, 2))
+        return data
+
+
+def get_current_profile():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profile_phase(name):
+    """
+    Counts the time of the block for the phase, if the request is profiled.
+    """
+    profile = get_current_profile()
+    if profile is None:
+        yield
+        return
+    with profile.phase(name):
+        yield
+
+
+class ProfilingMiddleware(object):
+    """
+    Profiles requests with an `X-Profile` header of the PROFILING_SECRET and a PROFILING_SAMPLE_RATE share of all
+    other requests. Profiled responses get a `Server-Timing` header with the time spent per phase, which is logged to
+    the `crm.profiling` logger as well. Views split their time into phases with ProfilingMixin.
+
+    If PROFILING_DUMP_DIR is set, a cProfile or pyinstrument profile (PROFILER) of every profiled request is
+    written to it, keeping the latest PROFILING_DUMP_MAX_FILES.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.PROFILER not in PROFILERS:
+            raise ImproperlyConfigured('PROFILER must be one of: {}.'.format(', '.join(PROFILERS)))
+        if settings.PROFILER == 'pyinstrument' and pyinstrument is None:
+            raise ImproperlyConfigured('PROFILER is pyinstrument, but it isn\'t installed.')
+
+    @staticmethod
+    def is_profiled(request):
+        # The header is checked before the request is authenticated, so it has to be a secret
+        header = request.META.get(PROFILE_HEADER)
+        if header and settings.PROFILING_SECRET and hmac.compare_digest(header, settings.PROFILING_SECRET):
+            return True
+        # Sampling isn't security sensitive
+        return random.random() < settings.PROFILING_SAMPLE_RATE  # nosec
+
+    def __call__(self, request):
+        if not self.is_profiled(request):
+            return self.get_response(request)
+
+        profile = _local.profile = RequestProfile()
+        profiler = self.start_profiler() if settings.PROFILING_DUMP_DIR else None
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+            profile.finish()
+            if profiler is not None:
+                self.dump_profile(profiler, request)
+
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps(dict(profile.as_dict(), method=request.method, path=request.path,
+                                    status=response.status_code)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = get_current_profile()
+        if profile is not None:
+            profile.view = '{}.{}'.format(get_view_name(view_func), resolve_action(request, view_func))
+        return None
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered, the callback right after it
+        profile = get_current_profile()
+        if profile is not None:
+            profile.start('render')
+            response.add_post_render_callback(lambda response: profile.stop())
+        return response
+
+    @staticmethod
+    def start_profiler():
+        if settings.PROFILER == 'pyinstrument':
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+            return profiler
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another thread's request is being profiled
+            return None
+        return profiler
+
+    @staticmethod
+    def dump_profile(profiler, request):
+        name = '{}-{}-{}-{}'.format(time.strftime('%Y%m%d-%H%M%S'), request.method,
+                                    re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root',
+                                    uuid.uuid4().hex[:8])
+        if settings.PROFILER == 'pyinstrument':
+            profiler.stop()
+            with open(os.path.join(settings.PROFILING_DUMP_DIR, f'{name}.html'), 'w') as profile_file:
+                profile_file.write(profiler.output_html())
+        else:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(settings.PROFILING_DUMP_DIR, f'{name}.prof'))
+        ProfilingMiddleware.rotate_profiles()
+
+    @staticmethod
+    def rotate_profiles():
+        """
+        Deletes the oldest profiles of PROFILING_DUMP_DIR beyond PROFILING_DUMP_MAX_FILES. Their names start with
+        the time they were written at.
+        """
+        names = sorted(name for name in os.listdir(settings.PROFILING_DUMP_DIR) if name.endswith(('.prof', '.html')))
+        for name in names[:max(len(names) - settings.PROFILING_DUMP_MAX_FILES, 0)]:
+            try:
+                os.remove(os.path.join(settings.PROFILING_DUMP_DIR, name))
+            except FileNotFoundError:
+                # Deleted by another worker
+                pass
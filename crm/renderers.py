@@ -0,0 +1,37 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson writes these line separators unescaped, JSONRenderer escapes them for JSONP and <script> embedding
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def _default(obj):
+    # Types orjson doesn't serialize natively, e.g. Decimal, timedelta or lazy translations
+    return JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer serializing with orjson, which encodes UUIDs, datetimes, dicts and lists natively. The output is
+    the one of JSONRenderer with the default settings. Falls back to JSONRenderer if orjson isn't installed, or for
+    indented, ASCII-only or non-compact output, e.g. of the browsable API.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        if b'\xe2\x80' in ret:
+            for separator, escaped in _LINE_SEPARATORS:
+                ret = ret.replace(separator, escaped)
+        return ret
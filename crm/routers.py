@@ -0,0 +1,101 @@
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_DB_ALIAS = 'default'
+
+# Lag is 0 if the replica replayed everything it received, so an idle primary doesn't look like a lagging replica
+REPLICA_LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+"""
+
+_state = threading.local()
+
+
+def use_replica(enabled):
+    """Allow or forbid reads from the replicas for the current thread, e.g. for the current request."""
+    _state.use_replica = enabled
+
+
+def replica_enabled():
+    return getattr(_state, 'use_replica', False)
+
+
+class ReplicaSelector(object):
+    """
+    Chooses the replicas round-robin and skips the ones which lag behind more than
+    DATABASE_REPLICA_MAX_LAG seconds. The lag of every replica is checked at most every
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL seconds per process.
+    """
+    def __init__(self, replicas):
+        self.replicas = list(replicas)
+        self._cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+        self._lags = {}
+
+    def _measure_lag(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning('Replica %s is not available.', alias, exc_info=True)
+            return float('inf')
+
+    def get_lag(self, alias):
+        now = time.monotonic()
+        lag, checked_at = self._lags.get(alias, (None, None))
+        if checked_at is None or now - checked_at >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+            lag = self._measure_lag(alias)
+            self._lags[alias] = (lag, now)
+        return lag
+
+    def choose(self):
+        """Return the next replica which is up to date enough or None."""
+        for _ in self.replicas:
+            with self._lock:
+                alias = next(self._cycle)
+            if self.get_lag(alias) <= settings.DATABASE_REPLICA_MAX_LAG:
+                return alias
+        return None
+
+
+class ReplicaRouter(object):
+    """
+    Sends reads to the read replicas in DATABASE_REPLICAS, if they are allowed for the current request
+    (see `crm.middleware.ReplicaRoutingMiddleware`) and no transaction is open on the primary.
+    Everything else goes to the primary database.
+    """
+    def __init__(self):
+        self._selector = None
+
+    @property
+    def selector(self):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if self._selector is None or self._selector.replicas != list(replicas):
+            self._selector = ReplicaSelector(replicas)
+        return self._selector
+
+    def db_for_read(self, model, **hints):
+        if not replica_enabled() or not self.selector.replicas:
+            return PRIMARY_DB_ALIAS
+        if connections[PRIMARY_DB_ALIAS].in_atomic_block:
+            return PRIMARY_DB_ALIAS
+        return self.selector.choose() or PRIMARY_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DB_ALIAS
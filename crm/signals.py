@@ -0,0 +1,69 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+
+from appointment.models import Appointment, AppointmentDrivingTime, AppointmentNote
+from contact.models import Contact
+from .models import OutboxEvent, Tombstone
+from .outbox import record_event
+
+# Name of the model and identifier used by the API of the objects that are synced and published as outbox events
+SYNCED_MODELS = {
+    Contact: ('contact', lambda instance: instance.uuid),
+    Appointment: ('appointment', lambda instance: instance.uuid),
+    AppointmentNote: ('appointmentnote', lambda instance: instance.pk),
+    AppointmentDrivingTime: ('appointmentdrivingtime', lambda instance: instance.uuid),
+}
+
+
+def get_organization_uuids(instance):
+    """
+    Returns the organizations of the object, notes and driving times belong to the ones of their appointments.
+    """
+    if isinstance(instance, AppointmentNote):
+        return {str(uuid) for uuid in instance.appointment_set.values_list('organization_uuid', flat=True)}
+    if isinstance(instance, AppointmentDrivingTime):
+        return {str(uuid) for uuid in Appointment.objects.filter(
+            pk=instance.appointment_id).values_list('organization_uuid', flat=True)}
+    return {str(instance.organization_uuid)} if instance.organization_uuid else set()
+
+
+def post_save_handler(sender, instance, created, using, raw=False, **kwargs):
+    if raw:
+        return
+    model, get_object_id = SYNCED_MODELS[sender]
+    action = OutboxEvent.ACTION_CREATED if created else OutboxEvent.ACTION_UPDATED
+    record_event(model, get_object_id(instance), action, get_organization_uuids(instance), using=using)
+
+
+# pre_delete, because the relations to the appointments are gone after the delete
+
+def pre_delete_handler(sender, instance, using, **kwargs):
+    model, get_object_id = SYNCED_MODELS[sender]
+    organization_uuids = get_organization_uuids(instance)
+    Tombstone.objects.using(using).bulk_create([
+        Tombstone(model=model, object_id=get_object_id(instance), organization_uuid=organization_uuid)
+        for organization_uuid in organization_uuids or {None}
+    ])
+    record_event(model, get_object_id(instance), OutboxEvent.ACTION_DELETED, organization_uuids, using=using)
+
+
+# Notes are saved before they're added to their appointments, when they belong to no organization yet, so they're
+# published as created for the organizations of the appointments they're added to
+
+def notes_changed_handler(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        note_ids = [instance.pk]
+        organization_uuids = {str(uuid) for uuid in Appointment.objects.using(using).filter(
+            pk__in=pk_set).exclude(organization_uuid=None).values_list('organization_uuid', flat=True)}
+    else:
+        note_ids = sorted(pk_set)
+        organization_uuids = get_organization_uuids(instance)
+    for note_id in note_ids:
+        record_event('appointmentnote', note_id, OutboxEvent.ACTION_CREATED, organization_uuids, using=using)
+
+
+for synced_model in SYNCED_MODELS:
+    post_save.connect(post_save_handler, sender=synced_model)
+    pre_delete.connect(pre_delete_handler, sender=synced_model)
+m2m_changed.connect(notes_changed_handler, sender=Appointment.notes.through)
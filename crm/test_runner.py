@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+from rest_framework.views import APIView
+
+from .nplusone import raise_on_nplusone
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """
+    Fails the tests whose requests to the API views run N+1 queries, see `crm.nplusone`.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._dispatch = APIView.dispatch
+        APIView.dispatch = raise_on_nplusone(APIView.dispatch)
+
+    def teardown_test_environment(self, **kwargs):
+        APIView.dispatch = self._dispatch
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,9 @@
+from django.urls import path
 from rest_framework import routers
 
 from contact import views as views_contacts
 from appointment import views as views_apppointment
+from . import views
 
 router = routers.SimpleRouter()
 
@@ -12,4 +14,7 @@ router.register(r'appointmentdrivingtimes', views_apppointment.AppointmentDrivin
 router.register(r'contact', views_contacts.ContactViewSet)
 router.register(r'contacttype', views_contacts.TypeViewSet)
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('events/', views.EventStreamView.as_view(), name='events'),
+]
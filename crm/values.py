@@ -0,0 +1,145 @@
+import decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import fields, relations
+from rest_framework.settings import api_settings
+
+DISPLAY_PREFIX, DISPLAY_SUFFIX = 'get_', '_display'
+
+
+def _convert_items(convert):
+    if convert is None:
+        return list
+    return lambda value: [convert(item) if item is not None else None for item in value]
+
+
+def _convert_dict(convert):
+    if convert is None:
+        return lambda value: {str(key): item for key, item in value.items()}
+    return lambda value: {str(key): convert(item) if item is not None else None for key, item in value.items()}
+
+
+def _convert_datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    field_timezone = getattr(field, 'timezone', field.default_timezone())
+
+    def convert(value):
+        if field_timezone is not None:
+            value = value.astimezone(field_timezone) if timezone.is_aware(value) else \
+                timezone.make_aware(value, field_timezone)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.utc)
+        if output_format.lower() != fields.ISO_8601:
+            return value.strftime(output_format)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _convert_decimal(field):
+    if field.localize or not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        return field.to_representation
+    if field.decimal_places is None:
+        return '{:f}'.format
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    return lambda value: '{:f}'.format(value.quantize(exponent, rounding=field.rounding, context=context))
+
+
+def _convert_choice(field):
+    choices = field.choice_strings_to_values
+    return lambda value: value if value == '' else choices.get(str(value), value)
+
+
+def compile_converter(field):
+    """
+    Returns a function converting a database value of the field to its representation, or None if the value is
+    its own representation. Values that are None aren't converted.
+    """
+    if isinstance(field, (fields.ReadOnlyField, fields.CharField, fields.IntegerField, fields.FloatField,
+                          fields.BooleanField, fields.NullBooleanField)):
+        return None
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+    if isinstance(field, fields.UUIDField):
+        return str if field.uuid_format == 'hex_verbose' else lambda value: getattr(value, field.uuid_format)
+    if isinstance(field, fields.DateTimeField):
+        return _convert_datetime(field)
+    if isinstance(field, fields.DecimalField):
+        return _convert_decimal(field)
+    if isinstance(field, fields.ChoiceField):
+        return _convert_choice(field)
+    if isinstance(field, fields.ListField):
+        return _convert_items(compile_converter(field.child))
+    if isinstance(field, fields.DictField):
+        return _convert_dict(compile_converter(field.child))
+    raise ImproperlyConfigured(f'Values of {field.__class__.__name__} "{field.field_name}" can\'t be converted.')
+
+
+class ValuesSerializer(object):
+    """
+    Read-only serializer of the `.values()` rows of a queryset. It returns the representation of
+    `serializer_class` without calling a serializer field per row and field: the fields are compiled once per
+    timezone into converters of the values.
+
+    Fields with a `get_<field>_display` source are looked up in the choices of the field. Subclasses handle other
+    fields in `compile_field`; fields they compile without a lookup are set to None and have to be filled in
+    `to_representation`.
+    """
+    serializer_class = None
+    _compiled_fields = {}
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        key = (self.__class__, timezone.get_current_timezone_name() if settings.USE_TZ else None)
+        if key not in self._compiled_fields:
+            serializer = self.serializer_class(context=self.context)
+            self._compiled_fields[key] = tuple(
+                (name, ) + self.compile_field(name, field)
+                for name, field in serializer.fields.items() if not field.write_only)
+        self.fields = self._compiled_fields[key]
+
+    def compile_field(self, name, field):
+        """
+        Returns the `.values()` lookup of the field, its converter and whether a None value omits the field.
+        """
+        source_attrs = field.source_attrs
+        display = field.source.startswith(DISPLAY_PREFIX) and field.source.endswith(DISPLAY_SUFFIX)
+        if display:
+            source_attrs = [field.source[len(DISPLAY_PREFIX):-len(DISPLAY_SUFFIX)]]
+        try:
+            model_field = self.serializer_class.Meta.model._meta.get_field(source_attrs[0])
+        except (FieldDoesNotExist, IndexError):
+            raise ImproperlyConfigured(f'{self.__class__.__name__} doesn\'t support the field "{name}".')
+
+        if display:
+            choices = {key: str(value) for key, value in model_field.flatchoices}
+            return model_field.name, lambda value: choices.get(value, str(value)), False
+        return '__'.join(source_attrs), compile_converter(field), False
+
+    @property
+    def lookups(self):
+        return list(dict.fromkeys(lookup for _, lookup, _, _ in self.fields if lookup))
+
+    def get_values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def to_representation(self, rows):
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert, skip_none in self.fields:
+                value = row[lookup] if lookup else None
+                if value is None:
+                    if not skip_none:
+                        item[name] = None
+                else:
+                    item[name] = convert(value) if convert else value
+            data.append(item)
+        return data
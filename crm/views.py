@@ -0,0 +1,268 @@
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import exceptions, status
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
+
+from appointment.models import Appointment, AppointmentDrivingTime, AppointmentNote
+from appointment.serializers import (AppointmentDrivingTimeSerializer, AppointmentNoteSerializer,
+                                     AppointmentSyncSerializer)
+from contact.models import Contact
+from contact.serializers import ContactSerializer
+from .authentication import get_jwt_claims
+from .models import OutboxEvent, Tombstone
+from .outbox import OutboxListener, OutboxPoller, get_commit_horizon, serialize_event
+
+SYNC_TOKEN_SALT = 'crm.sync'
+
+
+class SyncTokenExpired(exceptions.APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The sync token expired, sync again without "since".'
+    default_code = 'sync_token_expired'
+
+
+def iter_chunks(queryset, chunk_size):
+    """
+    Yields the objects of the queryset in lists of `chunk_size`, ordered by primary key. Unlike
+    `QuerySet.iterator()`, every chunk runs the `prefetch_related` lookups of the queryset.
+    """
+    queryset = queryset.order_by('pk')
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        chunk = list(queryset.filter(pk__gt=chunk[-1].pk)[:chunk_size])
+
+
+class SyncView(APIView):
+    """
+    Changes of the organization's contacts, appointments, appointment notes and driving times since the sync token
+    given as `since`, or all of them without it. The response is streamed:
+
+        {"token": "<since of the next sync>",
+         "changed": {"contact": [...], "appointment": [...], "appointmentnote": [...], "appointmentdrivingtime": [...]},
+         "deleted": {"contact": [<uuid>, ...], ...}}
+
+    Deleted notes are listed by ID, all other objects by UUID. Objects changed right before the token was issued
+    can be returned again by the next sync.
+    """
+    def get_changed_querysets(self, organization_uuid):
+        return (
+            ('contact', ContactSerializer,
+             Contact.objects.filter(organization_uuid=organization_uuid).select_related('contact_type')),
+            ('appointment', AppointmentSyncSerializer,
+             Appointment.objects.filter(organization_uuid=organization_uuid).prefetch_related('notes')),
+            ('appointmentnote', AppointmentNoteSerializer,
+             AppointmentNote.objects.filter(appointment__organization_uuid=organization_uuid).distinct()),
+            ('appointmentdrivingtime', AppointmentDrivingTimeSerializer,
+             AppointmentDrivingTime.objects.filter(appointment__organization_uuid=organization_uuid)),
+        )
+
+    @staticmethod
+    def parse_token(token):
+        try:
+            since = parse_datetime(signing.loads(token, salt=SYNC_TOKEN_SALT))
+        except (signing.BadSignature, TypeError, ValueError):
+            since = None
+        if since is None:
+            raise exceptions.ValidationError({'since': 'Invalid sync token.'})
+        if since < timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            raise SyncTokenExpired()
+        return since
+
+    def get(self, request, *args, **kwargs):
+        organization_uuid = get_jwt_claims(request).organization_uuid
+        if not organization_uuid:
+            raise exceptions.PermissionDenied('The JWT contains no organization.')
+
+        token = request.query_params.get('since')
+        since = self.parse_token(token) if token else None
+        next_since = timezone.now() - timedelta(seconds=settings.SYNC_TOKEN_OVERLAP)
+        next_token = signing.dumps(next_since.isoformat(), salt=SYNC_TOKEN_SALT)
+        return StreamingHttpResponse(self.stream_changes(organization_uuid, since, next_token),
+                                     content_type='application/json')
+
+    def stream_changes(self, organization_uuid, since, next_token):
+        changed_querysets = self.get_changed_querysets(organization_uuid)
+
+        yield '{{"token": {}, "changed": {{'.format(json.dumps(next_token))
+        for index, (name, serializer_class, queryset) in enumerate(changed_querysets):
+            yield '{}{}: ['.format(', ' if index else '', json.dumps(name))
+            if since:
+                queryset = queryset.filter(edit_date__gt=since)
+            for chunk_index, chunk in enumerate(iter_chunks(queryset, settings.SYNC_CHUNK_SIZE)):
+                data = serializer_class(chunk, many=True, context={'request': self.request}).data
+                yield '{}{}'.format(', ' if chunk_index else '', json.dumps(data, cls=JSONEncoder)[1:-1])
+            yield ']'
+
+        deleted = {name: [] for name, _, _ in changed_querysets}
+        if since:
+            tombstones = Tombstone.objects.filter(organization_uuid=organization_uuid, deleted_at__gt=since)
+            for model, object_id in tombstones.order_by('deleted_at').values_list('model', 'object_id'):
+                deleted[model].append(object_id)
+        yield '}}, "deleted": {}}}'.format(json.dumps(deleted))
+
+
+class EventStreamUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many open event streams, retry later.'
+    default_code = 'event_stream_unavailable'
+
+
+class StreamSlots(object):
+    """
+    Counts the open event streams of the worker process, each holds a thread (or greenlet) while it's open.
+    """
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.count >= limit:
+                return False
+            self.count += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.count -= 1
+
+
+open_streams = StreamSlots()
+
+
+class EventStreamContent(object):
+    """
+    Streaming content of an event stream, which frees its slot when the response is closed, even if the stream
+    wasn't iterated.
+    """
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            open_streams.release()
+
+
+class EventStreamView(APIView):
+    """
+    Server-sent events of the changes of the organization's contacts, appointments, appointment notes and driving
+    times, relayed from the outbox as they are committed:
+
+        id: <transaction id>-<event id>
+        event: appointment.updated
+        data: {"id": <event id>, "model": "appointment", "object_id": "<uuid>", "action": "updated", ...}
+
+    The stream ends after EVENT_STREAM_MAX_DURATION seconds. Clients reconnect with the `Last-Event-ID` header,
+    which EventSource sends automatically, and receive the events they missed.
+
+    The IDs of the events are taken when they're written, but become visible when their transactions commit, in
+    any order. So the events are relayed by the ID of their transaction once all older transactions have completed,
+    and no event is skipped by the `Last-Event-ID`.
+
+    Each stream holds a worker thread (or greenlet) and a dedicated database connection listening to the outbox
+    notifications while it's open, at most EVENT_STREAM_MAX_PER_WORKER per worker process. Workers without
+    EVENT_STREAM_ENABLED answer with 404, so the streams are left to a pool of gevent workers.
+    """
+    listener_class = OutboxListener
+    events_per_query = 100
+
+    def perform_content_negotiation(self, request, force=False):
+        # The stream isn't rendered, so any Accept header, e.g. text/event-stream, is fine
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, *args, **kwargs):
+        if not settings.EVENT_STREAM_ENABLED:
+            raise exceptions.NotFound()
+        organization_uuid = get_jwt_claims(request).organization_uuid
+        if not organization_uuid:
+            raise exceptions.PermissionDenied('The JWT contains no organization.')
+
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID')
+        position = None
+        if last_event_id:
+            match = re.match(r'^(\d+)-(\d+)$', last_event_id)
+            if match is None:
+                raise exceptions.ValidationError({'Last-Event-ID': 'Invalid event ID.'})
+            position = int(match.group(1)), int(match.group(2))
+
+        if not open_streams.acquire(settings.EVENT_STREAM_MAX_PER_WORKER):
+            raise EventStreamUnavailable()
+        response = StreamingHttpResponse(EventStreamContent(self.stream_events(organization_uuid, position)),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def get_listener(self):
+        if settings.EVENT_STREAM_LISTEN_HOST or not connections['default'].settings_dict.get(
+                'DISABLE_SERVER_SIDE_CURSORS'):
+            return self.listener_class()
+        # Behind a PgBouncer in transaction pooling mode
+        return OutboxPoller()
+
+    def stream_events(self, organization_uuid, position):
+        deadline = time.monotonic() + settings.EVENT_STREAM_MAX_DURATION
+        # Listen before looking up the position, so no event is missed in between
+        listener = self.get_listener()
+        try:
+            if position is None:
+                # The events of the transactions that are still running and of the ones to come
+                position = get_commit_horizon(), 0
+            yield 'retry: {}\n\n'.format(settings.EVENT_STREAM_RETRY * 1000)
+            last_sent = time.monotonic()
+            while True:
+                horizon = get_commit_horizon()
+                transaction_id, event_id = position
+                events = list(OutboxEvent.objects.filter(
+                    Q(transaction_id__gt=transaction_id) | Q(transaction_id=transaction_id, id__gt=event_id),
+                    organization_uuid=organization_uuid,
+                ).order_by('transaction_id', 'id')[:self.events_per_query])
+                held_back = False
+                for event in events:
+                    if event.transaction_id >= horizon:
+                        # Transactions with lower IDs are still running and may commit events before it
+                        held_back = True
+                        break
+                    yield 'id: {}-{}\nevent: {}.{}\ndata: {}\n\n'.format(
+                        event.transaction_id, event.id, event.model, event.action,
+                        json.dumps(serialize_event(event)))
+                    position = event.transaction_id, event.id
+                    last_sent = time.monotonic()
+                if not held_back and len(events) == self.events_per_query:
+                    continue
+
+                now = time.monotonic()
+                if now >= deadline:
+                    return
+                if now - last_sent >= settings.EVENT_STREAM_HEARTBEAT:
+                    # Keeps proxies from closing an idle connection
+                    yield ': heartbeat\n\n'
+                    last_sent = now
+                timeout = min(last_sent + settings.EVENT_STREAM_HEARTBEAT - now, deadline - now)
+                if held_back:
+                    time.sleep(min(settings.EVENT_STREAM_POLL_INTERVAL, timeout))
+                else:
+                    listener.wait(organization_uuid, timeout)
+        finally:
+            listener.close()
@@ -1,3 +1,101 @@
+"""
+Gunicorn configuration, tuned by environment variables.
+
+http://docs.gunicorn.org/en/stable/settings.html
+"""
+import math
+import os
+
+
+def _get_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _read_cgroup_quota():
+    """Returns the CPU quota of the cgroup (v2 or v1) of the process, or None if it is not limited."""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as cfs_quota, \
+                    open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as cfs_period:
+                quota, period = cfs_quota.read().strip(), cfs_period.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    return int(quota) / int(period)
+
+
+def get_cpu_count():
+    """
+    Returns the number of CPUs the process may use: the ones of its affinity mask, limited by the CPU quota of
+    its container, as `multiprocessing.cpu_count()` counts all the CPUs of the host.
+    """
+    try:
+        cpu_count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpu_count = os.cpu_count() or 1
+    quota = _read_cgroup_quota()
+    if quota:
+        cpu_count = min(cpu_count, max(1, math.ceil(quota)))
+    return cpu_count
+
+
 bind = '0.0.0.0:8080'
 limit_request_field_size = 0
 limit_request_line = 0
+
+# Worker processes and threads
+# `sync` serves one request per process, `gthread` one per thread and `gevent` one per greenlet. An open /events/
+# stream holds its thread or greenlet for minutes, so `gevent` is the default while the stream is enabled. To serve
+# the other requests with `gthread` workers, run them with EVENT_STREAM_ENABLED=False and route /events/ to a
+# separate pool of `gevent` workers.
+
+cpu_count = get_cpu_count()
+
+event_stream_enabled = os.getenv('EVENT_STREAM_ENABLED', 'True') == 'True'
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent' if event_stream_enabled else 'gthread')
+workers = _get_int('GUNICORN_WORKERS', 2 * cpu_count + 1)
+threads = _get_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+worker_connections = _get_int('GUNICORN_WORKER_CONNECTIONS', 1000)
+
+# Restart workers after a number of requests to limit memory growth. The jitter avoids that all workers restart
+# at the same time.
+max_requests = _get_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _get_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+# Load the application before forking, so the workers share its memory (copy-on-write). Not by default with
+# gevent, as the workers monkey-patch the standard library after the fork and the modules imported by the
+# preloaded application would keep the blocking versions.
+preload_app = os.getenv('GUNICORN_PRELOAD_APP', str(worker_class != 'gevent')) == 'True'
+
+timeout = _get_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _get_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _get_int('GUNICORN_KEEPALIVE', 5)
+
+
+def on_starting(server):
+    """Warn that the /events/ streams take the threads of the workers, unless they're gevent workers."""
+    if event_stream_enabled and worker_class != 'gevent':
+        server.log.warning('Every /events/ stream holds a thread of a %s worker, set EVENT_STREAM_ENABLED=False and '
+                           'serve /events/ with gevent workers.', worker_class)
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative with gevent, if the worker class and psycogreen are available."""
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('psycogreen is not installed, database queries will block the gevent worker.')
+        else:
+            patch_psycopg()
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited from the Prometheus metrics shared by the workers."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -64,15 +64,53 @@ INSTALLED_APPS = INSTALLED_APPS_DJANGO + INSTALLED_APPS_THIRD_PARTIES + \
     INSTALLED_APPS_LOCAL
 
 MIDDLEWARE = [
+    'crm.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'crm.middleware.ReplicaRoutingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Profiling
+# Requests with an `X-Profile: <PROFILING_SECRET>` header and a sampled share of all others get a Server-Timing header
+
+PROFILING_ENABLED = True if os.getenv('PROFILING_ENABLED') == 'True' else False
+
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, 'crm.profiling.ProfilingMiddleware')
+
+# Value of the X-Profile header of requests to profile (unset: the header is ignored)
+PROFILING_SECRET = os.getenv('PROFILING_SECRET')
+
+# Share of requests profiled without the header, e.g. 0.01
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+
+# Directory the profiles of the profiled requests are written to (unset: none are written)
+PROFILING_DUMP_DIR = os.getenv('PROFILING_DUMP_DIR')
+
+# Number of profiles kept in PROFILING_DUMP_DIR, the oldest ones are deleted
+PROFILING_DUMP_MAX_FILES = int(os.getenv('PROFILING_DUMP_MAX_FILES', 100))
+
+# Profiler of the written profiles: cprofile (.prof files) or pyinstrument (.html files, if it's installed)
+PROFILER = os.getenv('PROFILER', 'cprofile')
+
+# N+1 queries
+# A query run more than NPLUSONE_THRESHOLD times from the same place in one request is reported: the tests fail,
+# and with NPLUSONE_ENABLED (e.g. in staging) it's logged to the `crm.nplusone` logger
+
+NPLUSONE_ENABLED = True if os.getenv('NPLUSONE_ENABLED') == 'True' else False
+
+if NPLUSONE_ENABLED:
+    MIDDLEWARE.insert(0, 'crm.nplusone.NPlusOneMiddleware')
+
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 1))
+
+TEST_RUNNER = 'crm.test_runner.NPlusOneTestRunner'
+
 ROOT_URLCONF = 'crm_service.urls'
 
 TEMPLATES = [
@@ -97,17 +135,54 @@ WSGI_APPLICATION = 'crm_service.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.0/ref/settings/#databases
 
+# PostgreSQL uses a backend with health checks for persistent connections and an optional connection pool.
+# Behind PgBouncer in transaction mode, server-side cursors must be disabled.
+
+DATABASE_ENGINE = os.environ['DATABASE_ENGINE']
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.{}'.format(os.environ['DATABASE_ENGINE']),
+        'ENGINE': 'crm.db.backends.postgresql' if DATABASE_ENGINE == 'postgresql'
+        else 'django.db.backends.{}'.format(DATABASE_ENGINE),
         'NAME': os.environ['DATABASE_NAME'],
         'USER': os.environ['DATABASE_USER'],
         'PASSWORD': os.getenv('DATABASE_PASSWORD'),
         'HOST': os.getenv('DATABASE_HOST', 'localhost'),
         'PORT': os.environ['DATABASE_PORT'],
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': False if os.getenv('DATABASE_CONN_HEALTH_CHECKS') == 'False' else True,
+        'CONN_POOL_SIZE': int(os.getenv('DATABASE_CONN_POOL_SIZE', 0)),
+        'CONN_POOL_TIMEOUT': int(os.getenv('DATABASE_CONN_POOL_TIMEOUT', 10)),
+        'DISABLE_SERVER_SIDE_CURSORS': True if os.getenv('DATABASE_DISABLE_SERVER_SIDE_CURSORS') == 'True'
+        else False,
     }
 }
 
+# Optional read replicas, as comma-separated `host` or `host:port` list. Safe requests of views which allow it read
+# from them round-robin, unless they lag behind more than DATABASE_REPLICA_MAX_LAG seconds.
+
+DATABASE_REPLICAS = []
+
+for index, replica in enumerate(filter(None, os.getenv('DATABASE_REPLICA_HOSTS', '').split(','))):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    DATABASES['replica_{}'.format(index)] = dict(
+        DATABASES['default'],
+        HOST=replica_host,
+        PORT=replica_port or os.getenv('DATABASE_REPLICA_PORT', DATABASES['default']['PORT']),
+        USER=os.getenv('DATABASE_REPLICA_USER', DATABASES['default']['USER']),
+        PASSWORD=os.getenv('DATABASE_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append('replica_{}'.format(index))
+
+DATABASE_ROUTERS = ['crm.routers.ReplicaRouter']
+
+DATABASE_REPLICA_MAX_LAG = int(os.getenv('DATABASE_REPLICA_MAX_LAG', 10))
+
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('DATABASE_REPLICA_LAG_CHECK_INTERVAL', 5))
+
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 15))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
@@ -158,25 +233,133 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-        'oauth2_provider_jwt.authentication.JWTAuthentication',
+        'crm.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'crm.permissions.AllowOptionsAuthentication',
     ),
     'EXCEPTION_HANDLER': 'crm.handlers.custom_exception_handler',
+    # JSON is rendered and parsed with orjson if it's installed, see requirements/production.txt
+    'DEFAULT_RENDERER_CLASSES': (
+        'crm.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'crm.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
+# Sync
+
+# Objects serialized per query of a /sync/ response
+SYNC_CHUNK_SIZE = int(os.getenv('SYNC_CHUNK_SIZE', 500))
+
+# Seconds a sync token reaches back, so changes of transactions committed after it was issued aren't missed
+SYNC_TOKEN_OVERLAP = int(os.getenv('SYNC_TOKEN_OVERLAP', 30))
+
+# Days tombstones of deleted objects are kept, older sync tokens need a full sync
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+# Export
+
+# Rows fetched per round trip of the server-side cursor of /contact/export/ and /appointment/export/
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+
+# Outbox events
+
+# Whether /events/ is served (False: 404). Its streams hold a thread of a gthread worker each, so gunicorn runs gevent
+# workers by default while it's enabled
+EVENT_STREAM_ENABLED = os.getenv('EVENT_STREAM_ENABLED', 'True') == 'True'
+
+# Seconds an /events/ stream is kept open before the client has to reconnect
+EVENT_STREAM_MAX_DURATION = int(os.getenv('EVENT_STREAM_MAX_DURATION', 300))
+
+# Seconds between heartbeats of an idle /events/ stream
+EVENT_STREAM_HEARTBEAT = int(os.getenv('EVENT_STREAM_HEARTBEAT', 15))
+
+# Seconds between queries of the outbox of an /events/ stream that waits for older transactions to complete, or
+# that polls because it can't LISTEN
+EVENT_STREAM_POLL_INTERVAL = float(os.getenv('EVENT_STREAM_POLL_INTERVAL', 0.25))
+
+# Postgres host and port the /events/ streams LISTEN on (unset: the ones of the database). A PgBouncer in transaction
+# pooling mode doesn't deliver notifications, so with DATABASE_DISABLE_SERVER_SIDE_CURSORS and without a listen host
+# the streams poll the outbox instead
+EVENT_STREAM_LISTEN_HOST = os.getenv('EVENT_STREAM_LISTEN_HOST')
+EVENT_STREAM_LISTEN_PORT = os.getenv('EVENT_STREAM_LISTEN_PORT')
+
+# Open /events/ streams per worker process, more are answered with 503. A stream holds a thread of a gthread worker,
+# half of them are left to the other requests, or a greenlet of a gevent worker
+if os.getenv('GUNICORN_WORKER_CLASS', 'gevent' if EVENT_STREAM_ENABLED else 'gthread') == 'gevent':
+    EVENT_STREAM_MAX_PER_WORKER = int(os.getenv('EVENT_STREAM_MAX_PER_WORKER',
+                                                int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000)) // 2))
+else:
+    EVENT_STREAM_MAX_PER_WORKER = int(os.getenv('EVENT_STREAM_MAX_PER_WORKER',
+                                                max(int(os.getenv('GUNICORN_THREADS', 4)) // 2, 1)))
+
+# Seconds a client waits before reconnecting to the /events/ stream
+EVENT_STREAM_RETRY = int(os.getenv('EVENT_STREAM_RETRY', 1))
+
+# Days outbox events are kept, clients reconnecting later miss older events
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', 7))
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Slow-changing lists are cached in local memory, or in Redis if CACHE_REDIS_URL is set, e.g. redis://redis:6379/0
+
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'crm',
+            'OPTIONS': {
+                # Fall back to the database if Redis isn't available
+                'IGNORE_EXCEPTIONS': True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', 3600))
+
+# Whether the cache is shared by all workers. A version bumped in a local-memory cache isn't seen by the other
+# workers, so values that are invalidated by versions (the Types) aren't cached without a shared cache
+CACHE_SHARED = bool(CACHE_REDIS_URL)
+
+
 # JWT Configuration
 
 JWT_AUTH_DISABLED = True
 JWT_ALLOWED_ISSUER = 'bifrost'
 JWT_PUBLIC_KEY_RSA_BIFROST = os.getenv('JWT_PUBLIC_KEY_RSA_BIFROST')
 
+# Number of verified tokens whose claims are cached per process (0 disables the cache)
+JWT_VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('JWT_VERIFIED_TOKEN_CACHE_SIZE', 1024))
+
 SWAGGER_SETTINGS = {
     'DEFAULT_INFO': 'crm_service.urls.swagger_info',
 }
 
+# Metrics
+
+# Seconds the counts of the appointment notifications served at /metrics are cached, e.g. the scrape interval, so
+# scrapes don't count the whole table each
+METRICS_NOTIFICATIONS_CACHE_SECONDS = int(os.getenv('METRICS_NOTIFICATIONS_CACHE_SECONDS', 30))
+
+
 # Logging
 # https://docs.djangoproject.com/en/2.0/topics/logging/#configuring-logging
 # more colors: https://stackoverflow.com/questions/4842424/list-of-ansi-color-escape-sequences
@@ -206,5 +389,10 @@ LOGGING = {
             'level': os.getenv('LOG_LEVEL', 'DEBUG'),
             'propagate': False,
         },
+        'crm': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'DEBUG'),
+            'propagate': False,
+        },
     },
 }
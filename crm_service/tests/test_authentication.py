@@ -0,0 +1,132 @@
+import time
+import uuid
+from unittest import mock
+
+import jwt
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import exceptions
+from rest_framework.test import APIRequestFactory
+
+from appointment.tests import model_factories as mfactories
+from crm.authentication import JWTAuthentication, JWTClaims, VerifiedTokenCache, get_jwt_claims, verified_tokens
+
+
+class JWTAuthenticationTest(TestCase):
+    def setUp(self):
+        self.organization_uuid = str(uuid.uuid4())
+        self.payload = {
+            'iss': 'bifrost',
+            'exp': 1893456000,
+            'organization_uuid': self.organization_uuid,
+            'core_user_uuid': str(uuid.uuid4()),
+            'username': 'Test User',
+        }
+        self.factory = APIRequestFactory()
+        verified_tokens.clear()
+        self.addCleanup(verified_tokens.clear)
+
+    @mock.patch('crm.authentication.decode_jwt')
+    def test_authenticate(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        request = self.factory.get('/appointment/', HTTP_AUTHORIZATION='JWT header.payload.signature')
+        request.session = mock.MagicMock()
+
+        user, claims = JWTAuthentication().authenticate(request)
+
+        mock_decode_jwt.assert_called_once_with('header.payload.signature')
+        self.assertIsInstance(user, AnonymousUser)
+        self.assertIsInstance(claims, JWTClaims)
+        self.assertEqual(claims.organization_uuid, self.organization_uuid)
+        self.assertEqual(claims.core_user_uuid, self.payload['core_user_uuid'])
+        self.assertEqual(claims.username, 'Test User')
+        self.assertEqual(request.session.mock_calls, [])
+
+    @mock.patch('crm.authentication.decode_jwt')
+    def test_authenticate_verifies_token_once(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        for _ in range(3):
+            request = self.factory.get('/appointment/', HTTP_AUTHORIZATION='JWT header.payload.signature')
+            _, claims = JWTAuthentication().authenticate(request)
+            self.assertEqual(claims.organization_uuid, self.organization_uuid)
+
+        mock_decode_jwt.assert_called_once_with('header.payload.signature')
+        self.assertEqual((verified_tokens.hits, verified_tokens.misses), (2, 1))
+
+    def test_authenticate_without_token(self):
+        request = self.factory.get('/appointment/')
+        self.assertIsNone(JWTAuthentication().authenticate(request))
+
+    @mock.patch('crm.authentication.decode_jwt')
+    def test_authenticate_expired_token(self, mock_decode_jwt):
+        mock_decode_jwt.side_effect = jwt.ExpiredSignatureError()
+        request = self.factory.get('/appointment/', HTTP_AUTHORIZATION='JWT header.payload.signature')
+
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Signature has expired.'):
+            JWTAuthentication().authenticate(request)
+
+    @mock.patch('crm.authentication.decode_jwt')
+    def test_list_without_session(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        mfactories.Appointment(organization_uuid=self.organization_uuid)
+        mfactories.Appointment(organization_uuid=uuid.uuid4())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/appointment/', HTTP_AUTHORIZATION='JWT header.payload.signature')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['organization_uuid'], self.organization_uuid)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+
+    def test_get_jwt_claims_from_session(self):
+        request = self.factory.get('/appointment/')
+        request.session = {'jwt_organization_uuid': self.organization_uuid, 'jwt_username': 'Test User'}
+
+        claims = get_jwt_claims(request)
+        self.assertEqual(claims.organization_uuid, self.organization_uuid)
+        self.assertEqual(claims.username, 'Test User')
+        self.assertIsNone(claims.core_user_uuid)
+
+
+class VerifiedTokenCacheTest(SimpleTestCase):
+    def test_hit_and_miss(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        self.assertIsNone(cache.get('token'))
+        cache.set('token', {'exp': time.time() + 60, 'username': 'Test User'})
+
+        self.assertEqual(cache.get('token')['username'], 'Test User')
+        self.assertEqual(cache.hit_rate, 0.5)
+        self.assertNotIn('token', cache._entries)
+
+    def test_evict_least_recently_used(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        exp = time.time() + 60
+        cache.set('token1', {'exp': exp})
+        cache.set('token2', {'exp': exp})
+        cache.get('token1')
+        cache.set('token3', {'exp': exp})
+
+        self.assertIsNotNone(cache.get('token1'))
+        self.assertIsNone(cache.get('token2'))
+        self.assertIsNotNone(cache.get('token3'))
+
+    def test_evict_expired(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        cache.set('token', {'exp': time.time() + 60})
+        with mock.patch('crm.authentication.time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get('token'))
+        self.assertEqual(len(cache._entries), 0)
+
+    def test_no_exp_not_cached(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        cache.set('token', {'username': 'Test User'})
+        self.assertIsNone(cache.get('token'))
+
+    def test_disabled(self):
+        cache = VerifiedTokenCache(maxsize=0)
+        cache.set('token', {'exp': time.time() + 60})
+        self.assertIsNone(cache.get('token'))
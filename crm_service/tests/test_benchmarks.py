@@ -0,0 +1,90 @@
+import json
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from appointment.models import Appointment, AppointmentDrivingTime, AppointmentNote
+from contact.models import Contact, Type
+from crm.management.commands.run_benchmarks import percentile
+from crm.management.commands.seed_benchmark_data import organization_uuids, split_by_weight
+
+
+class BenchmarkHelpersTest(SimpleTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_split_by_weight(self):
+        parts = split_by_weight(1000, 4)
+        self.assertEqual(sum(parts), 1000)
+        self.assertEqual(parts, sorted(parts, reverse=True))
+
+    def test_organization_uuids(self):
+        self.assertEqual(organization_uuids(3, seed=1), organization_uuids(3, seed=1))
+        self.assertNotEqual(organization_uuids(3, seed=1), organization_uuids(3, seed=2))
+
+
+class SeedBenchmarkDataTest(TestCase):
+    def _seed(self, **options):
+        call_command('seed_benchmark_data', organizations=3, contacts=40, appointments=60, batch_size=7,
+                     stdout=StringIO(), **options)
+
+    def _snapshot(self):
+        return (sorted(Contact.objects.values_list('uuid', 'first_name', 'customer_id', 'emails')),
+                sorted(Appointment.objects.values_list('uuid', 'start_date', 'contact_uuid')),
+                AppointmentNote.objects.count(), AppointmentDrivingTime.objects.count())
+
+    def test_seed(self):
+        self._seed()
+
+        organizations = organization_uuids(3, seed=0)
+        self.assertEqual(Contact.objects.count(), 40)
+        self.assertEqual(Appointment.objects.count(), 60)
+        self.assertEqual(set(Contact.objects.values_list('organization_uuid', flat=True)), set(organizations))
+        self.assertGreater(AppointmentNote.objects.filter(appointment__isnull=False).count(), 0)
+        self.assertGreater(AppointmentDrivingTime.objects.count(), 0)
+        self.assertEqual(Type.objects.filter(is_global=True).count(), 2)
+        contact = Contact.objects.filter(organization_uuid=organizations[0]).first()
+        self.assertEqual(contact.addresses[0]['country'], 'Germany')
+        appointment = Appointment.objects.filter(contact_uuid__isnull=False).first()
+        self.assertTrue(Contact.objects.filter(uuid=appointment.contact_uuid,
+                                               organization_uuid=str(appointment.organization_uuid)).exists())
+
+    def test_seed_is_repeatable(self):
+        self._seed()
+        snapshot = self._snapshot()
+        self._seed()
+        self.assertEqual(self._snapshot(), snapshot)
+        self.assertEqual(Type.objects.filter(is_global=True).count(), 2)
+
+
+class RunBenchmarksTest(TestCase):
+    def setUp(self):
+        call_command('seed_benchmark_data', organizations=2, contacts=30, appointments=40, stdout=StringIO())
+
+    def test_run_benchmarks(self):
+        out = StringIO()
+        call_command('run_benchmarks', runs=2, warmup=1, export_runs=1, stdout=out, stderr=StringIO())
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['organization_uuid'], organization_uuids(2, seed=0)[0])
+        self.assertEqual(set(report['scenarios']), {
+            'list_contacts', 'filter_contacts', 'search_contacts', 'search_contacts_starts_with', 'create_contact',
+            'update_contact', 'list_appointments', 'filter_appointments', 'create_appointment', 'update_appointment',
+            'export_contacts', 'export_appointments'})
+        list_contacts = report['scenarios']['list_contacts']
+        self.assertEqual((list_contacts['method'], list_contacts['path'], list_contacts['runs']),
+                         ('GET', '/contact/', 2))
+        self.assertLessEqual(list_contacts['p50_ms'], list_contacts['p99_ms'])
+        self.assertGreater(list_contacts['queries'], 0)
+        self.assertEqual(report['scenarios']['export_contacts']['runs'], 1)
+        # The writes are rolled back
+        self.assertEqual(Contact.objects.count(), 30)
+        self.assertEqual(Appointment.objects.count(), 40)
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(CommandError):
+            call_command('run_benchmarks', scenarios=['delete_everything'], stdout=StringIO())
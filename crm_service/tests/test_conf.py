@@ -1,5 +1,7 @@
+import importlib
 import os
 import uuid
+from unittest import mock
 
 from django.test import TestCase
 from django.apps import apps
@@ -17,6 +19,67 @@ class TestGunicornConf(TestCase):
         self.assertEqual(gunicorn_conf.limit_request_field_size, 0)
         self.assertEqual(gunicorn_conf.limit_request_line, 0)
 
+    def _reload_conf(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return importlib.reload(gunicorn_conf)
+
+    def tearDown(self):
+        importlib.reload(gunicorn_conf)
+
+    def test_default_workers_and_threads(self):
+        conf = self._reload_conf(EVENT_STREAM_ENABLED='False')
+        self.assertEqual(conf.worker_class, 'gthread')
+        self.assertEqual(conf.workers, 2 * gunicorn_conf.get_cpu_count() + 1)
+        self.assertEqual(conf.threads, 4)
+        self.assertEqual(conf.max_requests, 1000)
+        self.assertEqual(conf.max_requests_jitter, 100)
+        self.assertTrue(conf.preload_app)
+
+    def test_config_from_env(self):
+        conf = self._reload_conf(GUNICORN_WORKER_CLASS='gevent', GUNICORN_WORKERS='3',
+                                 GUNICORN_MAX_REQUESTS='500', GUNICORN_PRELOAD_APP='False',
+                                 GUNICORN_TIMEOUT='60', GUNICORN_KEEPALIVE='2')
+        self.assertEqual(conf.worker_class, 'gevent')
+        self.assertEqual(conf.workers, 3)
+        self.assertEqual(conf.threads, 1)
+        self.assertEqual(conf.max_requests, 500)
+        self.assertEqual(conf.max_requests_jitter, 50)
+        self.assertFalse(conf.preload_app)
+        self.assertEqual(conf.timeout, 60)
+        self.assertEqual(conf.keepalive, 2)
+
+    def test_gevent_with_event_stream(self):
+        conf = self._reload_conf(EVENT_STREAM_ENABLED='True')
+        self.assertEqual(conf.worker_class, 'gevent')
+        self.assertEqual(conf.threads, 1)
+        self.assertFalse(conf.preload_app)
+
+        server = mock.Mock()
+        conf.on_starting(server)
+        server.log.warning.assert_not_called()
+        conf = self._reload_conf(EVENT_STREAM_ENABLED='True', GUNICORN_WORKER_CLASS='gthread')
+        conf.on_starting(server)
+        server.log.warning.assert_called_once()
+
+    def test_gevent_does_not_preload_app(self):
+        conf = self._reload_conf(GUNICORN_WORKER_CLASS='gevent')
+        self.assertFalse(conf.preload_app)
+        conf = self._reload_conf(GUNICORN_WORKER_CLASS='gevent', GUNICORN_PRELOAD_APP='True')
+        self.assertTrue(conf.preload_app)
+
+    def test_cpu_count_from_affinity(self):
+        with mock.patch.object(os, 'sched_getaffinity', return_value={0, 1, 2}, create=True), \
+                mock.patch.object(gunicorn_conf, '_read_cgroup_quota', return_value=None):
+            self.assertEqual(gunicorn_conf.get_cpu_count(), 3)
+
+    def test_cpu_count_from_cgroup_quota(self):
+        with mock.patch.object(os, 'sched_getaffinity', return_value=set(range(16)), create=True), \
+                mock.patch('builtins.open', mock.mock_open(read_data='150000 100000\n')):
+            self.assertEqual(gunicorn_conf.get_cpu_count(), 2)
+        with mock.patch.object(os, 'sched_getaffinity', return_value=set(range(16)), create=True), \
+                mock.patch('builtins.open', mock.mock_open(read_data='max 100000\n')):
+            self.assertEqual(gunicorn_conf.get_cpu_count(), 16)
+
 
 class CrmConfigTest(TestCase):
     def test_apps(self):
@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test import TransactionTestCase
+
+from crm.db.backends.postgresql.base import ConnectionPool, DatabaseWrapper
+
+
+class DatabaseHealthCheckTest(TransactionTestCase):
+    def test_broken_persistent_connection_is_replaced(self):
+        connection.ensure_connection()
+        broken_connection = connection.connection
+        broken_connection.close()
+
+        # a new request starts
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        self.assertIsNot(connection.connection, broken_connection)
+
+    def test_health_check_once_per_request(self):
+        connection.ensure_connection()
+        connection.close_if_unusable_or_obsolete()
+        self.assertFalse(connection.health_check_done)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertTrue(connection.health_check_done)
+
+
+class DatabaseConnectionPoolTest(TransactionTestCase):
+    def setUp(self):
+        settings_dict = dict(connection.settings_dict, CONN_POOL_SIZE=1, CONN_POOL_TIMEOUT=0, CONN_MAX_AGE=0)
+        self.wrapper = DatabaseWrapper(settings_dict)
+
+    def tearDown(self):
+        self.wrapper.close()
+        while self.wrapper.pool.idle_count:
+            self.wrapper.pool.get(None).close()
+        DatabaseWrapper._pools.clear()
+
+    def test_connection_is_reused(self):
+        self.wrapper.ensure_connection()
+        raw_connection = self.wrapper.connection
+        self.wrapper.close()
+        self.assertEqual(self.wrapper.pool.idle_count, 1)
+        self.assertFalse(raw_connection.closed)
+
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, raw_connection)
+        self.assertEqual(self.wrapper.pool.idle_count, 0)
+
+    def test_broken_pooled_connection_is_replaced(self):
+        self.wrapper.ensure_connection()
+        raw_connection = self.wrapper.connection
+        self.wrapper.close()
+        raw_connection.close()
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIsNot(self.wrapper.connection, raw_connection)
+
+    def test_pool_exhausted(self):
+        pool = ConnectionPool(1, timeout=0)
+        pool.get(lambda: 'connection')
+        with self.assertRaises(DatabaseWrapper.Database.OperationalError):
+            pool.get(lambda: 'connection')
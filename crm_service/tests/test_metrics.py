@@ -0,0 +1,182 @@
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from unittest import mock
+
+import pytz
+from django.core.cache import cache
+from django.test import TestCase
+from prometheus_client import REGISTRY
+
+from appointment.models import Appointment, AppointmentNotification
+from appointment.notifications import AppointmentNotificationEMail
+from contact.tests import model_factories as mfactories
+from crm import routers
+from crm.authentication import verified_tokens
+from crm.routers import ReplicaRouter
+
+from .. import gunicorn_conf
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        self.organization_uuid = str(uuid.uuid4())
+        self.payload = {
+            'iss': 'bifrost',
+            'exp': 1893456000,
+            'organization_uuid': self.organization_uuid,
+            'core_user_uuid': str(uuid.uuid4()),
+            'username': 'Test User',
+        }
+        mfactories.Contact(organization_uuid=self.organization_uuid)
+        verified_tokens.clear()
+        self.addCleanup(verified_tokens.clear)
+
+    @mock.patch('crm.authentication.decode_jwt')
+    def test_request_latency_and_queries(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        labels = {'view': 'ContactViewSet', 'action': 'list'}
+        requests_before = _sample('crm_http_request_duration_seconds_count', status='200', **labels)
+        queries_before = _sample('crm_db_queries_total', **labels)
+
+        response = self.client.get('/contact/', HTTP_AUTHORIZATION='JWT header.payload.signature')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_sample('crm_http_request_duration_seconds_count', status='200', **labels),
+                         requests_before + 1)
+        self.assertEqual(_sample('crm_http_request_db_queries_count', **labels), requests_before + 1)
+        self.assertGreater(_sample('crm_db_queries_total', **labels), queries_before)
+
+    @mock.patch('crm.authentication.decode_jwt')
+    def test_jwt_cache_lookups(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        hits_before = _sample('crm_jwt_verified_token_cache_lookups_total', result='hit')
+        misses_before = _sample('crm_jwt_verified_token_cache_lookups_total', result='miss')
+
+        for _ in range(2):
+            self.client.get('/contact/', HTTP_AUTHORIZATION='JWT header.payload.signature')
+
+        content = self.client.get('/metrics').content.decode()
+        self.assertIn('crm_jwt_verified_token_cache_lookups_total{result="hit"} %s' % (hits_before + 1), content)
+        self.assertIn('crm_jwt_verified_token_cache_lookups_total{result="miss"} %s' % (misses_before + 1), content)
+
+    def test_unresolved_request(self):
+        before = _sample('crm_http_request_duration_seconds_count', view='none', action='none', status='404')
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get('/does-not-exist/').status_code, 404)
+        self.assertEqual(_sample('crm_http_request_duration_seconds_count', view='none', action='none',
+                                 status='404'), before + 1)
+
+
+class MetricsViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        appointment = Appointment.objects.create(
+            owner=uuid.uuid4(), name='Concert', type=['Test Type'],
+            start_date=datetime(2018, 1, 1, 12, 15, tzinfo=pytz.UTC),
+            end_date=datetime(2018, 1, 1, 12, 30, tzinfo=pytz.UTC))
+        for sent_at in (None, None, datetime(2018, 1, 1, 10, tzinfo=pytz.UTC)):
+            AppointmentNotification.objects.create(
+                subject='Test Mail', message='Test Body', recipient='test@example.com', appointment=appointment,
+                sent_at=sent_at)
+
+    def test_metrics(self):
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        self.assertIn('crm_appointment_notifications{state="pending"} 2.0', content)
+        self.assertIn('crm_appointment_notifications{state="sent"} 1.0', content)
+        self.assertIn('# TYPE crm_http_request_duration_seconds histogram', content)
+
+    def test_notifications_counted_once_per_interval(self):
+        self.client.get('/metrics')
+        AppointmentNotification.objects.update(sent_at=None)
+
+        with self.assertNumQueries(0):
+            content = self.client.get('/metrics').content.decode()
+        self.assertIn('crm_appointment_notifications{state="pending"} 2.0', content)
+
+        cache.clear()
+        content = self.client.get('/metrics').content.decode()
+        self.assertIn('crm_appointment_notifications{state="pending"} 3.0', content)
+
+    def test_notifications_counted_on_replica(self):
+        replica_enabled = []
+
+        def db_for_read(router, model, **hints):
+            replica_enabled.append(routers.replica_enabled())
+            return 'default'
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read):
+            self.client.get('/metrics')
+        self.assertEqual(replica_enabled, [True])
+        self.assertFalse(routers.replica_enabled())
+
+    def test_multiprocess_metrics(self):
+        multiprocess_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiprocess_dir)
+        with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=multiprocess_dir), \
+                mock.patch('crm.metrics.multiprocess.MultiProcessCollector') as collector:
+            response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(collector.call_args[1], {'path': multiprocess_dir})
+        # The metrics of this process are read from the directory only
+        self.assertNotIn(b'crm_http_request_duration_seconds', response.content)
+        self.assertIn(b'crm_appointment_notifications{state="pending"} 2.0', response.content)
+
+
+class NotificationMetricsTest(TestCase):
+    def setUp(self):
+        appointment = Appointment.objects.create(
+            owner=uuid.uuid4(), name='Concert', type=['Test Type'], address='Oderberger Straße 16A',
+            start_date=datetime(2018, 1, 1, 12, 15, tzinfo=pytz.UTC),
+            end_date=datetime(2018, 1, 1, 12, 30, tzinfo=pytz.UTC))
+        self.notification = AppointmentNotification.objects.create(
+            subject='Test Mail', message='Test Body', recipient='test@example.com', appointment=appointment)
+
+    def test_sent(self):
+        sent_before = _sample('crm_appointment_notifications_sent_total')
+        latency_before = _sample('crm_appointment_notification_send_seconds_count')
+
+        AppointmentNotificationEMail(self.notification).notify_recipient()
+
+        self.assertEqual(_sample('crm_appointment_notifications_sent_total'), sent_before + 1)
+        self.assertEqual(_sample('crm_appointment_notification_send_seconds_count'), latency_before + 1)
+
+    @mock.patch('appointment.notifications.send_mail', side_effect=ConnectionRefusedError)
+    def test_failure(self, send_mail):
+        sent_before = _sample('crm_appointment_notifications_sent_total')
+        failures_before = _sample('crm_appointment_notification_failures_total')
+
+        with self.assertRaises(ConnectionRefusedError):
+            AppointmentNotificationEMail(self.notification).notify_recipient()
+
+        self.assertIsNone(self.notification.sent_at)
+        self.assertEqual(_sample('crm_appointment_notifications_sent_total'), sent_before)
+        self.assertEqual(_sample('crm_appointment_notification_failures_total'), failures_before + 1)
+
+
+class GunicornChildExitTest(TestCase):
+    @mock.patch('prometheus_client.multiprocess.mark_process_dead')
+    def test_mark_process_dead(self, mark_process_dead):
+        worker = mock.Mock(pid=1234)
+        with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR='/tmp/prometheus'):
+            gunicorn_conf.child_exit(mock.Mock(), worker)
+        mark_process_dead.assert_called_once_with(1234)
+
+    @mock.patch('prometheus_client.multiprocess.mark_process_dead')
+    def test_without_multiprocess_dir(self, mark_process_dead):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+            gunicorn_conf.child_exit(mock.Mock(), mock.Mock(pid=1234))
+        mark_process_dead.assert_not_called()
@@ -0,0 +1,108 @@
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework import generics, serializers
+from rest_framework.test import APIRequestFactory
+
+from contact.models import Contact
+from contact.tests import model_factories as mfactories
+from crm.nplusone import NPlusOneError, NPlusOneMiddleware, QueryRecorder, allow_nplusone, normalize_sql, raise_on_nplusone
+
+
+class ContactTypeNameSerializer(serializers.ModelSerializer):
+    contact_type_name = serializers.CharField(source='contact_type.name')
+
+    class Meta:
+        model = Contact
+        fields = ('uuid', 'contact_type_name')
+
+
+class ContactTypeNameView(generics.ListAPIView):
+    authentication_classes = ()
+    permission_classes = ()
+    pagination_class = None
+    serializer_class = ContactTypeNameSerializer
+
+    def get_queryset(self):
+        return Contact.objects.order_by('pk')
+
+    dispatch = raise_on_nplusone(generics.ListAPIView.dispatch)
+
+
+class NormalizeSqlTest(TestCase):
+    def test_literals_and_parameters(self):
+        self.assertEqual(
+            normalize_sql('SELECT "t"."id" FROM "t"  WHERE ("t"."name" = \'it\'\'s\' AND "t"."id" IN (%s, %s, %s))'
+                          ' LIMIT 21'),
+            'SELECT "t"."id" FROM "t" WHERE ("t"."name" = ? AND "t"."id" IN (...)) LIMIT ?')
+        self.assertEqual(normalize_sql('SELECT * FROM "t1" WHERE "t1"."id" IN (%s)'),
+                         normalize_sql('SELECT * FROM "t1" WHERE "t1"."id" IN (%s, %s)'))
+
+
+class QueryRecorderTest(TestCase):
+    def setUp(self):
+        self.organization_uuid = str(uuid.uuid4())
+        for _ in range(3):
+            mfactories.Contact(organization_uuid=self.organization_uuid, contact_type=mfactories.Type())
+
+    def test_repeated_query(self):
+        with QueryRecorder().record() as recorder:
+            for contact in Contact.objects.all():
+                contact.contact_type.name
+
+        repeated, = recorder.find_repeated(threshold=2)
+        self.assertEqual(repeated.count, 3)
+        self.assertIn('FROM "contact_type" WHERE "contact_type"."uuid" = ?', repeated.sql)
+        self.assertEqual(recorder.find_repeated(threshold=3), [])
+
+    def test_culprit_serializer_field(self):
+        request = APIRequestFactory().get('/contact-type-names/')
+        with self.assertRaises(NPlusOneError) as context:
+            ContactTypeNameView.as_view()(request)
+        self.assertIn('3 queries by ContactTypeNameSerializer.contact_type_name', str(context.exception))
+
+    def test_allowed(self):
+        request = APIRequestFactory().get('/contact-type-names/')
+        with allow_nplusone():
+            response = ContactTypeNameView.as_view()(request)
+        self.assertEqual(len(response.data), 3)
+
+    def test_fixed(self):
+        request = APIRequestFactory().get('/contact-type-names/')
+        with mock.patch.object(ContactTypeNameView, 'get_queryset',
+                               lambda view: Contact.objects.select_related('contact_type')):
+            response = ContactTypeNameView.as_view()(request)
+        self.assertEqual(len(response.data), 3)
+
+    def test_middleware_logs(self):
+        def get_response(request):
+            return [contact.contact_type.name for contact in Contact.objects.all()]
+
+        middleware = NPlusOneMiddleware(get_response)
+        with self.assertLogs('crm.nplusone', 'WARNING') as logs:
+            middleware(APIRequestFactory().get('/contact/'))
+        self.assertIn('N+1 queries in GET /contact/:\n3 queries by an unknown field', logs.output[0])
+
+
+class AuditNPlusOneCommandTest(TestCase):
+    def setUp(self):
+        self.organization_uuid = str(uuid.uuid4())
+        for _ in range(3):
+            mfactories.Contact(organization_uuid=self.organization_uuid, contact_type=mfactories.Type())
+
+    def test_audit(self):
+        out = StringIO()
+        call_command('audit_nplusone', organization_uuid=self.organization_uuid, stdout=out)
+        output = out.getvalue()
+        self.assertRegex(output, r'GET /contact/ \(ContactViewSet\.list, 200\): \d+ queries')
+        self.assertRegex(output, r'GET /contact/[0-9a-f-]+/ \(ContactViewSet\.retrieve, 200\): \d+ queries')
+        self.assertIn('GET /appointment/ (AppointmentViewSet.list, 200)', output)
+
+    def test_audit_reports_repeated_queries(self):
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('audit_nplusone', organization_uuid=self.organization_uuid, threshold=0, stdout=out)
+        self.assertIn('N+1 queries', out.getvalue())
@@ -0,0 +1,206 @@
+import uuid
+from unittest import mock
+
+import psycopg2
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from appointment.models import AppointmentNote
+from appointment.tests import model_factories as appointment_mfactories
+from appointment.views import AppointmentViewSet
+from contact.models import Contact
+from contact.tests import model_factories as contact_mfactories
+from contact.views import ContactViewSet
+from crm.models import OutboxEvent
+from crm.outbox import OutboxListener, OutboxPoller
+from crm.views import EventStreamView
+
+
+class OutboxEventTest(TestCase):
+    def _events(self):
+        return list(OutboxEvent.objects.order_by('id').values_list('model', 'action', 'organization_uuid'))
+
+    def test_contact_events(self):
+        contact = contact_mfactories.Contact()
+        contact.first_name = 'Changed'
+        contact.save()
+        contact.delete()
+
+        self.assertEqual(self._events(), [
+            ('contact', 'created', contact.organization_uuid),
+            ('contact', 'updated', contact.organization_uuid),
+            ('contact', 'deleted', contact.organization_uuid),
+        ])
+
+    def test_appointment_note_events(self):
+        appointment = appointment_mfactories.Appointment()
+        note = AppointmentNote.objects.create(note='Test note')
+        appointment.notes.add(note)
+        OutboxEvent.objects.all().delete()
+
+        note.note = 'Changed'
+        note.save()
+        self.assertEqual(self._events(), [('appointmentnote', 'updated', str(appointment.organization_uuid))])
+        self.assertEqual(OutboxEvent.objects.get().object_id, str(note.pk))
+
+    def _appointment_request(self, method, data, organization_uuid):
+        request = getattr(APIRequestFactory(), method)('', data, format='json')
+        request.session = {'jwt_organization_uuid': organization_uuid, 'jwt_username': 'Test User',
+                           'jwt_core_user_uuid': str(uuid.uuid4())}
+        return request
+
+    def test_appointment_note_events_of_request(self):
+        organization_uuid = str(uuid.uuid4())
+        data = {
+            'name': 'Concert',
+            'start_date': '2018-01-01T12:15:00Z',
+            'end_date': '2018-01-01T12:30:00Z',
+            'type': ['Test Type'],
+            'notes': [{'note': 'Bring the tickets', 'type': 1}],
+        }
+        request = self._appointment_request('post', data, organization_uuid)
+        response = AppointmentViewSet.as_view({'post': 'create'})(request)
+        self.assertEqual(response.status_code, 201)
+        note = AppointmentNote.objects.get()
+        self.assertIn(('appointmentnote', 'created', organization_uuid), self._events())
+        self.assertTrue(OutboxEvent.objects.filter(model='appointmentnote', object_id=str(note.pk)).exists())
+
+        OutboxEvent.objects.all().delete()
+        request = self._appointment_request('patch', {'notes': [{'note': 'Parking at the back', 'type': 2}]},
+                                            organization_uuid)
+        response = AppointmentViewSet.as_view({'patch': 'partial_update'})(request, uuid=response.data['uuid'])
+        self.assertEqual(response.status_code, 200)
+        note = AppointmentNote.objects.get(type=2)
+        self.assertIn(('appointmentnote', 'created', organization_uuid), self._events())
+        self.assertTrue(OutboxEvent.objects.filter(model='appointmentnote', object_id=str(note.pk)).exists())
+
+    def test_rollback_with_failed_request(self):
+        organization_uuid = str(uuid.uuid4())
+
+        def create_contact():
+            request = APIRequestFactory().post(
+                '', {'first_name': 'David', 'workflowlevel1_uuids': [str(uuid.uuid4())]}, format='json')
+            request.session = {'jwt_organization_uuid': organization_uuid, 'jwt_username': 'Test User',
+                               'jwt_core_user_uuid': str(uuid.uuid4())}
+            return ContactViewSet.as_view({'post': 'create'})(request)
+
+        with mock.patch('crm.signals.record_event', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                create_contact()
+        self.assertFalse(Contact.objects.filter(organization_uuid=organization_uuid).exists())
+
+        self.assertEqual(create_contact().status_code, 201)
+        self.assertEqual(self._events(), [('contact', 'created', organization_uuid)])
+
+
+class OutboxEventTransactionTest(TransactionTestCase):
+    def test_event_in_transaction_of_save(self):
+        # Outside of a request, e.g. in import_csv, the contact isn't saved without its event
+        contact = contact_mfactories.Contact.build()
+        with mock.patch('crm.signals.record_event', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                contact.save()
+        self.assertFalse(Contact.objects.filter(uuid=contact.uuid).exists())
+
+
+class FakeListener(object):
+    def wait(self, organization_uuid, timeout):
+        return False
+
+    def close(self):
+        pass
+
+
+# The events have to be committed to be relayed
+@override_settings(EVENT_STREAM_MAX_DURATION=0, EVENT_STREAM_RETRY=2)
+class EventStreamViewTest(TransactionTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+            'jwt_username': 'Test User',
+            'jwt_core_user_uuid': str(uuid.uuid4()),
+        }
+
+    def _get(self, **headers):
+        request = self.factory.get('/events/', HTTP_ACCEPT='text/event-stream', **headers)
+        request.session = self.session
+        return EventStreamView.as_view()(request)
+
+    def _stream(self, **headers):
+        with mock.patch.object(EventStreamView, 'listener_class', FakeListener):
+            response = self._get(**headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            content = b''.join(response.streaming_content).decode()
+            response.close()
+            return content
+
+    def test_stream_missed_events(self):
+        contact = contact_mfactories.Contact(organization_uuid=self.organization_uuid)
+        contact_mfactories.Contact(organization_uuid=str(uuid.uuid4()))
+        event = OutboxEvent.objects.get(organization_uuid=self.organization_uuid)
+
+        content = self._stream(HTTP_LAST_EVENT_ID='0-0')
+
+        self.assertTrue(content.startswith('retry: 2000\n\n'))
+        self.assertIn('id: {}-{}\nevent: contact.created\ndata: {{"id": {}, "model": "contact", "object_id": "{}", '
+                      '"action": "created"'.format(event.transaction_id, event.id, event.id, contact.uuid), content)
+        self.assertEqual(content.count('id: '), 1)
+
+        self.assertNotIn('event:', self._stream(HTTP_LAST_EVENT_ID='{}-{}'.format(event.transaction_id, event.id)))
+
+    def test_stream_holds_back_events_of_newer_transactions(self):
+        # A transaction that started before the contact was created, and may still commit an event
+        running = psycopg2.connect(**connection.get_connection_params())
+        self.addCleanup(running.close)
+        with running.cursor() as cursor:
+            cursor.execute('SELECT txid_current()')
+        contact_mfactories.Contact(organization_uuid=self.organization_uuid)
+
+        self.assertNotIn('event:', self._stream(HTTP_LAST_EVENT_ID='0-0'))
+
+        running.rollback()
+        self.assertIn('event: contact.created', self._stream(HTTP_LAST_EVENT_ID='0-0'))
+
+    def test_stream_new_events_only(self):
+        contact_mfactories.Contact(organization_uuid=self.organization_uuid)
+        self.assertNotIn('event:', self._stream())
+
+    def test_invalid_last_event_id(self):
+        self.assertEqual(self._get(HTTP_LAST_EVENT_ID='42').status_code, 400)
+
+    @override_settings(EVENT_STREAM_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self._get().status_code, 404)
+
+    @override_settings(EVENT_STREAM_MAX_PER_WORKER=1)
+    def test_streams_per_worker(self):
+        with mock.patch.object(EventStreamView, 'listener_class', FakeListener):
+            response = self._get()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self._get().status_code, 503)
+            # Closed without being iterated, e.g. when the client disconnected
+            response.close()
+            self.assertEqual(self._get().status_code, 200)
+
+    @override_settings(EVENT_STREAM_LISTEN_HOST=None)
+    def test_poll_behind_pgbouncer(self):
+        with mock.patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            self.assertIsInstance(EventStreamView().get_listener(), OutboxPoller)
+
+
+@override_settings(DATABASE_CONN_POOL_SIZE=0)
+class OutboxListenerTest(TransactionTestCase):
+    def test_wait(self):
+        organization_uuid = str(uuid.uuid4())
+        listener = OutboxListener()
+        self.addCleanup(listener.close)
+
+        contact_mfactories.Contact(organization_uuid=str(uuid.uuid4()))
+        self.assertFalse(listener.wait(organization_uuid, 0.2))
+
+        contact_mfactories.Contact(organization_uuid=organization_uuid)
+        self.assertTrue(listener.wait(organization_uuid, 5))
@@ -0,0 +1,127 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, modify_settings, override_settings
+
+from contact.tests import model_factories as mfactories
+from crm.authentication import verified_tokens
+from crm.profiling import ProfilingMiddleware, RequestProfile, get_current_profile, profile_phase
+
+
+class RequestProfileTest(SimpleTestCase):
+    @mock.patch('crm.profiling.time.perf_counter')
+    def test_nested_phases(self, mock_perf_counter):
+        mock_perf_counter.side_effect = [0.0, 1.0, 1.5, 1.7, 1.9, 2.0, 3.0, 4.0]
+        profile = RequestProfile()
+        with profile.phase('serialize'):
+            with profile.phase('filter'):
+                with profile.phase('db'):
+                    pass
+        profile.finish()
+
+        self.assertAlmostEqual(profile.durations['serialize'], 1.5)
+        self.assertAlmostEqual(profile.durations['filter'], 0.3)
+        self.assertAlmostEqual(profile.durations['db'], 0.2)
+        self.assertAlmostEqual(profile.total, 4.0)
+        self.assertEqual(profile.server_timing(), 'filter;dur=300.0, db;desc="0 queries";dur=200.0, '
+                                                  'serialize;dur=1500.0, total;dur=4000.0')
+
+    def test_finish_stops_open_phases(self):
+        profile = RequestProfile()
+        profile.start('render')
+        profile.finish()
+        self.assertGreater(profile.durations['render'], 0)
+
+    def test_profile_phase_without_profile(self):
+        self.assertIsNone(get_current_profile())
+        with profile_phase('filter'):
+            pass
+
+    @override_settings(PROFILER='yappi')
+    def test_unknown_profiler(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ProfilingMiddleware(lambda request: None)
+
+
+@modify_settings(MIDDLEWARE={'prepend': 'crm.profiling.ProfilingMiddleware'})
+@mock.patch('crm.authentication.decode_jwt')
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.organization_uuid = str(uuid.uuid4())
+        self.payload = {
+            'iss': 'bifrost',
+            'exp': 1893456000,
+            'organization_uuid': self.organization_uuid,
+            'core_user_uuid': str(uuid.uuid4()),
+            'username': 'Test User',
+        }
+        mfactories.Contact(organization_uuid=self.organization_uuid)
+        verified_tokens.clear()
+        self.addCleanup(verified_tokens.clear)
+
+    def _get(self, **headers):
+        return self.client.get('/contact/', HTTP_AUTHORIZATION='JWT header.payload.signature', **headers)
+
+    def test_not_profiled(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_SECRET='s3cret')
+    def test_profiled_by_header(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        with self.assertLogs('crm.profiling', 'INFO') as logs:
+            response = self._get(HTTP_X_PROFILE='s3cret')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        timings = dict(re.match(r'(\w+);.*dur=([\d.]+)', entry).groups()
+                       for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timings), {'auth', 'permission', 'filter', 'db', 'serialize', 'render', 'total'})
+        self.assertRegex(response['Server-Timing'], r'db;desc="[1-9]\d* queries"')
+
+        log = json.loads(logs.records[0].getMessage())
+        self.assertEqual(log['view'], 'ContactViewSet.list')
+        self.assertEqual((log['method'], log['path'], log['status']), ('GET', '/contact/', 200))
+        self.assertGreater(log['db_queries'], 0)
+        self.assertGreaterEqual(log['total_ms'], log['serialize_ms'] + log['db_ms'])
+
+    def test_header_without_secret(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        self.assertNotIn('Server-Timing', self._get(HTTP_X_PROFILE='1'))
+        with override_settings(PROFILING_SECRET='s3cret'):
+            self.assertNotIn('Server-Timing', self._get(HTTP_X_PROFILE='1'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DUMP_MAX_FILES=2)
+    def test_rotate_profiles(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        dump_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dump_dir)
+        for name in ('20180101-000000-GET-contact-00000000.prof', '20180101-000001-GET-contact-00000000.prof'):
+            open(os.path.join(dump_dir, name), 'w').close()
+        with override_settings(PROFILING_DUMP_DIR=dump_dir), self.assertLogs('crm.profiling', 'INFO'):
+            self._get()
+
+        dumps = sorted(os.listdir(dump_dir))
+        self.assertEqual(len(dumps), 2)
+        self.assertEqual(dumps[0], '20180101-000001-GET-contact-00000000.prof')
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_profile_dump(self, mock_decode_jwt):
+        mock_decode_jwt.return_value = self.payload
+        dump_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dump_dir)
+        with override_settings(PROFILING_DUMP_DIR=dump_dir), self.assertLogs('crm.profiling', 'INFO'):
+            response = self._get()
+
+        self.assertIn('Server-Timing', response)
+        dumps = os.listdir(dump_dir)
+        self.assertEqual(len(dumps), 1)
+        self.assertRegex(dumps[0], r'^\d{8}-\d{6}-GET-contact-[0-9a-f]{8}\.prof$')
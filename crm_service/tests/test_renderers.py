@@ -0,0 +1,78 @@
+import datetime
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+import pytz
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from crm.parsers import ORJSONParser
+from crm.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTest(TestCase):
+    def setUp(self):
+        self.data = ReturnList([
+            OrderedDict([
+                ('uuid', uuid.uuid4()),
+                ('start_date', datetime.datetime(2019, 3, 31, 1, 30, 15, 123456, tzinfo=pytz.utc)),
+                ('end_date', pytz.timezone('Europe/Berlin').localize(datetime.datetime(2019, 3, 31, 3, 30))),
+                ('naive', datetime.datetime(2019, 1, 1, 12)),
+                ('date', datetime.date(2019, 1, 1)),
+                ('distance', Decimal('12.50')),
+                ('duration', datetime.timedelta(minutes=25)),
+                ('address', {'street': 'Wöhlertstraße', 'city': 'Berlin'}),
+                ('invitee_uuids', [uuid.uuid4()]),
+                ('notes', 'Line\u2028separator\u2029and "quotes"'),
+                ('empty', None),
+            ]),
+        ], serializer=None)
+
+    def test_render_same_as_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_render_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_render_indent(self):
+        content = ORJSONRenderer().render(self.data, 'application/json; indent=4')
+        self.assertEqual(content, JSONRenderer().render(self.data, 'application/json; indent=4'))
+        self.assertIn(b'\n    ', content)
+
+    @mock.patch('crm.renderers.orjson', None)
+    def test_render_without_orjson(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+
+class ORJSONParserTest(TestCase):
+    def test_parse(self):
+        content = '{"name": "Wöhlertstraße", "type": ["inspection"], "distance": 12.5, "empty": null}'.encode()
+        self.assertEqual(ORJSONParser().parse(BytesIO(content)), JSONParser().parse(BytesIO(content)))
+
+    def test_parse_error(self):
+        for content in (b'{"name": ', b'{"distance": NaN}', b''):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(BytesIO(content))
+
+    def test_parse_other_charset(self):
+        content = '{"name": "Wöhlertstraße"}'.encode('latin-1')
+        data = ORJSONParser().parse(BytesIO(content), parser_context={'encoding': 'latin-1'})
+        self.assertEqual(data, {'name': 'Wöhlertstraße'})
+
+
+class BenchmarkRenderersTest(TestCase):
+    def test_benchmark(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('benchmark_renderers', appointments=5, contacts=5, repeat=1, stdout=stdout, stderr=stderr)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[1].startswith('5 appointments'))
+        self.assertTrue(lines[4].startswith('5 contacts'))
+        self.assertEqual(stderr.getvalue(), '')
@@ -0,0 +1,121 @@
+import uuid
+from unittest import mock
+
+import jwt
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from crm import routers
+from crm.authentication import JWTClaims
+from crm.middleware import REPLICA_STICKY_COOKIE, ReplicaRoutingMiddleware
+from crm.routers import ReplicaRouter, ReplicaSelector
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'], DATABASE_REPLICA_MAX_LAG=10)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.lags = {'replica_0': 0, 'replica_1': 0}
+        patcher = mock.patch.object(ReplicaSelector, '_measure_lag', side_effect=lambda alias: self.lags[alias])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(routers.use_replica, False)
+
+    def test_reads_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_round_robin(self):
+        routers.use_replica(True)
+        self.assertEqual([self.router.db_for_read(None) for _ in range(3)],
+                         ['replica_0', 'replica_1', 'replica_0'])
+
+    @override_settings(DATABASE_REPLICA_LAG_CHECK_INTERVAL=0)
+    def test_skip_lagging_replica(self):
+        routers.use_replica(True)
+        self.lags['replica_0'] = 60
+        self.assertEqual([self.router.db_for_read(None) for _ in range(2)], ['replica_1', 'replica_1'])
+
+        self.lags['replica_1'] = 60
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_reads_primary_in_transaction(self):
+        routers.use_replica(True)
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_writes_and_migrations_primary(self):
+        routers.use_replica(True)
+        self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'contact'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'contact'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], DATABASE_REPLICA_STICKY_SECONDS=15)
+class ReplicaRoutingMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        class View(object):
+            replica_actions = ('list',)
+
+        def view_func(request):
+            return HttpResponse()
+
+        view_func.cls = View
+        view_func.actions = {'get': 'list', 'post': 'create'}
+        self.view_func = view_func
+
+    def _process(self, request):
+        enabled = []
+
+        def get_response(request):
+            middleware.process_view(request, self.view_func, (), {})
+            enabled.append(routers.replica_enabled())
+            return self.view_func(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        self.assertFalse(routers.replica_enabled())
+        return enabled[0], response
+
+    def test_safe_request_allowed_action(self):
+        enabled, _ = self._process(self.factory.get('/'))
+        self.assertTrue(enabled)
+
+    def test_action_not_allowed(self):
+        self.view_func.actions = {'get': 'retrieve'}
+        enabled, _ = self._process(self.factory.get('/'))
+        self.assertFalse(enabled)
+
+    def test_write_sets_sticky_cookie(self):
+        enabled, response = self._process(self.factory.post('/'))
+        self.assertFalse(enabled)
+        self.assertEqual(response.cookies[REPLICA_STICKY_COOKIE]['max-age'], 15)
+
+    def test_sticky_cookie_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[REPLICA_STICKY_COOKIE] = '1'
+        enabled, _ = self._process(request)
+        self.assertFalse(enabled)
+
+    def _jwt_request(self, method, core_user_uuid):
+        token = jwt.encode({'core_user_uuid': core_user_uuid}, 'secret', algorithm='HS256')
+        if isinstance(token, bytes):
+            token = token.decode()
+        request = getattr(self.factory, method)('/', HTTP_AUTHORIZATION='JWT {}'.format(token))
+        request.auth = JWTClaims(core_user_uuid=core_user_uuid)
+        return request
+
+    def test_jwt_write_reads_primary_without_cookie(self):
+        core_user_uuid = str(uuid.uuid4())
+        self._process(self._jwt_request('post', core_user_uuid))
+
+        enabled, _ = self._process(self._jwt_request('get', core_user_uuid))
+        self.assertFalse(enabled)
+
+        enabled, _ = self._process(self._jwt_request('get', str(uuid.uuid4())))
+        self.assertTrue(enabled)
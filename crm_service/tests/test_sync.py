@@ -0,0 +1,144 @@
+import json
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core import signing
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from appointment.models import AppointmentNote
+from appointment.tests import model_factories as appointment_mfactories
+from contact.tests import model_factories as contact_mfactories
+from crm.models import Tombstone
+from crm.views import SYNC_TOKEN_SALT, SyncView
+
+
+@override_settings(SYNC_TOKEN_OVERLAP=0)
+class SyncViewTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+            'jwt_username': 'Test User',
+            'jwt_core_user_uuid': str(uuid.uuid4()),
+        }
+
+    def _sync(self, since=None):
+        request = self.factory.get('/sync/', {'since': since} if since else {})
+        request.session = self.session
+        response = SyncView.as_view()(request)
+        if response.status_code != 200:
+            return response.status_code, response.data
+        return response.status_code, json.loads(b''.join(response.streaming_content))
+
+    def _create_appointment(self):
+        contact = contact_mfactories.Contact(organization_uuid=self.organization_uuid)
+        appointment = appointment_mfactories.Appointment(organization_uuid=self.organization_uuid,
+                                                         contact_uuid=contact.uuid)
+        note = AppointmentNote.objects.create(note='Test note')
+        appointment.notes.add(note)
+        driving_time = appointment_mfactories.AppointmentDrivingTime(appointment=appointment)
+        return contact, appointment, note, driving_time
+
+    def test_full_sync(self):
+        contact, appointment, note, driving_time = self._create_appointment()
+        appointment_mfactories.Appointment(organization_uuid=uuid.uuid4())
+        contact_mfactories.Contact(organization_uuid=uuid.uuid4())
+
+        status_code, data = self._sync()
+
+        self.assertEqual(status_code, 200)
+        self.assertTrue(data['token'])
+        self.assertEqual([x['uuid'] for x in data['changed']['contact']], [str(contact.uuid)])
+        self.assertEqual([x['uuid'] for x in data['changed']['appointment']], [str(appointment.uuid)])
+        self.assertEqual(data['changed']['appointment'][0]['notes'], [note.pk])
+        self.assertNotIn('contact', data['changed']['appointment'][0])
+        self.assertEqual([x['id'] for x in data['changed']['appointmentnote']], [note.pk])
+        self.assertEqual([x['uuid'] for x in data['changed']['appointmentdrivingtime']], [str(driving_time.uuid)])
+        self.assertEqual(data['deleted'], {
+            'contact': [], 'appointment': [], 'appointmentnote': [], 'appointmentdrivingtime': []})
+
+    def test_delta_sync(self):
+        contact, appointment, note, driving_time = self._create_appointment()
+        other_appointment = appointment_mfactories.Appointment(organization_uuid=self.organization_uuid)
+        _, data = self._sync()
+        token = data['token']
+
+        status_code, data = self._sync(token)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['changed'], {
+            'contact': [], 'appointment': [], 'appointmentnote': [], 'appointmentdrivingtime': []})
+
+        note.note = 'Changed'
+        note.save()
+        driving_time_uuid = driving_time.uuid
+        driving_time.delete()
+        other_appointment.delete()
+
+        status_code, data = self._sync(token)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['changed']['contact'], [])
+        self.assertEqual([x['uuid'] for x in data['changed']['appointment']], [str(appointment.uuid)])
+        self.assertEqual([x['note'] for x in data['changed']['appointmentnote']], ['Changed'])
+        self.assertEqual(data['changed']['appointmentdrivingtime'], [])
+        self.assertEqual(data['deleted']['appointment'], [str(other_appointment.uuid)])
+        self.assertEqual(data['deleted']['appointmentdrivingtime'], [str(driving_time_uuid)])
+
+    @override_settings(SYNC_CHUNK_SIZE=2)
+    def test_sync_in_chunks(self):
+        contacts = contact_mfactories.Contact.create_batch(size=5, organization_uuid=self.organization_uuid)
+
+        # 3 chunks of contacts and one query each for appointments, notes and driving times
+        with self.assertNumQueries(3 + 3):
+            _, data = self._sync()
+        self.assertEqual([x['uuid'] for x in data['changed']['contact']], [str(x.uuid) for x in contacts])
+
+    def test_invalid_token(self):
+        status_code, data = self._sync('invalid')
+        self.assertEqual(status_code, 400)
+        self.assertIn('since', data)
+
+    def test_expired_token(self):
+        token = signing.dumps((timezone.now() - timedelta(days=31)).isoformat(), salt=SYNC_TOKEN_SALT)
+        status_code, _ = self._sync(token)
+        self.assertEqual(status_code, 410)
+
+    def test_no_organization(self):
+        self.session = {}
+        status_code, _ = self._sync()
+        self.assertEqual(status_code, 403)
+
+
+class TombstoneTest(TestCase):
+    def test_tombstone_on_delete(self):
+        contact = contact_mfactories.Contact()
+        appointment = appointment_mfactories.Appointment()
+        note = AppointmentNote.objects.create(note='Test note')
+        appointment.notes.add(note)
+        driving_time = appointment_mfactories.AppointmentDrivingTime(appointment=appointment)
+
+        note_id = note.pk
+        contact.delete()
+        note.delete()
+        appointment.delete()
+
+        tombstones = Tombstone.objects.order_by('id').values_list('model', 'object_id', 'organization_uuid')
+        self.assertEqual(list(tombstones), [
+            ('contact', str(contact.uuid), contact.organization_uuid),
+            ('appointmentnote', str(note_id), str(appointment.organization_uuid)),
+            ('appointmentdrivingtime', str(driving_time.uuid), str(appointment.organization_uuid)),
+            ('appointment', str(appointment.uuid), str(appointment.organization_uuid)),
+        ])
+
+    def test_prune_tombstones(self):
+        Tombstone.objects.create(model='contact', object_id=str(uuid.uuid4()),
+                                 deleted_at=timezone.now() - timedelta(days=31))
+        recent = Tombstone.objects.create(model='contact', object_id=str(uuid.uuid4()))
+
+        with mock.patch('sys.stdout'):
+            call_command('prune_tombstones')
+        self.assertEqual(list(Tombstone.objects.all()), [recent])
@@ -6,6 +6,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from crm.metrics import metrics_view
+
 
 swagger_info = openapi.Info(
         title="CRM Service API",
@@ -18,6 +20,7 @@ schema_view = get_schema_view(
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
+schema_view.replica_actions = ('get',)
 
 
 urlpatterns = [
@@ -27,6 +30,7 @@ urlpatterns = [
          name='schema-swagger-ui'),
     path('admin/', admin.site.urls),
     path('health_check/', include('health_check.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path(r'', include('crm.urls')),
 ]
 
@@ -5,6 +5,11 @@ set -e
 
 bash scripts/tcp-port-wait.sh $DATABASE_HOST $DATABASE_PORT
 
+echo $(date -u) "- Dropping the metrics of the previous run"
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo $(date -u) "- Migrating"
 python manage.py migrate
 
@@ -2,6 +2,11 @@
 
 bash scripts/tcp-port-wait.sh $${DATABASE_HOST} $${DATABASE_PORT}
 
+# Drop the metrics of the previous run
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 python manage.py migrate
 
 gunicorn crm_service.wsgi --config crm_service/gunicorn_conf.py
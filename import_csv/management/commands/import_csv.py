@@ -1,18 +1,38 @@
+import base64
 import csv
 import datetime
 import json
+import multiprocessing
 import os
+import stat
 import string
+import tempfile
+import time
 from uuid import UUID
 
 import requests
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 from contact.models import Contact, TITLE_CHOICES
+from contact.validators import validate_contact_arrays
+from crm import metrics
+from crm.export import iter_batches
 
 DEFAULT_FILE_NAME = 'TopKontor_Ritz.csv'
+CSV_DELIMITER = ","
+CSV_ENCODING = 'utf-8'
 TIMEOUT_SECONDS = 30
+# Bytes read at once to count the rows of the csv file
+COUNT_CHUNK_SIZE = 1 << 20
+# Rows whose phones and emails are validated at once, before they're imported
+VALIDATION_BATCH_SIZE = 1000
+# Per-user cache of the JWT, shared by the worker processes of an import
+TOKEN_CACHE_FILE = os.getenv('IMPORT_CSV_TOKEN_CACHE_FILE') or os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'crm_service',
+    'import_csv_token.json')
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
 URL_BIFROST = ''
 USERNAME = ''
 PASSWORD = ''
@@ -125,7 +145,15 @@ def _combine_field_cols_by_type(_type, field_name, *row_fields):
     return field_value
 
 
-def _get_authorization_headers():
+def _decode_token_claims(token):
+    """Return the claims of the JWT without verifying its signature, e.g. to read its expiry."""
+    payload = token.split('.')[1]
+    payload += '=' * (-len(payload) % 4)  # add padding
+    return json.loads(base64.urlsafe_b64decode(payload).decode('utf-8'))
+
+
+def _request_token():
+    """Log in at Bifrost and return a new JWT and the timestamp when it expires."""
     login_url = URL_BIFROST + '/oauth/token/'
     params = {
         'client_id': CLIENT_ID,
@@ -136,11 +164,137 @@ def _get_authorization_headers():
     response = requests.post(login_url, params, timeout=TIMEOUT_SECONDS)
     if response.status_code != 200:
         raise PermissionError(response.content)
-    headers = {
-        'Authorization': 'JWT ' + json.loads(response.content)['access_token_jwt'],
-        'Content-Type': 'application/json'
-    }
-    return headers
+    content = json.loads(response.content)
+    token = content['access_token_jwt']
+    expires_at = _decode_token_claims(token).get('exp') or time.time() + content.get('expires_in', 0)
+    return token, expires_at
+
+
+def _load_cached_token():
+    """
+    Return the JWT cached on disk if it belongs to the configured user and does not expire soon. The cache is
+    ignored unless it's a regular file of the current user, readable only by them.
+    """
+    try:
+        cache_fd = os.open(TOKEN_CACHE_FILE, os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return None
+    with os.fdopen(cache_fd) as cache_file:
+        cache_stat = os.fstat(cache_fd)
+        if (not stat.S_ISREG(cache_stat.st_mode) or cache_stat.st_uid != os.getuid()
+                or stat.S_IMODE(cache_stat.st_mode) != 0o600):
+            return None
+        try:
+            cached = json.load(cache_file)
+        except ValueError:
+            return None
+    if cached.get('url') != URL_BIFROST or cached.get('username') != USERNAME:
+        return None
+    if cached.get('expires_at', 0) - TOKEN_EXPIRY_MARGIN_SECONDS <= time.time():
+        return None
+    return cached.get('token')
+
+
+def _save_cached_token(token, expires_at):
+    """
+    Cache the JWT on disk, readable only by the current user. It's written to a new file which replaces the cache,
+    so other processes never read a partial one.
+    """
+    cache_dir = os.path.dirname(TOKEN_CACHE_FILE)
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    # mkstemp creates the file exclusively with mode 0600
+    cache_fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix='.import_csv_token.')
+    try:
+        with os.fdopen(cache_fd, 'w') as cache_file:
+            json.dump({'url': URL_BIFROST, 'username': USERNAME, 'token': token, 'expires_at': expires_at},
+                      cache_file)
+        os.replace(temp_path, TOKEN_CACHE_FILE)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _split_file_into_ranges(csv_path, parts):
+    """
+    Split the rows of the csv file (without the header line) into at most `parts` byte ranges.
+
+    Every range starts at the beginning of a row, so each one can be parsed independently.
+    Rows must not contain line breaks inside of quoted values.
+    """
+    with open(csv_path, 'rb') as csv_file:
+        csv_file.readline()  # skip first line
+        start = csv_file.tell()
+        size = os.fstat(csv_file.fileno()).st_size
+        boundaries = [start]
+        for part in range(1, parts):
+            csv_file.seek(max(start + (size - start) * part // parts - 1, boundaries[-1]))
+            csv_file.readline()  # move on to the beginning of the next row
+            boundary = csv_file.tell()
+            if boundaries[-1] < boundary < size:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _count_rows(csv_path, start, end):
+    """Return the maximal number of rows within the byte range of the csv file, reading it in chunks."""
+    rows = 0
+    last_byte = b'\n'
+    with open(csv_path, 'rb') as csv_file:
+        csv_file.seek(start)
+        remaining = end - start
+        for chunk in iter(lambda: csv_file.read(min(COUNT_CHUNK_SIZE, remaining)), b''):
+            rows += chunk.count(b'\n')
+            last_byte = chunk[-1:]
+            remaining -= len(chunk)
+    return rows + (0 if last_byte == b'\n' else 1)
+
+
+def _scan_customer_ids(csv_path, start, end):
+    """
+    Return the highest customer_id set in column A of the rows within the byte range of the csv file, or 0, and the
+    number of rows without one.
+    """
+    highest = missing = 0
+    for row in csv.reader(_iter_lines(csv_path, start, end), delimiter=CSV_DELIMITER, dialect=csv.excel_tab):
+        if not row:
+            continue
+        if row[0].isdigit():
+            highest = max(highest, int(row[0]))
+        elif not row[0]:
+            missing += 1
+    return highest, missing
+
+
+def _iter_lines(csv_path, start, end):
+    """Yield the decoded lines of the csv file within the byte range."""
+    with open(csv_path, 'rb') as csv_file:
+        csv_file.seek(start)
+        while csv_file.tell() < end:
+            line = csv_file.readline()
+            if not line:
+                break
+            yield line.decode(CSV_ENCODING)
+
+
+def _import_range(job):
+    """
+    Import one byte range of the csv file in a worker process.
+
+    Every worker uses its own HTTP session and database connection. The token is shared through the cache on disk.
+    """
+    try:
+        command = Command()
+        command.organization_uuid = job['organization_uuid']
+        command.workflowlevel1_id = job['workflowlevel1_id']
+        command.workflowlevel1_uuid = job['workflowlevel1_uuid']
+        command.worker = job['worker']
+        if job['customer_ids'] is not None:
+            command.customer_ids = iter(range(*job['customer_ids']))
+        command.parse_file(job['csv_path'], job['start'], job['end'], job['rows'])
+        return command.get_report()
+    finally:
+        connections.close_all()
 
 
 def is_valid_uuid(uuid_to_test, version=4):
@@ -176,52 +330,86 @@ class Command(BaseCommand):
     """
 
     row_map = dict()
-    headers = {}
     cache_profile_type_ids = {}
     row = []
     counter = 0
+    dismissed = 0
+    errors = []
     contact_uuid = None
+    worker = None
+    customer_ids = None
 
     organization_uuid = None
     workflowlevel1_uuid = None
     workflowlevel1_id = None
+    _token = None
 
     def add_arguments(self, parser):
         """Add --file argument to Command."""
         parser.add_argument(
             '--file', default=None, nargs='?', help='Path of file to import.',
         )
+        parser.add_argument(
+            '--workers', default=1, type=int,
+            help='Number of processes which import the file in parallel.',
+        )
 
     def __init__(self):
         """
         Set general variables.
         """
         super().__init__()
+        self.errors = []
+        self.session = requests.Session()
         self.build_row_mapping()
 
-        self.headers = _get_authorization_headers()
-        self.set_organization()
-        self.set_workflowlevel1()
+    @property
+    def headers(self):
+        return {
+            'Authorization': 'JWT ' + self._get_token(),
+            'Content-Type': 'application/json'
+        }
+
+    def _get_token(self, refresh=False):
+        """Return the JWT, read from the cache on disk or requested from Bifrost if needed."""
+        if refresh or self._token is None:
+            token = None if refresh else _load_cached_token()
+            if token is None:
+                token, expires_at = _request_token()
+                _save_cached_token(token, expires_at)
+            self._token = token
+        return self._token
+
+    def _request(self, method, url, **kwargs):
+        """Send a request to Bifrost and retry it once with a new token if the current one was rejected."""
+        kwargs.setdefault('timeout', TIMEOUT_SECONDS)
+        response = self.session.request(method, url, headers=self.headers, **kwargs)
+        if response.status_code == 401:
+            self._get_token(refresh=True)
+            response = self.session.request(method, url, headers=self.headers, **kwargs)
+        return response
+
+    def authenticate(self):
+        """Set the organization and workflowlevel1 of the importing user unless they are known already."""
+        if self.organization_uuid is None:
+            self.set_organization()
+        if self.workflowlevel1_id is None:
+            self.set_workflowlevel1()
 
     def set_organization(self):
-        """Set organization_uuid."""
-        url_get_organization_uuid = URL_BIFROST + 'coreuser/'
-        response = requests.get(url_get_organization_uuid,
-                                headers=self.headers,
-                                timeout=TIMEOUT_SECONDS)
-        content = None
-        for item in json.loads(response.content):
-            if item['username'] == USERNAME:
-                content = item
-        self.organization_uuid = content['organization']['organization_uuid']
+        """Set organization_uuid from the token's claims or by looking up its CoreUser."""
+        claims = _decode_token_claims(self._get_token())
+        self.organization_uuid = claims.get('organization_uuid')
+        if not self.organization_uuid:
+            url_get_core_user = URL_BIFROST + f"coreuser/{claims['core_user_uuid']}/"
+            response = self._request('get', url_get_core_user)
+            self.organization_uuid = json.loads(response.content)['organization']['organization_uuid']
         print(f"ORGANIZATION_UUID: {self.organization_uuid}")
 
     def set_workflowlevel1(self):
         """Set workflowlevel1_id and workflowlevel1_uuid."""
         url_get_organization_uuid = URL_BIFROST + 'workflowlevel1/'
-        response = requests.get(url_get_organization_uuid,
-                                headers=self.headers,
-                                timeout=TIMEOUT_SECONDS)
+        response = self._request('get', url_get_organization_uuid)
         content = json.loads(response.content)[0]
         self.workflowlevel1_id = content['id']
         self.workflowlevel1_uuid = content['level1_uuid']
@@ -242,10 +430,20 @@ class Command(BaseCommand):
     def _col(self, letter_index):
         return self.row[self.row_map[letter_index]]
 
+    def _log(self, message):
+        if self.worker is not None:
+            message = f"[worker {self.worker}] {message}"
+        print(message)
+
+    def _next_customer_id(self):
+        """Return the next customer_id of the reserved block or None to let the Contact choose one."""
+        if self.customer_ids is None:
+            return None
+        return next(self.customer_ids)
+
     def _create_workflowlevel2(self):
         url_create_wfl2 = URL_BIFROST + 'workflowlevel2/'
-        response = requests.post(url_create_wfl2,
-                                 headers=self.headers,
+        response = self._request('post', url_create_wfl2,
                                  data=json.dumps({'name': 'FROM DATA IMPORT',
                                                   'workflowlevel1': self.workflowlevel1_id}))
         return json.loads(response.content)['level2_uuid']
@@ -257,9 +455,7 @@ class Command(BaseCommand):
             profile_type_id = self.cache_profile_type_ids[profile_type]
         else:
             url_get_profile_types = URL_BIFROST + 'location/profiletypes'
-            response = requests.get(url_get_profile_types,
-                                    headers=self.headers,
-                                    timeout=TIMEOUT_SECONDS)
+            response = self._request('get', url_get_profile_types)
             results = json.loads(response.content)['results']
             # check if profile_type already in GET but not yet cached
             for pt in results:
@@ -268,10 +464,8 @@ class Command(BaseCommand):
                     break
             if not profile_type_id:
                 url_create_profile_type = url_get_profile_types
-                response = requests.post(url_create_profile_type,
-                                         headers=self.headers,
-                                         data=json.dumps({"name": profile_type}),
-                                         timeout=TIMEOUT_SECONDS)
+                response = self._request('post', url_create_profile_type,
+                                         data=json.dumps({"name": profile_type}))
                 profile_type_id = json.loads(response.content)['id']
             # add to cache
             self.cache_profile_type_ids[profile_type] = profile_type_id
@@ -289,14 +483,13 @@ class Command(BaseCommand):
         if site_profile_uuid:
             # update
             url_update_site_profile = URL_BIFROST + f'location/siteprofiles/{site_profile_uuid}/'
-            response = requests.put(url_update_site_profile, headers=self.headers,
-                                    data=site_profile_data, timeout=TIMEOUT_SECONDS)
+            response = self._request('put', url_update_site_profile, data=site_profile_data)
             if response.status_code != 200:
                 print(f'Error when updating SiteProfile: {site_profile_uuid} - status_code: {response.status_code}')
             print(f'SiteProfile for object_with_billing {site_profile_uuid} updated.')
         else:
             url_create_site_profile = URL_BIFROST + f'location/siteprofiles/'
-            response = requests.post(url_create_site_profile, headers=self.headers, data=site_profile_data)
+            response = self._request('post', url_create_site_profile, data=site_profile_data)
             site_profile_uuid = json.loads(response.content)['uuid']
             print(f'SiteProfile for object_with_billing {site_profile_uuid} created.')
         return site_profile_uuid
@@ -311,7 +504,7 @@ class Command(BaseCommand):
         )
 
         # get attributes
-        contact.customer_id = self._col('A')
+        contact.customer_id = self._col('A') or self._next_customer_id()
         # full_name = self._col('E')
         contact.first_name = self._col('C')
         contact.last_name = self._col('D')
@@ -319,16 +512,9 @@ class Command(BaseCommand):
         contact.title = _get_title_from_display(self._col('F'))
         contact.company = self._col('G')
 
-        # phones
-        home_phones = _combine_field_cols_by_type('home', 'number', self._col('H'))
-        fax_phones = _combine_field_cols_by_type('fax', 'number', self._col('I'))
-        mobile_phones = _combine_field_cols_by_type('mobile', 'number', self._col('J'))
-        # office_phones = _combine_field_cols_by_type('office', 'number', self._col('BE'))
-        contact.phones = home_phones + fax_phones + mobile_phones  # + office_phones
-
-        # emails
-        office_emails = _combine_field_cols_by_type('office', 'email', self._col('K'))
-        contact.emails = office_emails
+        arrays = self._get_contact_arrays()
+        contact.phones = arrays['phones']
+        contact.emails = arrays['emails']
 
         contact.notes = self._col('L')
 
@@ -339,12 +525,41 @@ class Command(BaseCommand):
         contact.save()
 
         if created:
-            print(f"{self.counter}: Contact with uuid={self.contact_uuid} created.")
+            self._log(f"{self.counter}: Contact with uuid={self.contact_uuid} created.")
         else:
-            print(f"{self.counter}: Contact with uuid={self.contact_uuid} updated.")
+            self._log(f"{self.counter}: Contact with uuid={self.contact_uuid} updated.")
 
         return contact.siteprofile_uuids, contact.workflowlevel2_uuids[0]
 
+    def _get_contact_arrays(self):
+        # phones
+        home_phones = _combine_field_cols_by_type('home', 'number', self._col('H'))
+        fax_phones = _combine_field_cols_by_type('fax', 'number', self._col('I'))
+        mobile_phones = _combine_field_cols_by_type('mobile', 'number', self._col('J'))
+        # office_phones = _combine_field_cols_by_type('office', 'number', self._col('BE'))
+
+        # emails
+        office_emails = _combine_field_cols_by_type('office', 'email', self._col('K'))
+
+        return {
+            'phones': home_phones + fax_phones + mobile_phones,  # + office_phones
+            'emails': office_emails,
+        }
+
+    def _validate_batch(self, rows):
+        """
+        Returns the messages of the invalid phones and emails of the rows by their index, validated in one pass.
+        """
+        contacts = []
+        for row in rows:
+            self.row = row
+            try:
+                contacts.append(self._get_contact_arrays())
+            except IndexError:
+                # The row is missing columns and fails to be imported
+                contacts.append({})
+        return validate_contact_arrays(contacts)
+
     def _import_siteprofile(self, site_profile_uuids, wfl2_uuid):
         """
 
@@ -384,9 +599,8 @@ class Command(BaseCommand):
     def _check_product_existence(self, wfl2_uuid, product_name):
         """Check if product already exists."""
         url_get_products = URL_BIFROST + 'products/products'
-        response = requests.get(url_get_products,
-                                params={'workflowlevel2_uuid': wfl2_uuid},
-                                headers=self.headers)
+        response = self._request('get', url_get_products,
+                                 params={'workflowlevel2_uuid': wfl2_uuid})
         content = json.loads(response.content)['results']
         for product in content:
             if product['name'] == product_name:
@@ -395,7 +609,7 @@ class Command(BaseCommand):
 
     def _update_product(self, product_uuid, product_data):
         url_update_product = URL_BIFROST + f'products/products/{product_uuid}'
-        response = requests.patch(url_update_product, headers=self.headers, data=json.dumps(product_data))
+        response = self._request('patch', url_update_product, data=json.dumps(product_data))
         if response.status_code == 200:
             print(f"Product with uuid={product_uuid} updated.")
         else:
@@ -404,7 +618,7 @@ class Command(BaseCommand):
 
     def _create_product(self, product_data):
         url_create_product = URL_BIFROST + 'products/products/'
-        response = requests.post(url_create_product, headers=self.headers, data=json.dumps(product_data))
+        response = self._request('post', url_create_product, data=json.dumps(product_data))
         if response.status_code == 201:
             print(f"Product with uuid={json.loads(response.content)['uuid']} created.")
         else:
@@ -443,27 +657,122 @@ class Command(BaseCommand):
             else:
                 self._create_product(product_data)
 
-    def parse_file(self, csv_path):
-        google_csv_delimiter = ","
-        # numbers_csv_delimiter = ";"
-        delimiter = google_csv_delimiter
+    def _import_row(self):
+        site_profile_uuids, wfl2_uuid = self._import_contact()
+        site_profile_uuids = self._import_siteprofile(site_profile_uuids, wfl2_uuid)
+        self._set_site_profile_uuid_on_contact(site_profile_uuids)
+        # TODO: SiteProfiles #2 and #3
+        # site_profile_uuids = self._import_siteprofile(mappings, site_profile_uuids, wfl2_uuid)
+        # self._set_site_profile_uuid_on_contact(site_profile_uuids)
+        self._import_product(wfl2_uuid)
+
+    def parse_file(self, csv_path, start=None, end=None, rows=None):
+        """
+        Import all rows of the csv file or only the ones within the byte range from `start` to `end`, which has at
+        most `rows` rows if they were counted already.
+        """
+        if start is None or end is None:
+            (start, end), = _split_file_into_ranges(csv_path, 1)
+        if rows is None:
+            rows = _count_rows(csv_path, start, end)
         # ToDo: find out and set delimiter dynamically
-        with open(csv_path, 'rt') as csv_file:
-            next(csv_file)  # skip first line
-            for row in csv.reader(csv_file, delimiter=delimiter, dialect=csv.excel_tab):
-                self.row = row
-                if not is_valid_uuid(self._col('B')):
-                    print(f"{self._col('B')} DISMISSED")
-                    continue
-                self.counter += 1
-                site_profile_uuids, wfl2_uuid = self._import_contact()
-                site_profile_uuids = self._import_siteprofile(site_profile_uuids, wfl2_uuid)
-                self._set_site_profile_uuid_on_contact(site_profile_uuids)
-                # TODO: SiteProfiles #2 and #3
-                # site_profile_uuids = self._import_siteprofile(mappings, site_profile_uuids, wfl2_uuid)
-                # self._set_site_profile_uuid_on_contact(site_profile_uuids)
-                self._import_product(wfl2_uuid)
-        print(f"{self.counter} contacts parsed.")
+        lines = _iter_lines(csv_path, start, end)
+        # Progress of the import for the Prometheus metrics, summed over the workers
+        metrics.IMPORT_ROWS_PENDING.set(rows)
+        reader = csv.reader(lines, delimiter=CSV_DELIMITER, dialect=csv.excel_tab)
+        try:
+            for batch in iter_batches(reader, VALIDATION_BATCH_SIZE):
+                batch_errors = self._validate_batch(batch)
+                for index, row in enumerate(batch):
+                    self.row = row
+                    metrics.IMPORT_ROWS_PENDING.dec()
+                    if not is_valid_uuid(self._col('B')):
+                        self._log(f"{self._col('B')} DISMISSED")
+                        self.dismissed += 1
+                        metrics.IMPORT_ROWS_PROCESSED.labels('dismissed').inc()
+                        continue
+                    self.counter += 1
+                    if index in batch_errors:
+                        self._log(f"{self.counter}: Invalid Contact with uuid={self._col('B')}: {batch_errors[index]}")
+                        self.errors.append({'row': self.counter, 'uuid': self._col('B'), 'error': batch_errors[index]})
+                        metrics.IMPORT_ROWS_PROCESSED.labels('failed').inc()
+                        continue
+                    try:
+                        self._import_row()
+                    except Exception as e:
+                        self._log(f"{self.counter}: Error when importing Contact with uuid={self.contact_uuid}: {e!r}")
+                        self.errors.append({'row': self.counter, 'uuid': self._col('B'), 'error': repr(e)})
+                        metrics.IMPORT_ROWS_PROCESSED.labels('failed').inc()
+                    else:
+                        metrics.IMPORT_ROWS_PROCESSED.labels('imported').inc()
+        finally:
+            metrics.IMPORT_ROWS_PENDING.set(0)
+        self._log(f"{self.counter} contacts parsed.")
+
+    def get_report(self):
+        return {
+            'worker': self.worker,
+            'parsed': self.counter,
+            'dismissed': self.dismissed,
+            'errors': self.errors,
+        }
+
+    def _reserve_customer_ids(self, csv_path, ranges):
+        """
+        Reserve a block of free customer_ids for the rows without one in column A of every range in the database, so
+        neither parallel imports nor contacts created meanwhile collide with them. The blocks start after the
+        customer_ids of column A. Return the block of every range, or None if no row needs a customer_id.
+        """
+        scans = [_scan_customer_ids(csv_path, start, end) for start, end in ranges]
+        missing = [range_missing for _, range_missing in scans]
+        if not sum(missing):
+            return [None] * len(ranges)
+        minimum = max(highest for highest, _ in scans) + 1
+        next_customer_id = Contact.reserve_customer_ids(self.organization_uuid, sum(missing), minimum)
+        blocks = []
+        for block_size in missing:
+            blocks.append((next_customer_id, next_customer_id + block_size) if block_size else None)
+            next_customer_id += block_size
+        return blocks
+
+    def parse_file_in_parallel(self, csv_path, workers):
+        """
+        Import the byte ranges of the csv file in separate processes and merge their reports. The customer_ids
+        reserved for the rows without one are released when the import finished.
+        """
+        ranges = _split_file_into_ranges(csv_path, workers)
+        rows = [_count_rows(csv_path, start, end) for start, end in ranges]
+        blocks = self._reserve_customer_ids(csv_path, ranges)
+        jobs = [{'worker': worker, 'csv_path': csv_path, 'start': start, 'end': end, 'rows': range_rows,
+                 'customer_ids': block,
+                 'organization_uuid': self.organization_uuid,
+                 'workflowlevel1_id': self.workflowlevel1_id,
+                 'workflowlevel1_uuid': self.workflowlevel1_uuid}
+                for worker, ((start, end), range_rows, block) in enumerate(zip(ranges, rows, blocks), start=1)]
+        # every process has to open its own database connection
+        connections.close_all()
+        reports = []
+        try:
+            with multiprocessing.Pool(processes=len(jobs)) as pool:
+                for report in pool.imap_unordered(_import_range, jobs):
+                    print(f"Worker {report['worker']} finished: {report['parsed']} contacts parsed, "
+                          f"{report['dismissed']} dismissed, {len(report['errors'])} errors.")
+                    reports.append(report)
+        finally:
+            reserved = [block for block in blocks if block is not None]
+            if reserved:
+                Contact.release_customer_ids(self.organization_uuid, reserved[-1][1] - 1)
+        self.counter = sum(report['parsed'] for report in reports)
+        self.dismissed = sum(report['dismissed'] for report in reports)
+        self.errors = [dict(error, worker=report['worker']) for report in sorted(reports, key=lambda r: r['worker'])
+                       for error in report['errors']]
+        print(f"{self.counter} contacts parsed by {len(jobs)} workers.")
+
+    def print_report(self):
+        print(f"{self.dismissed} rows dismissed, {len(self.errors)} errors.")
+        for error in self.errors:
+            worker = f"worker {error['worker']}, " if 'worker' in error else ''
+            print(f"Error ({worker}row {error['row']}, uuid={error['uuid']}): {error['error']}")
 
     def handle(self, *args, **options):
         file = options.get('file')
@@ -471,4 +780,10 @@ class Command(BaseCommand):
             file = DEFAULT_FILE_NAME
         csv_path = os.path.join(settings.BASE_DIR, '..', 'data', 'crm_service', file)
         print(f"Import data from {file}.")
-        self.parse_file(csv_path)
+        self.authenticate()
+        workers = options.get('workers') or 1
+        if workers > 1:
+            self.parse_file_in_parallel(csv_path, workers)
+        else:
+            self.parse_file(csv_path)
+        self.print_report()
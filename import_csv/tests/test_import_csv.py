@@ -0,0 +1,223 @@
+import base64
+import csv
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from django.core.validators import validate_email
+from prometheus_client import REGISTRY
+
+from ..management.commands import import_csv
+from ..management.commands.import_csv import _count_rows, _iter_lines, _scan_customer_ids, _split_file_into_ranges
+
+
+def _make_token(**claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=')
+    return f'header.{payload}.signature'
+
+
+class SplitFileIntoRangesTest(TestCase):
+    def setUp(self):
+        self.rows = [f'{i},c9bf9e57-1685-4c89-bafb-ff5af830be{i:02d},Nina,Simone' for i in range(20)]
+        self.csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.csv_file.write('A,B,C,D\n' + '\n'.join(self.rows) + '\n')
+        self.csv_file.close()
+        self.csv_path = self.csv_file.name
+
+    def tearDown(self):
+        os.remove(self.csv_path)
+
+    def _read_ranges(self, ranges):
+        return [[','.join(row) for row in csv.reader(_iter_lines(self.csv_path, start, end))]
+                for start, end in ranges]
+
+    def test_single_range_skips_header(self):
+        ranges = _split_file_into_ranges(self.csv_path, 1)
+        self.assertEqual(len(ranges), 1)
+        self.assertEqual(self._read_ranges(ranges), [self.rows])
+
+    def test_ranges_are_aligned_on_rows(self):
+        ranges = _split_file_into_ranges(self.csv_path, 3)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.csv_path))
+        parts = self._read_ranges(ranges)
+        self.assertTrue(all(parts))
+        self.assertEqual([row for part in parts for row in part], self.rows)
+
+    def test_more_workers_than_rows(self):
+        ranges = _split_file_into_ranges(self.csv_path, 50)
+        self.assertLessEqual(len(ranges), len(self.rows))
+        parts = self._read_ranges(ranges)
+        self.assertEqual([row for part in parts for row in part], self.rows)
+
+    def test_count_rows_covers_every_range(self):
+        ranges = _split_file_into_ranges(self.csv_path, 4)
+        for (start, end), part in zip(ranges, self._read_ranges(ranges)):
+            self.assertGreaterEqual(_count_rows(self.csv_path, start, end), len(part))
+
+
+    @mock.patch.object(import_csv, 'COUNT_CHUNK_SIZE', 7)
+    def test_count_rows_in_chunks(self):
+        (start, end), = _split_file_into_ranges(self.csv_path, 1)
+        self.assertEqual(_count_rows(self.csv_path, start, end), len(self.rows))
+        self.assertEqual(_count_rows(self.csv_path, start, end - 1), len(self.rows))
+        self.assertEqual(_count_rows(self.csv_path, start, start), 0)
+
+    def _write_rows(self, rows):
+        with open(self.csv_path, 'w') as csv_file:
+            csv_file.write('A,B,C,D\n' + '\n'.join(rows) + '\n')
+
+    def test_scan_customer_ids(self):
+        self._write_rows([row.split(',', 1)[1] if i % 4 == 0 else row for i, row in enumerate(self.rows)])
+        (start, end), = _split_file_into_ranges(self.csv_path, 1)
+        self.assertEqual(_scan_customer_ids(self.csv_path, start, end), (19, 0))
+        self._write_rows([',' + row.split(',', 1)[1] if i % 4 == 0 else row for i, row in enumerate(self.rows)])
+        self.assertEqual(_scan_customer_ids(self.csv_path, start, start), (0, 0))
+        (start, end), = _split_file_into_ranges(self.csv_path, 1)
+        self.assertEqual(_scan_customer_ids(self.csv_path, start, end), (19, 5))
+
+    @mock.patch.object(import_csv.Contact, 'reserve_customer_ids', return_value=50000)
+    def test_reserve_customer_ids_after_column_a(self, reserve_customer_ids):
+        self._write_rows([',' + row.split(',', 1)[1] if i % 4 == 0 else row for i, row in enumerate(self.rows)])
+        ranges = _split_file_into_ranges(self.csv_path, 3)
+        command = import_csv.Command()
+        command.organization_uuid = 'c9bf9e57-1685-4c89-bafb-ff5af830be8a'
+        blocks = command._reserve_customer_ids(self.csv_path, ranges)
+        reserve_customer_ids.assert_called_once_with(command.organization_uuid, 5, 20)
+        self.assertEqual(blocks[0][0], 50000)
+        self.assertEqual(blocks[-1][1], 50005)
+        self.assertEqual(sum(block[1] - block[0] for block in blocks), 5)
+
+    @mock.patch.object(import_csv.Contact, 'reserve_customer_ids')
+    def test_no_reservation_if_column_a_is_set(self, reserve_customer_ids):
+        ranges = _split_file_into_ranges(self.csv_path, 3)
+        command = import_csv.Command()
+        command.organization_uuid = 'c9bf9e57-1685-4c89-bafb-ff5af830be8a'
+        self.assertEqual(command._reserve_customer_ids(self.csv_path, ranges), [None] * len(ranges))
+        reserve_customer_ids.assert_not_called()
+
+
+class CommandAuthenticationTest(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = mock.patch.object(import_csv, 'TOKEN_CACHE_FILE', os.path.join(cache_dir.name, 'token.json'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.organization_uuid = 'c9bf9e57-1685-4c89-bafb-ff5af830be8a'
+        self.token = _make_token(exp=int(time.time()) + 3600, organization_uuid=self.organization_uuid)
+
+    @mock.patch.object(import_csv, '_request_token')
+    def test_no_requests_on_construction(self, request_token):
+        import_csv.Command()
+        request_token.assert_not_called()
+
+    @mock.patch.object(import_csv, '_request_token')
+    def test_token_is_cached_on_disk(self, request_token):
+        request_token.return_value = (self.token, time.time() + 3600)
+        self.assertEqual(import_csv.Command()._get_token(), self.token)
+        self.assertEqual(import_csv.Command()._get_token(), self.token)
+        self.assertEqual(request_token.call_count, 1)
+
+    @mock.patch.object(import_csv, '_request_token')
+    def test_expired_token_is_requested_again(self, request_token):
+        import_csv._save_cached_token('expired', time.time() + 10)
+        request_token.return_value = (self.token, time.time() + 3600)
+        self.assertEqual(import_csv.Command()._get_token(), self.token)
+        request_token.assert_called_once_with()
+
+    def test_cached_token_is_private(self):
+        import_csv._save_cached_token(self.token, time.time() + 3600)
+        self.assertEqual(os.stat(import_csv.TOKEN_CACHE_FILE).st_mode & 0o777, 0o600)
+        self.assertEqual(os.listdir(os.path.dirname(import_csv.TOKEN_CACHE_FILE)), ['token.json'])
+        self.assertEqual(import_csv._load_cached_token(), self.token)
+
+        # Caches readable by others or symlinks, e.g. to a token of another user, are ignored
+        os.chmod(import_csv.TOKEN_CACHE_FILE, 0o644)
+        self.assertIsNone(import_csv._load_cached_token())
+        os.chmod(import_csv.TOKEN_CACHE_FILE, 0o600)
+        link_path = import_csv.TOKEN_CACHE_FILE + '.link'
+        os.symlink(import_csv.TOKEN_CACHE_FILE, link_path)
+        with mock.patch.object(import_csv, 'TOKEN_CACHE_FILE', link_path):
+            self.assertIsNone(import_csv._load_cached_token())
+
+    @mock.patch.object(import_csv, '_request_token')
+    def test_refresh_on_401(self, request_token):
+        new_token = _make_token(exp=int(time.time()) + 7200)
+        request_token.side_effect = [(self.token, time.time() + 3600), (new_token, time.time() + 7200)]
+        command = import_csv.Command()
+        command.session = mock.Mock()
+        command.session.request.side_effect = [mock.Mock(status_code=401), mock.Mock(status_code=200)]
+
+        response = command._request('get', 'workflowlevel1/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(command.session.request.call_count, 2)
+        retry_headers = command.session.request.call_args[1]['headers']
+        self.assertEqual(retry_headers['Authorization'], 'JWT ' + new_token)
+        self.assertEqual(import_csv._load_cached_token(), new_token)
+
+    @mock.patch.object(import_csv, '_request_token')
+    def test_set_organization_from_token_claims(self, request_token):
+        request_token.return_value = (self.token, time.time() + 3600)
+        command = import_csv.Command()
+        command.session = mock.Mock()
+        command.set_organization()
+        self.assertEqual(command.organization_uuid, self.organization_uuid)
+        command.session.request.assert_not_called()
+
+
+class ParseFileMetricsTest(TestCase):
+    def setUp(self):
+        rows = ['0,not-a-uuid,Nina,Simone'] + [f'{i},c9bf9e57-1685-4c89-bafb-ff5af830be{i:02d},Nina,Simone'
+                                              for i in range(1, 4)]
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        csv_file.write('A,B,C,D\n' + '\n'.join(rows) + '\n')
+        csv_file.close()
+        self.csv_path = csv_file.name
+        self.addCleanup(os.remove, self.csv_path)
+
+    def _processed(self, result):
+        return REGISTRY.get_sample_value('crm_import_csv_rows_processed_total', {'result': result}) or 0
+
+    def test_progress_metrics(self):
+        before = {result: self._processed(result) for result in ('imported', 'dismissed', 'failed')}
+        pending = []
+
+        def import_row():
+            pending.append(REGISTRY.get_sample_value('crm_import_csv_rows_pending'))
+            if len(pending) == 2:
+                raise ValueError('invalid row')
+
+        command = import_csv.Command()
+        with mock.patch.object(command, '_import_row', side_effect=import_row), \
+                mock.patch.object(command, '_log'):
+            command.parse_file(self.csv_path)
+
+        self.assertEqual(pending, [2, 1, 0])
+        self.assertEqual(REGISTRY.get_sample_value('crm_import_csv_rows_pending'), 0)
+        self.assertEqual(self._processed('imported'), before['imported'] + 2)
+        self.assertEqual(self._processed('dismissed'), before['dismissed'] + 1)
+        self.assertEqual(self._processed('failed'), before['failed'] + 1)
+
+    def test_invalid_arrays_are_not_imported(self):
+        rows = [
+            '1,c9bf9e57-1685-4c89-bafb-ff5af830be01,Nina,Simone,,,,,,,nina@example.com,',
+            '2,c9bf9e57-1685-4c89-bafb-ff5af830be02,Billie,Holiday,,,,,,,not-an-email,',
+        ]
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        csv_file.write('A,B,C,D,E,F,G,H,I,J,K,L\n' + '\n'.join(rows) + '\n')
+        csv_file.close()
+        self.addCleanup(os.remove, csv_file.name)
+
+        command = import_csv.Command()
+        with mock.patch.object(command, '_import_row') as import_row, mock.patch.object(command, '_log'), \
+                mock.patch('contact.validators.validate_email', wraps=validate_email) as validate:
+            command.parse_file(csv_file.name)
+
+        self.assertEqual(import_row.call_count, 1)
+        self.assertEqual(validate.call_count, 2)
+        self.assertEqual(command.errors, [{'row': 2, 'uuid': 'c9bf9e57-1685-4c89-bafb-ff5af830be02',
+                                           'error': {'emails': ['Enter a valid email address.']}}])
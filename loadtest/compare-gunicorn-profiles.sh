@@ -0,0 +1,33 @@
+#!/bin/bash
+# Compares the throughput of /appointment/ and /contact/ with a single sync worker and with the tuned configuration.
+# The database settings and JWT_PUBLIC_KEY_RSA_BIFROST must be exported like for a normal server start.
+#
+# Usage: bash loadtest/compare-gunicorn-profiles.sh <JWT> [concurrency] [duration]
+
+set -e
+
+token=${1:?"Usage: $0 <JWT> [concurrency] [duration]"}
+concurrency=${2:-16}
+duration=${3:-30}
+port=${LOADTEST_PORT:-8088}
+
+run_profile() {
+    name=$1
+    shift
+    echo "### Profile: $name"
+    env "$@" gunicorn crm_service.wsgi --config crm_service/gunicorn_conf.py --bind "127.0.0.1:$port" \
+        --log-level warning &
+    pid=$!
+    bash scripts/tcp-port-wait.sh 127.0.0.1 "$port" > /dev/null
+    python -m loadtest.throughput --url "http://127.0.0.1:$port" --token "$token" \
+        --concurrency "$concurrency" --duration "$duration"
+    kill "$pid"
+    wait "$pid" || true
+}
+
+run_profile "sync, 1 worker" GUNICORN_WORKER_CLASS=sync GUNICORN_WORKERS=1 GUNICORN_THREADS=1 \
+    GUNICORN_PRELOAD_APP=False
+run_profile "gthread (tuned)"
+if python -c "import gevent" 2> /dev/null; then
+    run_profile "gevent (tuned)" GUNICORN_WORKER_CLASS=gevent
+fi
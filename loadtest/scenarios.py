@@ -0,0 +1,238 @@
+"""
+Ramp up the concurrency of a traffic mix modeled on the calendar and dispatch clients against a running server and
+report its saturation point: the concurrency after which the throughput stops growing or requests start failing.
+
+Every virtual user keeps its own HTTP connection open and runs scenarios picked by their weight in the mix:
+
+- calendar_week: the appointments of the user (`owner=me`) in a week, as loaded by the week view of the calendar
+- contact_typeahead: a name typed into the contact search, one `starts_with` request per keystroke
+- create_appointment: an appointment with a note
+- post_driving_time: a driving time of an appointment created by the virtual user
+
+    python -m loadtest.scenarios --url http://localhost:8080 --token <JWT> --stages 1,2,4,8,16,32 --stage-duration 30
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from .throughput import _to_ms, percentile
+
+DEFAULT_MIX = 'calendar_week=50,contact_typeahead=35,create_appointment=10,post_driving_time=5'
+DEFAULT_STAGES = '1,2,4,8,16,32,64'
+# The dates of the data of `manage.py seed_benchmark_data` are spread around it
+DEFAULT_REFERENCE_DATE = '2019-07-01'
+TYPEAHEAD_NAMES = ('Müller', 'Schneider', 'Hoffmann', 'Zimmermann', 'Anna', 'Jonas', 'Sophie')
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, url, token, mix, reference_date, stop_at, seed):
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.headers = {'Authorization': f'JWT {token}', 'Content-Type': 'application/json'} if token else {}
+        self.mix = mix
+        self.reference_date = reference_date
+        self.stop_at = stop_at
+        # Users with the same seed send the same requests, so runs are comparable
+        self.rng = random.Random(seed)  # nosec
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.appointment_ids = []
+        self.connection = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.url.netloc, timeout=60)
+
+    def request(self, name, method, path, query=None, body=None):
+        """Send a request, record its latency under the name and return the decoded JSON response, or None."""
+        url = self.url.path.rstrip('/') + path + ('?' + urlencode(query) if query else '')
+        started = time.monotonic()
+        try:
+            self.connection.request(method, url, body=json.dumps(body) if body is not None else None,
+                                    headers=self.headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.errors[name] += 1
+            self.connection.close()
+            self.connection = self._connect()
+            return None
+        if response.status >= 400:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.monotonic() - started)
+        return json.loads(content) if content else None
+
+    def calendar_week(self):
+        day = self.reference_date + timedelta(weeks=self.rng.randint(-26, 26))
+        monday = day - timedelta(days=day.weekday())
+        self.request('calendar_week', 'GET', '/appointment/', {
+            'owner': 'me',
+            'start_date_gte': monday.isoformat(),
+            'start_date_lte': (monday + timedelta(days=6)).isoformat(),
+            'page_size': 200,
+        })
+
+    def contact_typeahead(self):
+        name = self.rng.choice(TYPEAHEAD_NAMES)
+        for length in range(1, min(len(name), 4) + 1):
+            self.request('contact_typeahead', 'GET', '/contact/', {'starts_with': name[:length], 'limit': 10})
+
+    def create_appointment(self):
+        day = self.reference_date + timedelta(days=self.rng.randint(0, 60))
+        start_date = datetime(day.year, day.month, day.day, self.rng.randint(7, 17))
+        appointment = self.request('create_appointment', 'POST', '/appointment/', body={
+            'name': 'Load test',
+            'type': [self.rng.choice(('inspection', 'installation', 'maintenance', 'repair'))],
+            'start_date': start_date.isoformat() + 'Z',
+            'end_date': (start_date + timedelta(hours=self.rng.choice((1, 2, 4)))).isoformat() + 'Z',
+            'address': 'Oderberger Straße 16A, 10435 Berlin',
+            'notes': [{'type': 1, 'note': 'Created by the load test.'}],
+        })
+        if appointment:
+            self.appointment_ids.append(appointment['id'])
+
+    def post_driving_time(self):
+        if not self.appointment_ids:
+            self.create_appointment()
+            if not self.appointment_ids:
+                return
+        minutes = self.rng.randint(5, 90)
+        self.request('post_driving_time', 'POST', '/appointmentdrivingtimes/', body={
+            'appointment': self.rng.choice(self.appointment_ids),
+            'distance': '{:.2f}'.format(minutes * 0.8),
+            'time': minutes,
+            'time_point': datetime.utcnow().replace(microsecond=0).isoformat() + 'Z',
+        })
+
+    def run(self):
+        self.connection = self._connect()
+        names, weights = zip(*self.mix.items())
+        while time.monotonic() < self.stop_at:
+            getattr(self, self.rng.choices(names, weights)[0])()
+        self.connection.close()
+
+
+def _summarize(latencies, errors, elapsed):
+    requests = len(latencies) + errors
+    return {
+        'requests': requests,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4) if requests else 0,
+        'requests_per_second': round(len(latencies) / elapsed, 2),
+        'p50_ms': _to_ms(percentile(latencies, 50)),
+        'p95_ms': _to_ms(percentile(latencies, 95)),
+        'p99_ms': _to_ms(percentile(latencies, 99)),
+    }
+
+
+def run_stage(url, token, mix, reference_date, concurrency, duration, seed=0):
+    """Run `concurrency` virtual users for `duration` seconds and return the results, in total and per scenario."""
+    started = time.monotonic()
+    users = [VirtualUser(url, token, mix, reference_date, started + duration, seed * 10000 + index)
+             for index in range(concurrency)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.monotonic() - started
+
+    result = {'concurrency': concurrency}
+    result.update(_summarize([latency for user in users for latencies in user.latencies.values()
+                              for latency in latencies],
+                             sum(sum(user.errors.values()) for user in users), elapsed))
+    result['scenarios'] = {
+        name: _summarize([latency for user in users for latency in user.latencies[name]],
+                         sum(user.errors[name] for user in users), elapsed)
+        for name in mix
+    }
+    return result
+
+
+def find_saturation(stages, min_gain=0.1, max_error_rate=0.01):
+    """
+    Return the last stage before the throughput grew by less than `min_gain` or more than `max_error_rate` of the
+    requests failed, with the reason, or None if the server didn't saturate.
+    """
+    for previous, stage in zip(stages, stages[1:]):
+        if stage['error_rate'] > max_error_rate:
+            reason = 'error rate {:.1%} at concurrency {}'.format(stage['error_rate'], stage['concurrency'])
+        elif stage['requests_per_second'] < previous['requests_per_second'] * (1 + min_gain):
+            reason = 'throughput grew by less than {:.0%} at concurrency {}'.format(min_gain, stage['concurrency'])
+        else:
+            continue
+        return {
+            'concurrency': previous['concurrency'],
+            'requests_per_second': previous['requests_per_second'],
+            'p95_ms': previous['p95_ms'],
+            'reason': reason,
+        }
+    return None
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if not hasattr(VirtualUser, name) or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f'invalid scenario weight: {item}')
+        mix[name] = int(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8080', help='Base URL of the server.')
+    parser.add_argument('--token', default=os.getenv('LOADTEST_TOKEN'),
+                        help='JWT sent in the Authorization header (default: $LOADTEST_TOKEN), '
+                             'see loadtest/tokens.py.')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Weights of the scenarios (default: {DEFAULT_MIX}).')
+    parser.add_argument('--stages', default=DEFAULT_STAGES,
+                        help=f'Concurrency of the stages of the ramp (default: {DEFAULT_STAGES}).')
+    parser.add_argument('--stage-duration', type=int, default=30, help='Duration of a stage in seconds.')
+    parser.add_argument('--reference-date', type=_parse_date, default=_parse_date(DEFAULT_REFERENCE_DATE),
+                        help='Date the requested weeks are spread around.')
+    parser.add_argument('--min-gain', type=float, default=0.1,
+                        help='Throughput growth below which the server counts as saturated.')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='Share of failed requests above which the server counts as saturated.')
+    parser.add_argument('--keep-going', action='store_true', help='Run all stages after the saturation point.')
+    parser.add_argument('--label', help='Label of the run, e.g. the gunicorn configuration.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the requests of the virtual users.')
+    args = parser.parse_args()
+
+    stages = []
+    saturation = None
+    for concurrency in (int(value) for value in args.stages.split(',')):
+        stages.append(run_stage(args.url, args.token, args.mix, args.reference_date, concurrency,
+                                args.stage_duration, args.seed))
+        print('concurrency {concurrency}: {requests_per_second} requests/s, p95 {p95_ms} ms, '
+              '{error_rate:.1%} errors'.format(**stages[-1]), file=sys.stderr, flush=True)
+        saturation = find_saturation(stages, args.min_gain, args.max_error_rate)
+        if saturation and not args.keep_going:
+            break
+
+    print(json.dumps({
+        'label': args.label,
+        'url': args.url,
+        'mix': args.mix,
+        'stages': stages,
+        'saturation': saturation,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Measure the throughput of API endpoints of a running server.
+
+Every client thread keeps its own HTTP connection open and requests the given paths in turns for the given time:
+
+    python -m loadtest.throughput --url http://localhost:8080 --token <JWT> --concurrency 16 --duration 30
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ('/appointment/', '/contact/')
+
+
+def percentile(values, percent):
+    """Return the percentile of the values with the nearest-rank method."""
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[index]
+
+
+class Client(threading.Thread):
+    def __init__(self, url, headers, paths, stop_at):
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.headers = headers
+        self.paths = paths
+        self.stop_at = stop_at
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.url.netloc, timeout=60)
+
+    def run(self):
+        connection = self._connect()
+        request_count = 0
+        while time.monotonic() < self.stop_at:
+            path = self.paths[request_count % len(self.paths)]
+            request_count += 1
+            started = time.monotonic()
+            try:
+                connection.request('GET', self.url.path.rstrip('/') + path, headers=self.headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors[path] += 1
+                connection.close()
+                connection = self._connect()
+                continue
+            if response.status != 200:
+                self.errors[path] += 1
+            else:
+                self.latencies[path].append(time.monotonic() - started)
+        connection.close()
+
+
+def run(url, token, paths=DEFAULT_PATHS, concurrency=8, duration=30):
+    """Run the load test and return the results per path."""
+    headers = {'Authorization': f'JWT {token}'} if token else {}
+    stop_at = time.monotonic() + duration
+    clients = [Client(url, headers, paths, stop_at) for _ in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    results = {}
+    for path in paths:
+        latencies = [latency for client in clients for latency in client.latencies[path]]
+        results[path] = {
+            'requests': len(latencies),
+            'errors': sum(client.errors[path] for client in clients),
+            'requests_per_second': round(len(latencies) / duration, 2),
+            'p50_ms': _to_ms(percentile(latencies, 50)),
+            'p95_ms': _to_ms(percentile(latencies, 95)),
+            'p99_ms': _to_ms(percentile(latencies, 99)),
+        }
+    return results
+
+
+def _to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8080', help='Base URL of the server.')
+    parser.add_argument('--token', default=os.getenv('LOADTEST_TOKEN'),
+                        help='JWT sent in the Authorization header (default: $LOADTEST_TOKEN).')
+    parser.add_argument('--path', dest='paths', action='append', help='Path to request, can be repeated.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of parallel connections.')
+    parser.add_argument('--duration', type=int, default=30, help='Duration of the test in seconds.')
+    args = parser.parse_args()
+    results = run(args.url, args.token, tuple(args.paths or DEFAULT_PATHS), args.concurrency, args.duration)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
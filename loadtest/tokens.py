@@ -0,0 +1,77 @@
+"""
+JWT fixture of the load tests: an RSA key pair, whose public key the server is started with, and tokens signed with
+its private key like the ones of Bifrost.
+
+    export JWT_PUBLIC_KEY_RSA_BIFROST="$(python -m loadtest.tokens public-key)"
+    export LOADTEST_TOKEN="$(python -m loadtest.tokens token --organization-uuid <uuid> --core-user-uuid <uuid>)"
+
+The private key is created in loadtest/bifrost-key.pem on first use.
+"""
+import argparse
+import os
+import time
+import uuid
+
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+DEFAULT_PRIVATE_KEY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bifrost-key.pem')
+ISSUER = 'bifrost'
+
+
+def load_private_key(path=DEFAULT_PRIVATE_KEY):
+    """Return the PEM of the private key in the file, which is created if it doesn't exist."""
+    if not os.path.exists(path):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+        pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                        serialization.NoEncryption())
+        key_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(key_fd, 'wb') as key_file:
+            key_file.write(pem)
+    with open(path, 'rb') as key_file:
+        return key_file.read()
+
+
+def public_key(private_key_pem):
+    """Return the PEM of the public key, the value of JWT_PUBLIC_KEY_RSA_BIFROST."""
+    private_key = serialization.load_pem_private_key(private_key_pem, password=None, backend=default_backend())
+    return private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                 serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+
+
+def make_token(private_key_pem, organization_uuid, core_user_uuid=None, username='loadtest', lifetime=8 * 3600):
+    """Return a JWT with the claims the service reads, valid for `lifetime` seconds."""
+    claims = {
+        'iss': ISSUER,
+        'exp': int(time.time()) + lifetime,
+        'organization_uuid': str(organization_uuid),
+        'core_user_uuid': str(core_user_uuid or uuid.uuid4()),
+        'username': username,
+    }
+    token = jwt.encode(claims, private_key_pem, algorithm='RS256')
+    return token.decode() if isinstance(token, bytes) else token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('public-key', 'token'))
+    parser.add_argument('--private-key', default=DEFAULT_PRIVATE_KEY, help='File of the private key.')
+    parser.add_argument('--organization-uuid', help='Organization of the token.')
+    parser.add_argument('--core-user-uuid', help='User of the token, e.g. the owner of seeded appointments '
+                                                 '(default: a random one).')
+    parser.add_argument('--lifetime', type=int, default=8 * 3600, help='Seconds the token is valid.')
+    args = parser.parse_args()
+
+    private_key_pem = load_private_key(args.private_key)
+    if args.command == 'public-key':
+        print(public_key(private_key_pem), end='')
+        return
+    if not args.organization_uuid:
+        parser.error('token needs --organization-uuid')
+    print(make_token(private_key_pem, args.organization_uuid, args.core_user_uuid, lifetime=args.lifetime))
+
+
+if __name__ == '__main__':
+    main()